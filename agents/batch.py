@@ -0,0 +1,346 @@
+"""
+バッチ変換
+ディレクトリまたはマニフェストに含まれる設計JSON・画像をまとめてPPTXに変換する
+
+    python -m agents.batch agent_output/ --output batch_output/ --workers 8
+    python -m agents.batch items.txt --output batch_output/
+
+- 設計JSON（design.json 等）: 同じディレクトリの生成済み画像（background.png, image_1.png, ...）で再構成
+- デッキ（deck.json）: 各スライドを slideNN_ 付きの画像で再構成し、複数スライドのPPTXにする
+- 画像（png / jpg / webp）: 全画面背景のスライドとして配置
+  （--mode editable では analyze_image で要素を識別し、編集可能なPPTXにする。API を呼ぶ）
+
+PPTXの組み立て・画像エンコードは CPU 処理なのでプロセスプールで並列化する。
+項目ごとの結果は出力先の batch_manifest.jsonl に1行ずつ追記し、終了時に batch_manifest.json にまとめる。
+中断後の再実行では両方を読み込み、完了済みの項目を飛ばす。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+
+from .designer_agent import design_to_pptx_elements
+from .tools.editable_pptx import image_to_editable_pptx
+from .tools.image_to_pptx import image_to_pptx
+
+# 画像として扱う拡張子
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# image_to_editable_pptx が書き出す分析結果の接尾辞（設計JSONとして扱わない）
+ANALYSIS_SUFFIX = ".analysis.json"
+
+# 結果を記録するマニフェストのファイル名
+MANIFEST_NAME = "batch_manifest.json"
+
+# 実行中に項目ごとの結果を追記するログのファイル名（終了時にマニフェストへまとめて削除する）
+JOURNAL_NAME = "batch_manifest.jsonl"
+
+# 画像の変換方法（slide: 全画面背景 / editable: 要素を識別して編集可能にする）
+MODES = ("slide", "editable")
+
+
+def collect_items(source: Path, exclude: Optional[Path] = None) -> List[dict]:
+    """
+    変換対象を列挙する
+
+    ディレクトリの場合、"_" で始まる内部ディレクトリ（_blobs / _cache など）と exclude 以下は対象外。
+
+    Args:
+        source: ディレクトリ、またはパスを1行1件で書いたテキスト / パスのJSON配列
+        exclude: 走査しないディレクトリ（出力先が入力ディレクトリ内にある場合など）
+
+    Returns:
+        list: [{"id": 項目ID, "kind": "design" | "image", "path": str}, ...]
+    """
+    if source.is_dir():
+        excluded = exclude.resolve() if exclude else None
+        paths = sorted(
+            p for p in source.rglob("*")
+            if p.is_file() and not _is_internal(p.relative_to(source), excluded, p)
+        )
+        base = source
+        # 各JSONの判定（読み込み・パース）は1回だけ行う
+        designs = {p for p in paths if _is_design_file(p)}
+        # 設計JSONがあるディレクトリの画像は、その設計の要素として使う
+        design_dirs = {p.parent for p in designs}
+        paths = [p for p in paths if p in designs or (p.suffix.lower() in IMAGE_EXTENSIONS and p.parent not in design_dirs)]
+    else:
+        text = source.read_text(encoding="utf-8")
+        if source.suffix.lower() == ".json":
+            entries = json.loads(text)
+        else:
+            entries = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+        base = source.parent
+        paths = [(base / entry) if not os.path.isabs(entry) else Path(entry) for entry in entries]
+
+    items = []
+    for path in paths:
+        if path.suffix.lower() == ".json":
+            kind = "design"
+        elif path.suffix.lower() in IMAGE_EXTENSIONS:
+            kind = "image"
+        else:
+            continue
+        try:
+            item_id = str(path.relative_to(base))
+        except ValueError:
+            item_id = str(path)
+        items.append({"id": item_id, "kind": kind, "path": str(path)})
+    return items
+
+
+def _is_internal(relative: Path, excluded: Optional[Path], path: Path) -> bool:
+    """内部ディレクトリ（"_" 始まり）または出力先の中のファイルか"""
+    if any(part.startswith("_") for part in relative.parts[:-1]):
+        return True
+    return excluded is not None and excluded in path.resolve().parents
+
+
+def _is_design_file(path: Path) -> bool:
+    """
+    設計JSON（design.json 形式、{"design": ...} 形式、または deck.json 形式）か
+
+    image_to_editable_pptx の分析結果（*.analysis.json）は対象外。elements 配列を持つだけの JSON も、
+    設計の要素（type と prompt / content を持つ）を含まなければ設計とみなさない。
+    """
+    if path.suffix.lower() != ".json" or path.name == MANIFEST_NAME or path.name.endswith(ANALYSIS_SUFFIX):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if not isinstance(data, dict):
+        return False
+    if isinstance(data.get("slides"), list):
+        return True
+    design = data["design"] if isinstance(data.get("design"), dict) else data
+    return _has_design_elements(design)
+
+
+def _has_design_elements(design: dict) -> bool:
+    """elements が設計の要素（type と prompt / content を持つ dict）を含むか"""
+    elements = design.get("elements")
+    if not isinstance(elements, list):
+        return False
+    return any(
+        isinstance(elem, dict) and elem.get("type") and (elem.get("prompt") or elem.get("content"))
+        for elem in elements
+    )
+
+
+def _output_name(item_id: str) -> str:
+    """項目IDから出力ファイル名（拡張子なし）を作成"""
+    stem = os.path.splitext(item_id)[0]
+    return stem.replace(os.sep, "__").replace("/", "__")
+
+
+def convert_item(item: dict, output_dir: str, mode: str = "slide") -> dict:
+    """
+    1項目をPPTXに変換する（プロセスプールのワーカーで実行）
+
+    Args:
+        item: collect_items の1項目
+        output_dir: 出力先
+        mode: 画像の変換方法（MODES）
+
+    Returns:
+        dict: {"id", "status": "done" | "failed", "output", "seconds", "error"}
+    """
+    start = time.perf_counter()
+    path = Path(item["path"])
+    name = _output_name(item["id"])
+    try:
+        if item["kind"] == "design":
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("slides"), list):
+                # 生成に失敗したスライド（None）は飛ばす
+                slides = [
+                    design_to_pptx_elements(design, path.parent, file_prefix=f"slide{n + 1:02d}_")
+                    for n, design in enumerate(data["slides"])
+                    if isinstance(design, dict)
+                ]
+            else:
+                design = data["design"] if isinstance(data.get("design"), dict) else data
+                slides = [design_to_pptx_elements(design, path.parent)]
+        elif mode == "editable":
+            result = image_to_editable_pptx(path, session_id=name, output_dir=Path(output_dir))
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "image_to_editable_pptx failed"))
+            return {
+                "id": item["id"],
+                "status": "done",
+                "output": result["file_path"],
+                "seconds": round(time.perf_counter() - start, 3)
+            }
+        else:
+            slides = [[{"id": "background", "type": "background", "file_path": str(path)}]]
+
+        slides = [elements for elements in slides if elements]
+        if not slides:
+            raise ValueError("No elements to place")
+
+        result = image_to_pptx(elements=[], session_id=name, output_dir=Path(output_dir), slides=slides)
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "image_to_pptx failed"))
+
+        return {
+            "id": item["id"],
+            "status": "done",
+            "output": result["file_path"],
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+    except Exception as e:
+        return {
+            "id": item["id"],
+            "status": "failed",
+            "error": f"{type(e).__name__}: {e}",
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+
+def load_manifest(path: Path) -> dict:
+    """
+    マニフェストを読み込む（無ければ空）
+
+    同じディレクトリに追記ログ（中断された実行の結果）があれば、その内容で上書きする。
+    """
+    manifest = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    journal_path = path.with_name(JOURNAL_NAME)
+    if journal_path.exists():
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で中断された最後の行
+                    continue
+                manifest[result["id"]] = result
+    return manifest
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    """
+    マニフェストを書き込み、まとめ終えた追記ログを削除する
+
+    途中で中断されても壊れないよう置き換えで保存する（ログの削除前に中断されても、再読み込みの結果は同じ）。
+    """
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    try:
+        os.remove(path.with_name(JOURNAL_NAME))
+    except FileNotFoundError:
+        pass
+
+
+def run_batch(
+    source: Path,
+    output_dir: Path,
+    workers: Optional[int] = None,
+    retry_failed: bool = False,
+    force: bool = False,
+    mode: str = "slide"
+) -> dict:
+    """
+    バッチ変換を実行する
+
+    Args:
+        source: 入力ディレクトリまたはマニフェスト
+        output_dir: PPTXの出力先（batch_manifest.json もここに保存）
+        workers: プロセス数（省略時は CPU 数）
+        retry_failed: True で前回失敗した項目も再実行する
+        force: True で完了済みの項目も再実行する
+        mode: 画像の変換方法（slide / editable）
+
+    Returns:
+        dict: {"total", "done", "failed", "skipped", "seconds", "items_per_second"}
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    if (output_dir / JOURNAL_NAME).exists():
+        # 中断された実行の追記ログを先にまとめる（途中で切れた行の後ろに追記しない）
+        save_manifest(manifest_path, manifest)
+
+    items = collect_items(source, exclude=output_dir)
+    pending = []
+    for item in items:
+        status = manifest.get(item["id"], {}).get("status")
+        if force or status is None or (status == "failed" and retry_failed):
+            pending.append(item)
+    skipped = len(items) - len(pending)
+    print(f"対象: {len(items)}件（実行: {len(pending)}件、スキップ: {skipped}件）", file=sys.stderr)
+
+    done = failed = 0
+    start = time.perf_counter()
+    if pending:
+        # 結果は1件ずつ追記ログに書き、マニフェスト全体の書き直しは最後の1回だけにする
+        with ProcessPoolExecutor(max_workers=workers) as pool, \
+                open(output_dir / JOURNAL_NAME, "a", encoding="utf-8") as journal:
+            futures = [pool.submit(convert_item, item, str(output_dir), mode) for item in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                manifest[result["id"]] = result
+                journal.write(json.dumps(result, ensure_ascii=False) + "\n")
+                journal.flush()
+                if result["status"] == "done":
+                    done += 1
+                else:
+                    failed += 1
+                    print(f"  失敗: {result['id']}: {result.get('error')}", file=sys.stderr)
+        save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "total": len(items),
+        "done": done,
+        "failed": failed,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "items_per_second": round((done + failed) / elapsed, 2) if elapsed > 0 else 0.0,
+        "manifest": str(manifest_path)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="設計JSON・画像をまとめてPPTXに変換")
+    parser.add_argument("source", help="入力ディレクトリ、またはパスの一覧（.txt / .json）")
+    parser.add_argument("--output", "-o", default="batch_output", help="出力ディレクトリ")
+    parser.add_argument("--workers", "-j", type=int, default=None, help="プロセス数（デフォルト: CPU数）")
+    parser.add_argument("--retry-failed", action="store_true", help="前回失敗した項目も再実行")
+    parser.add_argument("--force", action="store_true", help="完了済みの項目も再実行")
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="slide",
+        help="画像の変換方法（slide: 全画面背景 / editable: 要素を識別して編集可能なPPTXにする。API を呼ぶ）"
+    )
+    args = parser.parse_args()
+
+    summary = run_batch(
+        Path(args.source),
+        Path(args.output),
+        workers=args.workers,
+        retry_failed=args.retry_failed,
+        force=args.force,
+        mode=args.mode
+    )
+    print(
+        f"完了: {summary['done']}件 / 失敗: {summary['failed']}件 / スキップ: {summary['skipped']}件 "
+        f"（{summary['seconds']:.1f}秒、{summary['items_per_second']:.2f}件/秒）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+コンテンツアドレス方式の画像ストア
+セッション間で同じ内容の画像（refine の再利用・キャッシュヒット・再実行）を1つの実体にまとめる
+
+- 実体はセッション出力のルート（通常 agent_output）の _blobs/{sha256先頭2文字}/{sha256}.{拡張子} に1つだけ保存
+  （ルートごとにストアを分け、ハードリンクが同じファイルシステム内で張れるようにする）
+- セッションのファイル（background.png など）は実体へのハードリンク（できなければコピー）
+- セッションごとの blobs.json に「ファイル名 → sha256」を記録し、参照数の集計と削除に使う
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .tools.image_handle import ImageHandle
+
+# セッション出力の既定のルート（designer_agent.AGENT_OUTPUT_DIR の既定値と同じ）
+OUTPUT_DIR = Path(__file__).parent.parent / "agent_output"
+
+# 実体の保存先のディレクトリ名（セッション出力のルート直下）
+BLOB_DIR_NAME = "_blobs"
+
+# 実体の保存先を固定する場合に指定（未指定ならセッション出力のルート/_blobs）
+BLOB_DIR_OVERRIDE = os.environ.get("BLOB_STORE_DIR")
+
+# 0 でストアを使わずセッションごとに書き出す
+USE_BLOB_STORE = os.environ.get("BLOB_STORE", "1") == "1"
+
+# セッションごとの参照一覧のファイル名
+MANIFEST_NAME = "blobs.json"
+
+# gc で削除しない新しい実体の猶予（秒）。保存直後でまだ参照が記録されていない実体を守る
+GC_GRACE_SECONDS = float(os.environ.get("BLOB_STORE_GC_GRACE_SECONDS", "3600"))
+
+# link の途中で実体が gc に削除された場合に保存し直す回数
+_LINK_ATTEMPTS = 3
+
+
+class BlobStore:
+    """ハードリンクで共有する画像ストア（参照数は各セッションの blobs.json から集計）"""
+
+    def __init__(self, output_dir: Path = OUTPUT_DIR, blob_dir: Optional[Path] = None):
+        """
+        Args:
+            output_dir: セッションディレクトリのルート（参照数の集計対象）
+            blob_dir: 実体の保存先（省略時は output_dir/_blobs）
+        """
+        self.output_dir = Path(output_dir)
+        self.blob_dir = Path(blob_dir) if blob_dir else self.output_dir / BLOB_DIR_NAME
+        self._lock = threading.Lock()
+
+    def blob_path(self, sha256: str, extension: str) -> Path:
+        return self.blob_dir / sha256[:2] / f"{sha256}.{extension}"
+
+    def put(self, image: ImageHandle) -> Path:
+        """実体を保存する（同じ内容が既にあれば書き込まず、更新日時だけを更新する）"""
+        path = self.blob_path(image.sha256, image.extension)
+        try:
+            # 再利用する実体も更新日時を新しくし、gc の猶予期間に入れる
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(image.data)
+        os.replace(tmp_path, path)
+        return path
+
+    def link(self, image: ImageHandle, target: Union[str, Path], record: bool = True) -> Path:
+        """
+        画像をセッションのファイルとして配置する
+
+        実体をストアに保存し、target をそのハードリンクにする（別ファイルシステム等ではコピー）。
+        target のディレクトリの blobs.json に参照を記録する。
+
+        Args:
+            image: 配置する画像
+            target: セッション内の保存先（例: agent_output/{session_id}/background.png）
+            record: False で blobs.json に記録しない（画像生成キャッシュのエントリなど。
+                    ハードリンクであればリンク数で参照中と判定される）
+
+        Returns:
+            Path: target
+        """
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # 既存ファイルに上書きすると、それがリンクしている実体まで書き換わるため置き換える
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        for attempt in range(1, _LINK_ATTEMPTS + 1):
+            blob = self.put(image)
+            try:
+                _link_or_copy(blob, tmp_path)
+                break
+            except FileNotFoundError:
+                # put の後に別プロセスの gc が実体を削除した場合は保存し直す
+                if attempt == _LINK_ATTEMPTS:
+                    raise
+        os.replace(tmp_path, target)
+
+        if record:
+            self._record(target.parent, target.name, image.sha256, image.extension)
+        return target
+
+    def _record(self, session_dir: Path, filename: str, sha256: str, extension: str) -> None:
+        with self._lock:
+            manifest = load_manifest(session_dir)
+            manifest[filename] = {"sha256": sha256, "extension": extension}
+            _write_manifest(session_dir, manifest)
+
+    def refcounts(self) -> Dict[str, int]:
+        """
+        実体ごとの参照数（sha256 → 参照しているセッションファイルの数）
+
+        blobs.json に記録されていても、セッションのファイルが削除済みのものは数えない。
+        """
+        counts: Dict[str, int] = {}
+        if not self.output_dir.exists():
+            return counts
+        for session_dir in self.output_dir.iterdir():
+            if not session_dir.is_dir() or session_dir.name.startswith("_"):
+                continue
+            for filename, entry in load_manifest(session_dir).items():
+                if (session_dir / filename).exists():
+                    counts[entry["sha256"]] = counts.get(entry["sha256"], 0) + 1
+        return counts
+
+    def gc(self, dry_run: bool = False, grace_seconds: float = GC_GRACE_SECONDS) -> dict:
+        """
+        どのセッションからも参照されていない実体を削除する
+
+        blobs.json に参照が無くても、ハードリンクが残っている実体（別のルートのセッション・
+        画像生成キャッシュなどから張られたもの）は削除しない。
+        保存・再利用から grace_seconds 以内の実体も、リンク・記録の途中の可能性があるため削除しない。
+
+        Args:
+            dry_run: True で削除せず対象だけを数える
+            grace_seconds: 削除しない新しい実体の猶予（秒）
+
+        Returns:
+            dict: {"removed": 削除した件数, "freed_bytes": 解放したバイト数, "kept": 残した件数}
+        """
+        counts = self.refcounts()
+        cutoff = time.time() - grace_seconds
+        removed = kept = freed = 0
+        for path in self._blobs():
+            sha256 = path.name.split(".", 1)[0]
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if counts.get(sha256, 0) > 0 or stat.st_nlink > 1 or stat.st_mtime > cutoff:
+                kept += 1
+                continue
+            try:
+                size = stat.st_size
+                if not dry_run:
+                    path.unlink()
+            except OSError:
+                continue
+            removed += 1
+            freed += size
+        return {"removed": removed, "freed_bytes": freed, "kept": kept}
+
+    def remove_session(self, session_id: str, grace_seconds: float = GC_GRACE_SECONDS) -> dict:
+        """セッションのディレクトリを削除し、参照されなくなった実体も削除する（gc と同じ猶予）"""
+        session_dir = self.output_dir / session_id
+        if session_dir.exists():
+            shutil.rmtree(session_dir)
+        return self.gc(grace_seconds=grace_seconds)
+
+    def stats(self) -> dict:
+        """
+        使用状況
+
+        Returns:
+            dict: {"blobs": 実体の数, "bytes": 実体の合計サイズ,
+                   "references": 参照数の合計, "logical_bytes": 重複を含めた場合の合計サイズ}
+        """
+        counts = self.refcounts()
+        blobs = total = logical = 0
+        for path in self._blobs():
+            size = path.stat().st_size
+            blobs += 1
+            total += size
+            logical += size * counts.get(path.name.split(".", 1)[0], 0)
+        return {
+            "blobs": blobs,
+            "bytes": total,
+            "references": sum(counts.values()),
+            "logical_bytes": logical
+        }
+
+    def _blobs(self):
+        if not self.blob_dir.exists():
+            return []
+        return [p for p in self.blob_dir.glob("*/*") if p.is_file() and not p.name.startswith(".")]
+
+
+def _link_or_copy(blob: Path, target: Path) -> None:
+    """実体へのハードリンクを作る（別ファイルシステム等ではコピー。実体が無ければ FileNotFoundError）"""
+    try:
+        os.link(blob, target)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(blob, target)
+
+
+def load_manifest(session_dir: Union[str, Path]) -> dict:
+    """セッションの blobs.json を読み込む（無ければ空）"""
+    path = Path(session_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(session_dir: Path, manifest: dict) -> None:
+    path = session_dir / MANIFEST_NAME
+    tmp_path = path.with_name(f".{MANIFEST_NAME}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(output_dir: Optional[Union[str, Path]] = None) -> BlobStore:
+    """
+    セッション出力のルートごとのプロセス共通ストアを取得
+
+    Args:
+        output_dir: セッション出力のルート（省略時は agent_output）
+    """
+    root = Path(output_dir) if output_dir else OUTPUT_DIR
+    key = str(root.resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = BlobStore(root, blob_dir=Path(BLOB_DIR_OVERRIDE) if BLOB_DIR_OVERRIDE else None)
+            _stores[key] = store
+        return store
+
+
+def main():
+    """CLI: python -m agents.blob_store {stats,gc,remove} [session_id ...]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="画像ストアの使用状況の確認・掃除")
+    parser.add_argument("command", choices=["stats", "gc", "remove"], help="stats: 使用状況 / gc: 未参照の実体を削除 / remove: セッションを削除")
+    parser.add_argument("session_ids", nargs="*", help="remove するセッションID")
+    parser.add_argument("--dry-run", action="store_true", help="gc で削除せず件数だけを表示")
+    parser.add_argument("--output-dir", default=None, help="セッション出力のルート（デフォルト: agent_output）")
+    parser.add_argument("--grace-seconds", type=float, default=GC_GRACE_SECONDS, help=f"保存・再利用からこの秒数以内の実体は削除しない（デフォルト: {GC_GRACE_SECONDS:g}）")
+    args = parser.parse_args()
+
+    store = get_blob_store(args.output_dir)
+    if args.command == "stats":
+        result = store.stats()
+    elif args.command == "gc":
+        result = store.gc(dry_run=args.dry_run, grace_seconds=args.grace_seconds)
+    else:
+        for session_id in args.session_ids:
+            session_dir = store.output_dir / session_id
+            if session_dir.exists():
+                shutil.rmtree(session_dir)
+        result = store.gc(grace_seconds=args.grace_seconds)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+セッションのチェックポイント
+各フェーズの出力（リクエスト・リサーチ・推論・設計）と要素ごとの画像生成状況を
+agent_output/{session_id}/checkpoint.json に記録し、途中で失敗したセッションを続きから再開できるようにする
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from .tools.image_handle import ImageHandle
+
+# チェックポイントのファイル名
+CHECKPOINT_FILE = "checkpoint.json"
+
+# 参照画像の保存名（拡張子は ImageHandle から決定）
+REFERENCE_IMAGE_NAME = "reference"
+
+# 記録するフェーズ（実行順）
+PHASES = ("web_research", "reasoning", "design_raw", "design")
+
+
+class SessionCheckpoint:
+    """
+    1セッション分のチェックポイント
+
+        checkpoint = SessionCheckpoint(output_dir)
+        if checkpoint.has("reasoning"):
+            reasoning = checkpoint.get("reasoning")
+        ...
+        checkpoint.set("reasoning", reasoning)
+
+    フェーズの値が None（例: Webリサーチ不要）でも「完了」として記録する。
+    書き込みは毎回一時ファイルからの置き換えで行い、途中で中断されても壊れない。
+    """
+
+    def __init__(self, output_dir: Path, data: Optional[dict] = None):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / CHECKPOINT_FILE
+        self.data: dict = data or {"status": "running", "request": None, "phases": {}, "elements": {}}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_dir: Path) -> Optional["SessionCheckpoint"]:
+        """保存済みのチェックポイントを読み込む（無ければ None）"""
+        path = Path(output_dir) / CHECKPOINT_FILE
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(output_dir, json.load(f))
+
+    @property
+    def status(self) -> str:
+        """セッションの状態（running / completed / failed）"""
+        return self.data.get("status", "running")
+
+    @property
+    def request(self) -> Optional[dict]:
+        return self.data.get("request")
+
+    def set_request(self, request: dict, reference_image: Optional[str] = None) -> None:
+        """
+        リクエスト内容を記録する
+
+        Args:
+            request: generate の引数（参照画像以外）
+            reference_image: 参照画像のBase64（元の形式のままファイルとして保存し、パスを記録する）
+        """
+        request = dict(request)
+        if reference_image:
+            # MIMEタイプは内容から判定し、JPEG などを .png として保存しない
+            image = ImageHandle.from_base64(reference_image)
+            path = image.save(self.output_dir / f"{REFERENCE_IMAGE_NAME}.{image.extension}")
+            request["reference_image_path"] = str(path)
+        with self._lock:
+            self.data["request"] = request
+            self.data["status"] = "running"
+            self._save()
+
+    def reference_image(self) -> Optional[str]:
+        """記録した参照画像をBase64で返す"""
+        path = (self.request or {}).get("reference_image_path")
+        if not path or not Path(path).exists():
+            return None
+        return ImageHandle.from_file(path).to_base64()
+
+    def has(self, phase: str) -> bool:
+        """フェーズが完了しているか"""
+        return phase in self.data["phases"]
+
+    def get(self, phase: str) -> Any:
+        return self.data["phases"].get(phase)
+
+    def set(self, phase: str, value: Any) -> None:
+        """
+        フェーズの出力を記録する
+
+        設計（design_raw）を記録し直した場合、それ以降のフェーズと要素の状況は破棄する。
+        """
+        with self._lock:
+            phases = self.data["phases"]
+            if phase in PHASES:
+                for later in PHASES[PHASES.index(phase) + 1:]:
+                    phases.pop(later, None)
+            if phase == "design_raw":
+                self.data["elements"] = {}
+            phases[phase] = value
+            self._save()
+
+    def element(self, key: str) -> Optional[dict]:
+        """要素の生成状況 {"status", "file_path", "error"}"""
+        return self.data["elements"].get(key)
+
+    def completed_image(self, key: str) -> Optional[str]:
+        """生成済みで画像ファイルが残っている要素のパス（無ければ None）"""
+        entry = self.element(key)
+        if entry and entry.get("status") == "done" and entry.get("file_path") and Path(entry["file_path"]).exists():
+            return entry["file_path"]
+        return None
+
+    def set_element(self, key: str, status: str, file_path: Optional[str] = None, error: Optional[str] = None) -> None:
+        """
+        要素の生成状況を記録する
+
+        Args:
+            key: 要素の保存名（background / image_1 / slide01_image_1 など）
+            status: "done" / "failed"
+            file_path: 保存した画像のパス
+            error: 失敗時のエラー
+        """
+        entry = {"status": status}
+        if file_path:
+            entry["file_path"] = file_path
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.data["elements"][key] = entry
+            self._save()
+
+    def finish(self, success: bool, error: Optional[str] = None) -> None:
+        """セッション全体の結果を記録する"""
+        with self._lock:
+            self.data["status"] = "completed" if success else "failed"
+            if error:
+                self.data["error"] = error
+            else:
+                self.data.pop("error", None)
+            self._save()
+
+    def _save(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
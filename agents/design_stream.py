@@ -0,0 +1,118 @@
+"""
+設計JSONのストリーミングパーサー
+ストリーミング応答の断片を順に受け取り、トップレベルの meta と
+elements 配列の各要素を、閉じ括弧が届いた時点で1つずつ取り出す
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+
+class DesignStreamParser:
+    """
+    設計JSONの逐次パーサー
+
+        parser = DesignStreamParser()
+        for chunk in stream:
+            for event in parser.feed(chunk.text):
+                ...  # ("meta", dict) / ("element", index, dict)
+
+    JSON より前の文字列（```json など）は読み飛ばす。
+    完成した要素が不正なJSONだった場合はイベントを出さない（最終的な全文パースに任せる）。
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.meta: Optional[dict] = None
+        self.element_count = 0
+        self._pos = 0
+        self._started = False
+        # 開いている括弧（"{" / "["）
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # 深さ1（トップレベルのオブジェクト）で直前に読んだ文字列と、現在のキー
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        # 取り出し中の値の開始位置
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple]:
+        """
+        断片を追加し、新たに完成した meta / 要素を返す
+
+        Args:
+            chunk: ストリーミング応答のテキスト断片
+
+        Returns:
+            list: ("meta", dict) または ("element", index, dict) のリスト
+        """
+        events: List[Tuple] = []
+        if not chunk:
+            return events
+        self.text += chunk
+        text = self.text
+
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append("{")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = text[self._string_start + 1:pos]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":" and len(self._stack) == 1:
+                self._key = self._last_string
+            elif char in "{[":
+                self._stack.append(char)
+                depth = len(self._stack)
+                if depth == 2 and self._key == "meta" and char == "{":
+                    self._value_start = pos
+                elif depth == 3 and self._key == "elements" and self._stack[1] == "[" and char == "{":
+                    self._value_start = pos
+            elif char in "}]":
+                depth = len(self._stack)
+                if self._stack:
+                    self._stack.pop()
+                if self._value_start is None:
+                    continue
+                if depth == 2 and self._key == "meta":
+                    value = self._load(text[self._value_start:pos + 1])
+                    self._value_start = None
+                    if value is not None:
+                        self.meta = value
+                        events.append(("meta", value))
+                elif depth == 3 and self._key == "elements":
+                    value = self._load(text[self._value_start:pos + 1])
+                    self._value_start = None
+                    index = self.element_count
+                    self.element_count += 1
+                    if value is not None:
+                        events.append(("element", index, value))
+
+        self._pos = len(text)
+        return events
+
+    @staticmethod
+    def _load(fragment: str) -> Optional[dict]:
+        try:
+            value = json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
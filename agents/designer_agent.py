@@ -11,21 +11,40 @@ Designer Agent
 
 import os
 import json
-import base64
+import asyncio
 import re
-import io
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Awaitable, Callable, Optional, List, Union
 from dotenv import load_dotenv
 from google import genai  # type: ignore
-from google.genai.types import GenerateContentConfig, GoogleSearch, Tool
-from PIL import Image
+from google.genai.types import GenerateContentConfig, GoogleSearch, Part, Tool
 
 # ツール
+from .tools.aio import run_sync
+from .tools.client_pool import get_shared_client
+from .tools.image_handle import ImageHandle, encode_images
+from .tools.retry import RetryPolicy
+from .tools.image_cache import make_cache_key
+from .tools.decoded_images import get_decoded_image_cache
 from .tools.text_to_image import text_to_image as _text_to_image
-from .tools.image_to_pptx import image_to_pptx as _image_to_pptx
+from .tools.image_to_pptx import generate_session_id, image_to_pptx as _image_to_pptx
 from .tools.design_references import get_references_summary, search_references
 
+# テキストフェーズの応答キャッシュ
+from .response_cache import ResponseCache, get_response_cache, make_key, MISS
+
+# 計測
+from .tracing import Tracer, span, current_span
+from .tools.gemini import agenerate_content, agenerate_content_stream
+from .design_stream import DesignStreamParser
+
+# 途中再開用のチェックポイント
+from .checkpoint import SessionCheckpoint
+
+# セッション間で画像の実体を共有するストア
+from .blob_store import USE_BLOB_STORE, get_blob_store
+
 # プリセットシステム
 from .presets import get_preset_summary, LAYOUTS, PALETTES, TONES
 from .preset_resolver import resolve_presets, get_prompt_for_preset_selection
@@ -33,12 +52,22 @@ from .preset_resolver import resolve_presets, get_prompt_for_preset_selection
 # .env.local を読み込み
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env.local'))
 
+# 画像の生成結果に影響する generate_image の引数（要素の内容ハッシュに使う）
+GENERATION_PARAMS = ("prompt", "style_description", "aspect_ratio", "image_size", "no_text")
+
 # 出力ディレクトリ（セッションIDごとにまとめる）
 AGENT_OUTPUT_DIR = Path(__file__).parent.parent / "agent_output"
 
 # 設計フェーズ用のモデル
 DESIGN_MODEL = "gemini-3-pro-preview"
 
+# 要素生成（背景・画像）の同時実行数の上限
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("DESIGNER_MAX_CONCURRENCY", "4"))
+
+# 生成したPPTXの画像を配置サイズに合わせて縮小・再エンコードする（0 で生成画像をそのまま埋め込む）
+# セッションに保存する画像ファイルは変更しない
+DESIGNER_OPTIMIZE_MEDIA = os.environ.get("DESIGNER_OPTIMIZE_MEDIA", "1") == "1"
+
 # Reasoning フェーズ用プロンプト
 REASONING_PROMPT = """あなたは優秀なビジュアルデザイナーです。
 ユーザーの指示を深く分析し、最適なデザインを考えてください。
@@ -398,14 +427,22 @@ def get_session_output_dir(session_id: str) -> Path:
     return output_dir
 
 
-def save_image(image_base64: str, filename: str, session_id: str) -> str:
-    """画像を保存してパスを返す"""
-    output_dir = get_session_output_dir(session_id)
-    output_path = output_dir / f"{filename}.png"
+def save_image(image: Union[ImageHandle, str], filename: str, session_id: str) -> str:
+    """
+    画像を保存してパスを返す（ImageHandle はバイト列をそのまま書き出す）
 
-    image_data = base64.b64decode(image_base64)
-    with open(output_path, 'wb') as f:
-        f.write(image_data)
+    画像ストアが有効な場合、実体は出力ルート（AGENT_OUTPUT_DIR）の _blobs に1つだけ保存し、
+    セッションのファイルはそのハードリンクにする（同じ画像を複数セッションで共有）。
+    """
+    if not isinstance(image, ImageHandle):
+        image = ImageHandle.from_base64(image)
+
+    output_dir = get_session_output_dir(session_id)
+    output_path = output_dir / f"{filename}.{image.extension}"
+    if USE_BLOB_STORE:
+        get_blob_store(AGENT_OUTPUT_DIR).link(image, output_path)
+    else:
+        image.save(output_path)
 
     return str(output_path)
 
@@ -434,6 +471,31 @@ def save_design(
     return str(output_path)
 
 
+def save_deck(
+    designs: List[Optional[dict]],
+    session_id: str,
+    outline: List[str],
+    reasoning: Optional[str] = None,
+    web_research: Optional[dict] = None
+) -> str:
+    """デッキ（複数スライド）の設計JSONを保存してパスを返す"""
+    output_dir = get_session_output_dir(session_id)
+    output_path = output_dir / "deck.json"
+
+    data = {
+        "session_id": session_id,
+        "outline": outline,
+        "slides": designs,
+        "reasoning": reasoning,
+        "web_research": web_research
+    }
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    return str(output_path)
+
+
 def load_design(session_id: str) -> Optional[dict]:
     """保存された設計JSONを読み込む"""
     output_dir = get_session_output_dir(session_id)
@@ -445,35 +507,194 @@ def load_design(session_id: str) -> Optional[dict]:
         return json.load(f)
 
 
+def element_filenames(elements: List[dict]) -> dict:
+    """
+    画像を生成する要素（prompt を持つ background / image）の保存名を列挙する
+
+    Returns:
+        dict: 要素インデックス → 拡張子なしのファイル名（background, image_1, image_2, ...）
+    """
+    filenames = {}
+    image_count = 0
+    for i, elem in enumerate(elements):
+        if not elem.get("prompt"):
+            continue
+        if elem.get("type") == "background":
+            filenames[i] = "background"
+        elif elem.get("type") == "image":
+            image_count += 1
+            filenames[i] = f"image_{image_count}"
+    return filenames
+
+
+def to_pptx_element(
+    elem: dict,
+    index: int,
+    image: Optional[ImageHandle] = None,
+    file_path: Optional[str] = None
+) -> Optional[dict]:
+    """
+    設計JSONの1要素を image_to_pptx 用の要素に変換する
+
+    Args:
+        elem: 設計JSONの要素
+        index: elements 配列内の位置（id が無い場合の識別子に使う）
+        image: 生成済みの画像（background / image 要素）
+        file_path: 画像の保存先（background / image 要素）
+
+    Returns:
+        dict: image_to_pptx の要素。変換できない要素（画像が無い・テキストが空・shape）は None
+    """
+    elem_type = elem.get("type")
+    elem_id = elem.get("id", f"{elem_type}_{index}")
+    position = elem.get("position", {})
+
+    if elem_type in ("background", "image"):
+        if image is None and not file_path:
+            return None
+        pptx_elem = {"id": elem_id, "type": elem_type, "file_path": file_path}
+        if image is not None:
+            pptx_elem["image"] = image
+        if elem_type == "image":
+            pptx_elem["bbox"] = {
+                "x": position.get("x", 0),
+                "y": position.get("y", 0),
+                "width": position.get("width", 400),
+                "height": position.get("height", 400)
+            }
+        return pptx_elem
+
+    if elem_type == "text" and elem.get("content"):
+        style = elem.get("style", {})
+        return {
+            "id": elem_id,
+            "type": "text",
+            "content": elem["content"],
+            "bbox": {
+                "x": position.get("x", 960),
+                "y": position.get("y", 400),
+                "width": position.get("width", 1600),
+                "height": position.get("height", 100)
+            },
+            "style": {
+                "fontSize": style.get("fontSize", 48),
+                "fontWeight": style.get("fontWeight", "normal"),
+                "fontStyle": style.get("fontStyle", "normal"),
+                "color": style.get("color", "#FFFFFF"),
+                "align": style.get("align", "center")
+            }
+        }
+
+    return None
+
+
+def design_to_pptx_elements(design: dict, image_dir: Path, file_prefix: str = "") -> List[dict]:
+    """
+    保存済みの設計JSONと画像ファイルから image_to_pptx 用の要素リストを作成する（画像は再生成しない）
+
+    Args:
+        design: 設計JSON（elements配列を含む）
+        image_dir: 生成済み画像（background.png, image_1.png, ...）のあるディレクトリ
+        file_prefix: 画像ファイル名の接頭辞（デッキの slide01_ など）
+
+    Returns:
+        list: 要素リスト（画像ファイルが見つからない要素は含めない）
+    """
+    elements = design.get("elements", [])
+    filenames = element_filenames(elements)
+    pptx_elements = []
+    for i, elem in enumerate(elements):
+        file_path = None
+        if i in filenames:
+            matches = sorted(Path(image_dir).glob(f"{file_prefix}{filenames[i]}.*"))
+            file_path = str(matches[0]) if matches else None
+        pptx_elem = to_pptx_element(elem, i, file_path=file_path)
+        if pptx_elem is not None:
+            pptx_elements.append(pptx_elem)
+    return pptx_elements
+
+
+def element_key(elem: dict, index: int) -> str:
+    """設計の差分で要素を対応付けるキー（id が無ければ種類とインデックス）"""
+    return elem.get("id") or f"{elem.get('type')}_{index}"
+
+
+def image_content_hash(params: dict) -> str:
+    """画像生成の引数のうち、生成結果に影響するものだけから求めたハッシュ"""
+    return make_cache_key(**{key: params.get(key) for key in GENERATION_PARAMS})
 
 
 class DesignerAgent:
     """画像デザインを生成するエージェント（要素別生成版）"""
 
-    def __init__(self, api_key: Optional[str] = None, session_id: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        session_id: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        client: Optional[genai.Client] = None,
+        use_image_cache: bool = True,
+        response_cache: Optional[ResponseCache] = None,
+        use_response_cache: bool = True,
+        trace_exporter: Optional[Callable[[dict], None]] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        stream_design: bool = True,
+        optimize_media: bool = DESIGNER_OPTIMIZE_MEDIA
+    ):
         self.api_key: str = api_key or os.environ.get("GOOGLE_API_KEY") or ""
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY is required")
 
-        self.client = genai.Client(api_key=self.api_key)
-        self.session_id: str = session_id or self._generate_session_id()
-
-    def _generate_session_id(self) -> str:
-        """セッションIDを生成"""
-        import random
-        import string
-        chars = string.ascii_uppercase + string.digits
-        return ''.join(random.choices(chars, k=4)) + '-' + ''.join(random.choices(string.digits, k=4))
-
-    def _base64_to_pil(self, image_base64: str) -> Image.Image:
-        """Base64画像をPIL Imageに変換"""
-        image_bytes = base64.b64decode(image_base64)
-        return Image.open(io.BytesIO(image_bytes))
+        # 省略時は API Key ごとのプロセス共通クライアント（接続を使い回す）
+        self.client = client or get_shared_client(self.api_key)
+        self.session_id: str = session_id or generate_session_id()
+        self.max_concurrency: int = max(1, max_concurrency)
+        # False にすると同一プロンプトでも画像を再生成する
+        self.use_image_cache: bool = use_image_cache
+        # テキストフェーズの応答キャッシュ（省略時はプロセス共通のキャッシュ）
+        self.response_cache: Optional[ResponseCache] = None
+        if use_response_cache:
+            self.response_cache = response_cache or get_response_cache()
+        # トレース完了時に呼ばれるコールバック（省略時は set_trace_exporter の設定）
+        self.trace_exporter = trace_exporter
+        # 画像生成のリトライ・ヘッジング設定（省略時は既定値）
+        self.retry_policy = retry_policy
+        # 設計JSONをストリーミングで受け取り、要素が揃った順に画像生成を開始する
+        self.stream_design: bool = stream_design
+        # PPTXに埋め込む画像を配置サイズに合わせて最適化する（image_to_pptx の optimize_media）
+        self.optimize_media: bool = optimize_media
+
+    def _cache_get(self, phase: str, key: str):
+        """応答キャッシュから取得（キャッシュ無効時は常に MISS）"""
+        if self.response_cache is None:
+            return MISS
+        value = self.response_cache.get(phase, key)
+        current = current_span()
+        if current is not None:
+            current.set(cache_hit=value is not MISS)
+        return value
+
+    def _cache_set(self, phase: str, key: str, value) -> None:
+        """応答キャッシュに保存"""
+        if self.response_cache is not None:
+            self.response_cache.set(phase, key, value)
+
+    def _reference_part(self, image_base64: str) -> Part:
+        """参照画像をリクエスト用のパートに変換（デコード・縮小はプロセス内で1回だけ）"""
+        return get_decoded_image_cache().get(image_base64).part
 
     def _web_research(
         self,
         user_prompt: str,
         input_image: Optional[str] = None
+    ) -> Optional[dict]:
+        """Web検索でデザイン参考情報を収集（_aweb_research の同期ラッパー）"""
+        return run_sync(self._aweb_research(user_prompt, input_image=input_image))
+
+    async def _aweb_research(
+        self,
+        user_prompt: str,
+        input_image: Optional[str] = None
     ) -> Optional[dict]:
         """
         Web検索でデザイン参考情報を収集（エージェントが自律判断）
@@ -493,25 +714,34 @@ class DesignerAgent:
             prompt = WEB_RESEARCH_PROMPT.format(user_prompt=user_prompt)
             contents.append(prompt)
 
+            cache_key = make_key(DESIGN_MODEL, prompt, input_image)
+            cached = self._cache_get("web_research", cache_key)
+            if cached is not MISS:
+                print("  (キャッシュ)")
+                return cached
+
             # 参照画像がある場合は追加
             if input_image:
-                contents.append(self._base64_to_pil(input_image))
+                contents.append(self._reference_part(input_image))
 
             # Google Search ツールを有効化
             config = GenerateContentConfig(
                 tools=[Tool(google_search=GoogleSearch())]
             )
 
-            response = self.client.models.generate_content(
+            response = await agenerate_content(
+                self.client,
                 model=DESIGN_MODEL,
                 contents=contents,
-                config=config
+                config=config,
+                name="web_research"
             )
 
             result_text = response.text or ""
 
             # 検索不要の場合
             if not result_text or "検索不要" in result_text:
+                self._cache_set("web_research", cache_key, None)
                 return None
 
             # グラウンディングメタデータを抽出
@@ -527,10 +757,12 @@ class DesignerAgent:
                     ]
                 }
 
-            return {
+            research = {
                 "research": result_text,
                 "grounding": grounding_metadata
             }
+            self._cache_set("web_research", cache_key, research)
+            return research
 
         except Exception as e:
             print(f"  [Warning] Web Research failed: {str(e)}")
@@ -541,6 +773,15 @@ class DesignerAgent:
         user_prompt: str,
         input_image: Optional[str] = None,
         web_research: Optional[dict] = None
+    ) -> str:
+        """デザイン方針を決定（_areason の同期ラッパー）"""
+        return run_sync(self._areason(user_prompt, input_image=input_image, web_research=web_research))
+
+    async def _areason(
+        self,
+        user_prompt: str,
+        input_image: Optional[str] = None,
+        web_research: Optional[dict] = None
     ) -> str:
         """ユーザーのプロンプトを深く分析してデザイン方針を決定
 
@@ -552,8 +793,6 @@ class DesignerAgent:
         Returns:
             str: 分析結果（reasoning）
         """
-        contents: List = []
-
         text_prompt = REASONING_PROMPT + "\n\n## ユーザーの指示\n" + user_prompt
 
         # デザイン参照情報を追加
@@ -564,7 +803,7 @@ class DesignerAgent:
         # Web Research 結果を追加
         if web_research:
             text_prompt += "\n\n## Webリサーチ結果\n" + web_research["research"]
-            if web_research.get("grounding", {}).get("sources"):
+            if (web_research.get("grounding") or {}).get("sources"):
                 text_prompt += "\n\n### 参照ソース:\n"
                 for src in web_research["grounding"]["sources"][:5]:
                     text_prompt += f"- [{src['title']}]({src['uri']})\n"
@@ -572,30 +811,56 @@ class DesignerAgent:
         # 画像がある場合は参照情報を追加
         if input_image:
             text_prompt += "\n\n## 参考画像あり\n画像も考慮してデザインを検討してください。"
-            contents.append(text_prompt)
-            contents.append(self._base64_to_pil(input_image))
-        else:
-            contents.append(text_prompt)
 
-        response = self.client.models.generate_content(
+        cache_key = make_key(DESIGN_MODEL, text_prompt, input_image)
+        cached = self._cache_get("reason", cache_key)
+        if cached is not MISS:
+            print("  (キャッシュ)")
+            return cached
+
+        # キャッシュミスのときだけ参照画像を準備する
+        contents: List = [text_prompt]
+        if input_image:
+            contents.append(self._reference_part(input_image))
+
+        response = await agenerate_content(
+            self.client,
             model=DESIGN_MODEL,
-            contents=contents
+            contents=contents,
+            name="reason"
         )
 
-        return response.text
+        reasoning = response.text or ""
+        if reasoning:
+            self._cache_set("reason", cache_key, reasoning)
+        return reasoning
 
     def _parse_design(
         self,
         user_prompt: str,
         reasoning: Optional[str] = None,
         input_image: Optional[str] = None
+    ) -> dict:
+        """ユーザーのプロンプトをJSON設計に変換（_aparse_design の同期ラッパー）"""
+        return run_sync(self._aparse_design(user_prompt, reasoning=reasoning, input_image=input_image))
+
+    async def _aparse_design(
+        self,
+        user_prompt: str,
+        reasoning: Optional[str] = None,
+        input_image: Optional[str] = None,
+        on_element: Optional[Callable[[int, dict, dict], None]] = None
     ) -> dict:
         """ユーザーのプロンプトをJSON設計に変換
 
+        on_element を指定し stream_design が有効な場合はストリーミングで生成し、
+        meta が届いた後、elements 配列の要素が1つ完成するたびに on_element(index, element, meta) を呼ぶ。
+
         Args:
             user_prompt: ユーザーの自然言語指示
             reasoning: 事前のデザイン分析結果
             input_image: 参照画像のBase64（オプション）
+            on_element: 要素が完成するたびに呼ばれるコールバック
         """
         contents: List = []
 
@@ -610,25 +875,67 @@ class DesignerAgent:
         if input_image:
             text_prompt += "\n\n【参考画像】この画像のスタイルや雰囲気を参考に設計してください。"
             contents.append(text_prompt)
-            contents.append(self._base64_to_pil(input_image))
+            contents.append(self._reference_part(input_image))
         else:
             contents.append(text_prompt)
 
-        response = self.client.models.generate_content(
-            model=DESIGN_MODEL,
-            contents=contents
-        )
-
-        text = response.text
+        cache_key = make_key(DESIGN_MODEL, text_prompt, input_image)
+        cached = self._cache_get("parse_design", cache_key)
+        if cached is not MISS:
+            print("  (キャッシュ)")
+            return cached
+
+        if on_element is not None and self.stream_design and hasattr(self.client.aio.models, "generate_content_stream"):
+            parser = DesignStreamParser()
+            # meta より先に届いた要素は meta を待ってから通知する
+            waiting: List[tuple] = []
+
+            def on_text(chunk: str) -> None:
+                for event in parser.feed(chunk):
+                    if event[0] == "element":
+                        waiting.append(event[1:])
+                    if parser.meta is not None:
+                        while waiting:
+                            index, element = waiting.pop(0)
+                            on_element(index, element, parser.meta)
+
+            text = await agenerate_content_stream(
+                self.client,
+                model=DESIGN_MODEL,
+                contents=contents,
+                name="parse_design",
+                on_text=on_text
+            )
+        else:
+            response = await agenerate_content(
+                self.client,
+                model=DESIGN_MODEL,
+                contents=contents,
+                name="parse_design"
+            )
+            text = response.text or ""
 
         # JSONを抽出
         json_match = re.search(r'\{[\s\S]*\}', text)
         if not json_match:
             raise ValueError(f"Failed to parse design JSON: {text}")
 
-        return json.loads(json_match.group())
+        design = json.loads(json_match.group())
+        self._cache_set("parse_design", cache_key, design)
+        return design
 
     def _execute_design(self, design: dict) -> dict:
+        """設計JSONに基づいて要素を生成しPPTXに統合（_aexecute_design の同期ラッパー）"""
+        return run_sync(self._aexecute_design(design))
+
+    async def _aexecute_design(
+        self,
+        design: dict,
+        started: Optional[dict] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        checkpoint: Optional[SessionCheckpoint] = None,
+        reuse: Optional[dict] = None
+    ) -> dict:
         """設計JSONに基づいて動的に要素を生成し、PPTXに統合
 
         新形式: design.elements配列を順に処理
@@ -637,11 +944,93 @@ class DesignerAgent:
         - text: テキストボックスとして配置
         - shape: 図形として配置
 
+        背景・画像の生成は max_concurrency 件まで並列に実行し、
+        結果は要素順に集約してからPPTXに統合する。
+
         Args:
             design: 設計JSON（elements配列を含む）
+            started: 設計のストリーミング中に開始済みの生成タスク（要素インデックス → (引数, Task)）。
+                     最終的な設計と引数が一致するものは再利用し、一致しないものはキャンセルする
+            semaphore: 開始済みタスクと共有する同時実行数の制限
+            checkpoint: 要素ごとの生成状況の記録先（生成済みの要素は画像ファイルを再利用する）
+            reuse: 生成せずに既存の画像を使う要素（要素インデックス → 画像ファイルのパス）
         """
-        from .tools.text_to_image import generate_image
+        generated = await self._agenerate_elements(
+            design,
+            started=started,
+            semaphore=semaphore,
+            checkpoint=checkpoint,
+            reuse=reuse
+        )
+        if not generated["success"]:
+            return generated
+        steps = generated["steps"]
+        pptx_elements = generated["elements"]
+
+        # PPTX生成
+        print(f"  PPTX生成中... ({len(pptx_elements)}要素)")
+        with span("pptx", element_count=len(pptx_elements)):
+            pptx_result = await asyncio.to_thread(
+                _image_to_pptx,
+                elements=pptx_elements,
+                session_id=self.session_id,
+                output_dir=get_session_output_dir(self.session_id),
+                optimize_media=self.optimize_media
+            )
+
+        pptx_result_path = None
+        if pptx_result.get("success"):
+            pptx_result_path = pptx_result["file_path"]
+            steps.append(f"PPTX生成完了: {pptx_result_path}")
+            print(f"      → PPTX: {pptx_result_path}")
+        else:
+            print(f"      → PPTX生成失敗: {pptx_result.get('error')}")
+            steps.append(f"PPTX生成に失敗: {pptx_result.get('error')}")
+
+        # 結果画像は背景画像を使用
+        result_image = None
+        result_path = None
+        for elem in pptx_elements:
+            if elem.get("type") == "background" and elem.get("image"):
+                result_image = elem["image"]
+                result_path = elem["file_path"]
+                break
+
+        return {
+            "success": pptx_result.get("success", False),
+            "image": result_image,
+            "elements": pptx_elements,
+            "result_path": result_path,
+            "pptx_result_path": pptx_result_path,
+            "element_files": pptx_result.get("element_files", []),
+            "steps": steps
+        }
+
+    async def _agenerate_elements(
+        self,
+        design: dict,
+        started: Optional[dict] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        file_prefix: str = "",
+        checkpoint: Optional[SessionCheckpoint] = None,
+        reuse: Optional[dict] = None
+    ) -> dict:
+        """設計JSONの要素を生成し、image_to_pptx 用の要素リストに変換する
+
+        Args:
+            design: 設計JSON（elements配列を含む）
+            started: 開始済みの生成タスク（_aexecute_design を参照）
+            semaphore: 同時実行数の制限（複数スライドで共有できる）
+            file_prefix: 保存する画像ファイル名の接頭辞（複数スライドでの衝突回避用）
+            checkpoint: 要素ごとの生成状況の記録先。生成済みの要素は画像ファイルを読み込んで再利用し、
+                        新たに生成した画像は完了した時点で保存・記録する
+            reuse: 生成せずに既存の画像を使う要素（要素インデックス → 画像ファイルのパス）。
+                   画像はこのセッションのディレクトリに save_image で配置する（画像ストアの実体を共有）
 
+        Returns:
+            dict: {"success": bool, "elements": list, "steps": list, "error": str（失敗時のみ）}
+        """
+        started = started or {}
         steps = []
         pptx_elements = []  # PPTX生成用の要素リスト
 
@@ -658,7 +1047,76 @@ class DesignerAgent:
             }
 
         print(f"  処理する要素数: {len(elements)}")
-        image_count = 0
+
+        # 画像生成ジョブを列挙（要素インデックス → generate_image の引数）
+        jobs = self._plan_image_jobs(elements, color_scheme)
+        results = {}
+
+        # 以前のセッションの画像をそのまま使う要素（refine で変更のない要素など）
+        for i, source in (reuse or {}).items():
+            if i in jobs and Path(source).exists():
+                image = ImageHandle.from_file(source)
+                path = save_image(image, file_prefix + jobs[i]["filename"], self.session_id)
+                results[i] = {"success": True, "image": image, "file_path": path, "reused": True}
+                del jobs[i]
+        if results:
+            print(f"  既存の画像を再利用: {len(results)}件")
+
+        # チェックポイントで生成済みの要素は画像ファイルを再利用
+        if checkpoint is not None:
+            restored = 0
+            for i, job in list(jobs.items()):
+                path = checkpoint.completed_image(file_prefix + job["filename"])
+                if path is not None:
+                    results[i] = {"success": True, "image": ImageHandle.from_file(path), "file_path": path, "reused": True}
+                    del jobs[i]
+                    restored += 1
+            if restored:
+                print(f"  チェックポイントから再利用: {restored}件")
+
+        # 最終的な設計と一致しない開始済みタスクは破棄
+        reused = {}
+        for i, (params, task) in started.items():
+            if i in jobs and jobs[i]["params"] == params:
+                reused[i] = task
+            else:
+                task.cancel()
+
+        async def finish(i: int, job: dict, pending: Awaitable[dict]) -> dict:
+            """生成が終わった要素から保存し、チェックポイントに記録する"""
+            key = file_prefix + job["filename"]
+            try:
+                result = await pending
+            except Exception as e:
+                if checkpoint is not None:
+                    checkpoint.set_element(key, "failed", error=str(e))
+                raise
+            if result.get("success"):
+                result = {**result, "file_path": save_image(result["image"], key, self.session_id)}
+                if checkpoint is not None:
+                    checkpoint.set_element(key, "done", file_path=result["file_path"])
+            elif checkpoint is not None:
+                checkpoint.set_element(key, "failed", error=result.get("error"))
+            return result
+
+        if jobs:
+            if semaphore is None:
+                workers = max(1, min(self.max_concurrency, len(jobs)))
+                semaphore = asyncio.Semaphore(workers)
+            else:
+                workers = self.max_concurrency
+            print(f"  画像生成: {len(jobs)}件（開始済み: {len(reused)}件、最大並列数: {workers}）")
+
+            outcomes = await asyncio.gather(
+                *(finish(i, job, reused[i] if i in reused else self._arun_image_job(i, elements[i], job["params"], semaphore))
+                  for i, job in jobs.items()),
+                return_exceptions=True
+            )
+            for i, outcome in zip(jobs.keys(), outcomes):
+                if isinstance(outcome, BaseException):
+                    results[i] = {"success": False, "error": str(outcome)}
+                else:
+                    results[i] = outcome
 
         for i, elem in enumerate(elements):
             elem_type = elem.get("type")
@@ -667,67 +1125,25 @@ class DesignerAgent:
             print(f"  [{i+1}/{len(elements)}] {elem_type}: {elem_id}")
 
             if elem_type == "background":
-                # 背景画像を生成
-                prompt = elem.get("prompt", "")
-                style = elem.get("style", {})
-
-                if prompt:
-                    style_desc = self._build_style_description(style, color_scheme)
-                    result = generate_image(
-                        prompt=prompt,
-                        style_description=style_desc,
-                        aspect_ratio="16:9",
-                        image_size="2K",
-                        no_text=True
-                    )
-
+                if i in results:
+                    result = results[i]
                     if result.get("success"):
-                        bg_path = save_image(result["image_base64"], "background", self.session_id)
-                        pptx_elements.append({
-                            "id": elem_id,
-                            "type": "background",
-                            "image_base64": result["image_base64"],
-                            "file_path": bg_path
-                        })
-                        steps.append(f"背景画像を生成: {bg_path}")
-                        print(f"      → 生成成功: {bg_path}")
+                        bg_path = result["file_path"]
+                        pptx_elements.append(to_pptx_element(elem, i, image=result["image"], file_path=bg_path))
+                        steps.append(f"背景画像を{'再利用' if result.get('reused') else '生成'}: {bg_path}")
+                        print(f"      → {'再利用' if result.get('reused') else '生成成功'}: {bg_path}")
                     else:
                         print(f"      → 生成失敗: {result.get('error')}")
                         steps.append(f"背景生成失敗: {result.get('error')}")
 
             elif elem_type == "image":
-                # イラスト/アイコン等を生成
-                prompt = elem.get("prompt", "")
-                position = elem.get("position", {})
-                style = elem.get("style", {})
-
-                if prompt:
-                    image_count += 1
-                    style_desc = f"Style: {style.get('type', 'illustration')}. {style.get('details', '')}"
-                    result = generate_image(
-                        prompt=prompt,
-                        style_description=style_desc,
-                        aspect_ratio="1:1",  # イラストは正方形
-                        image_size="1K",
-                        no_text=True
-                    )
-
+                if i in results:
+                    result = results[i]
                     if result.get("success"):
-                        img_path = save_image(result["image_base64"], f"image_{image_count}", self.session_id)
-                        pptx_elements.append({
-                            "id": elem_id,
-                            "type": "image",
-                            "image_base64": result["image_base64"],
-                            "file_path": img_path,
-                            "bbox": {
-                                "x": position.get("x", 0),
-                                "y": position.get("y", 0),
-                                "width": position.get("width", 400),
-                                "height": position.get("height", 400)
-                            }
-                        })
-                        steps.append(f"画像を生成: {elem_id}")
-                        print(f"      → 生成成功: {img_path}")
+                        img_path = result["file_path"]
+                        pptx_elements.append(to_pptx_element(elem, i, image=result["image"], file_path=img_path))
+                        steps.append(f"画像を{'再利用' if result.get('reused') else '生成'}: {elem_id}")
+                        print(f"      → {'再利用' if result.get('reused') else '生成成功'}: {img_path}")
                     else:
                         print(f"      → 生成失敗: {result.get('error')}")
                         steps.append(f"画像生成失敗 ({elem_id}): {result.get('error')}")
@@ -735,28 +1151,8 @@ class DesignerAgent:
             elif elem_type == "text":
                 # テキスト要素（PPTXでテキストボックスとして配置）
                 content = elem.get("content", "")
-                position = elem.get("position", {})
-                style = elem.get("style", {})
-
                 if content:
-                    pptx_elements.append({
-                        "id": elem_id,
-                        "type": "text",
-                        "content": content,
-                        "bbox": {
-                            "x": position.get("x", 960),
-                            "y": position.get("y", 400),
-                            "width": position.get("width", 1600),
-                            "height": position.get("height", 100)
-                        },
-                        "style": {
-                            "fontSize": style.get("fontSize", 48),
-                            "fontWeight": style.get("fontWeight", "normal"),
-                            "fontStyle": style.get("fontStyle", "normal"),
-                            "color": style.get("color", "#FFFFFF"),
-                            "align": style.get("align", "center")
-                        }
-                    })
+                    pptx_elements.append(to_pptx_element(elem, i))
                     steps.append(f"テキスト: {content[:30]}...")
                     print(f"      → テキスト追加: {content[:30]}...")
 
@@ -764,41 +1160,88 @@ class DesignerAgent:
                 # 図形要素は無視（画像生成で対応）
                 print(f"      → スキップ: shape要素は非対応")
 
-        # PPTX生成
-        print(f"  PPTX生成中... ({len(pptx_elements)}要素)")
-        pptx_result = _image_to_pptx(
-            elements=pptx_elements,
-            session_id=self.session_id
-        )
-
-        pptx_result_path = None
-        if pptx_result.get("success"):
-            pptx_result_path = pptx_result["file_path"]
-            steps.append(f"PPTX生成完了: {pptx_result_path}")
-            print(f"      → PPTX: {pptx_result_path}")
-        else:
-            print(f"      → PPTX生成失敗: {pptx_result.get('error')}")
-            steps.append(f"PPTX生成に失敗: {pptx_result.get('error')}")
-
-        # 結果画像は背景画像を使用
-        result_image = None
-        result_path = None
-        for elem in pptx_elements:
-            if elem.get("type") == "background" and elem.get("image_base64"):
-                result_image = elem["image_base64"]
-                result_path = elem["file_path"]
-                break
-
         return {
-            "success": pptx_result.get("success", False),
-            "image_base64": result_image,
+            "success": True,
             "elements": pptx_elements,
-            "result_path": result_path,
-            "pptx_result_path": pptx_result_path,
-            "element_files": pptx_result.get("element_files", []),
             "steps": steps
         }
 
+    def _element_starter(self, started: dict, semaphore: asyncio.Semaphore) -> Callable[[int, dict, dict], None]:
+        """設計のストリーミング中に届いた要素の画像生成を開始するコールバックを作成
+
+        Args:
+            started: 開始したタスクの登録先（要素インデックス → (引数, Task)）
+            semaphore: 同時実行数の制限
+        """
+        def start_element(index: int, elem: dict, meta: dict) -> None:
+            job = self._plan_image_jobs([elem], meta.get("color_scheme", {})).get(0)
+            if job is not None:
+                print(f"  → 要素 {index + 1} の画像生成を開始: {elem.get('id', elem.get('type'))}")
+                task = asyncio.ensure_future(self._arun_image_job(index, elem, job["params"], semaphore))
+                started[index] = (job["params"], task)
+
+        return start_element
+
+    async def _arun_image_job(self, index: int, elem: dict, params: dict, semaphore: asyncio.Semaphore) -> dict:
+        """1要素分の画像を生成（semaphore で同時実行数を制限）"""
+        from .tools.text_to_image import agenerate_image
+
+        with span("element", element_id=elem.get("id", f"{elem.get('type')}_{index}"), type=elem.get("type")) as current:
+            queued_at = time.perf_counter()
+            async with semaphore:
+                current.set(queue_ms=round((time.perf_counter() - queued_at) * 1000, 3))
+                return await agenerate_image(**params)
+
+    def _plan_image_jobs(self, elements: List[dict], color_scheme: dict) -> dict:
+        """画像生成が必要な要素を列挙する
+
+        Args:
+            elements: 設計JSONのelements配列
+            color_scheme: meta.color_scheme
+
+        Returns:
+            dict: 要素インデックス → {"filename": 保存名, "params": generate_image の引数}
+        """
+        jobs = {}
+
+        for i, filename in element_filenames(elements).items():
+            elem = elements[i]
+            elem_type = elem.get("type")
+            prompt = elem.get("prompt", "")
+            style = elem.get("style", {})
+
+            if elem_type == "background":
+                jobs[i] = {
+                    "filename": filename,
+                    "params": {
+                        "prompt": prompt,
+                        "style_description": self._build_style_description(style, color_scheme),
+                        "aspect_ratio": "16:9",
+                        "image_size": "2K",
+                        "no_text": True,
+                        "use_cache": self.use_image_cache,
+                        "client": self.client,
+                        "retry_policy": self.retry_policy
+                    }
+                }
+
+            elif elem_type == "image":
+                jobs[i] = {
+                    "filename": filename,
+                    "params": {
+                        "prompt": prompt,
+                        "style_description": f"Style: {style.get('type', 'illustration')}. {style.get('details', '')}",
+                        "aspect_ratio": "1:1",  # イラストは正方形
+                        "image_size": "1K",
+                        "no_text": True,
+                        "use_cache": self.use_image_cache,
+                        "client": self.client,
+                        "retry_policy": self.retry_policy
+                    }
+                }
+
+        return jobs
+
     def _build_style_description(self, style: dict, color_scheme: dict) -> str:
         """スタイル情報から叙述的な説明を生成"""
         parts = []
@@ -829,9 +1272,28 @@ class DesignerAgent:
         reference_image_base64: Optional[str] = None,
         use_reasoning: bool = True,
         use_web_research: bool = True
+    ) -> dict:
+        """ユーザーの指示からスライドを生成（agenerate の同期ラッパー）"""
+        return run_sync(self.agenerate(
+            user_prompt,
+            reference_image_base64=reference_image_base64,
+            use_reasoning=use_reasoning,
+            use_web_research=use_web_research
+        ))
+
+    async def agenerate(
+        self,
+        user_prompt: str,
+        reference_image_base64: Optional[str] = None,
+        use_reasoning: bool = True,
+        use_web_research: bool = True
     ) -> dict:
         """
-        ユーザーの指示からスライドを生成
+        ユーザーの指示からスライドを生成（非同期版）
+
+        1つのイベントループ上で多数のスライド生成を並行実行できる。
+        同時実行する場合はジョブごとに DesignerAgent を作成すること
+        （session_id をインスタンスで保持するため）。
 
         Args:
             user_prompt: ユーザーの自然言語指示
@@ -841,8 +1303,88 @@ class DesignerAgent:
             use_web_research: webリサーチを使用するか（デフォルト: True）
 
         Returns:
-            dict: 生成結果
+            dict: 生成結果（trace にフェーズごとの計測結果を含む）
         """
+        # 各フェーズの出力を記録し、失敗しても resume で続きから再開できるようにする
+        checkpoint = SessionCheckpoint(get_session_output_dir(self.session_id))
+        checkpoint.set_request(
+            {
+                "user_prompt": user_prompt,
+                "use_reasoning": use_reasoning,
+                "use_web_research": use_web_research
+            },
+            reference_image=reference_image_base64
+        )
+
+        tracer = Tracer(self.session_id, exporter=self.trace_exporter)
+        with tracer.activate(), span("generate"):
+            result = await self._agenerate(
+                user_prompt,
+                reference_image_base64=reference_image_base64,
+                use_reasoning=use_reasoning,
+                use_web_research=use_web_research,
+                checkpoint=checkpoint
+            )
+        result["trace"] = tracer.finish(get_session_output_dir(self.session_id))
+        return result
+
+    def resume(self, session_id: Optional[str] = None) -> dict:
+        """中断・失敗したセッションを続きから再開（aresume の同期ラッパー）"""
+        return run_sync(self.aresume(session_id=session_id))
+
+    async def aresume(self, session_id: Optional[str] = None) -> dict:
+        """
+        中断・失敗したセッションを続きから再開（非同期版）
+
+        checkpoint.json に記録済みのフェーズ（Webリサーチ・推論・設計）は再実行せず、
+        生成済みの要素画像も再利用する。未完了の要素だけを生成してPPTXを組み立て直す。
+
+        Args:
+            session_id: 再開するセッションID（省略時は現在のセッション）
+
+        Returns:
+            dict: 生成結果（generate と同じ形式。resumed_phases に再利用したフェーズを含む）
+        """
+        session_id = session_id or self.session_id
+        output_dir = AGENT_OUTPUT_DIR / session_id
+        checkpoint = SessionCheckpoint.load(output_dir) if output_dir.exists() else None
+        if checkpoint is None or checkpoint.request is None:
+            return {
+                "success": False,
+                "session_id": session_id,
+                "error": f"セッション {session_id} のチェックポイントが見つかりません"
+            }
+
+        self.session_id = session_id
+        request = checkpoint.request
+        resumed_phases = [phase for phase in ("web_research", "reasoning", "design") if checkpoint.has(phase)]
+        print(f"\n[Resume] セッション {session_id} を再開（完了済み: {', '.join(resumed_phases) or 'なし'}）")
+
+        tracer = Tracer(self.session_id, exporter=self.trace_exporter)
+        with tracer.activate(), span("resume", resumed_phases=len(resumed_phases)):
+            result = await self._agenerate(
+                request.get("user_prompt", ""),
+                reference_image_base64=checkpoint.reference_image(),
+                use_reasoning=request.get("use_reasoning", True),
+                use_web_research=request.get("use_web_research", True),
+                checkpoint=checkpoint
+            )
+        result["resumed_phases"] = resumed_phases
+        result["trace"] = tracer.finish(get_session_output_dir(self.session_id))
+        return result
+
+    async def _agenerate(
+        self,
+        user_prompt: str,
+        reference_image_base64: Optional[str] = None,
+        use_reasoning: bool = True,
+        use_web_research: bool = True,
+        checkpoint: Optional[SessionCheckpoint] = None
+    ) -> dict:
+        """agenerate / aresume の本体（各フェーズを実行。checkpoint に記録済みのフェーズは飛ばす）"""
+        # 設計のストリーミング中に開始した画像生成タスク（要素インデックス → (引数, Task)）
+        started: dict = {}
+        checkpoint = checkpoint or SessionCheckpoint(get_session_output_dir(self.session_id))
         try:
             steps = []
             reasoning: Optional[str] = None
@@ -851,7 +1393,13 @@ class DesignerAgent:
             # Phase 1: Web Research（エージェントが自律判断）
             if use_web_research:
                 print("\n[Phase 1] Web Research...")
-                web_research = self._web_research(user_prompt, input_image=reference_image_base64)
+                if checkpoint.has("web_research"):
+                    print("  (チェックポイント)")
+                    web_research = checkpoint.get("web_research")
+                else:
+                    with span("web_research"):
+                        web_research = await self._aweb_research(user_prompt, input_image=reference_image_base64)
+                    checkpoint.set("web_research", web_research)
                 if web_research:
                     research_preview = web_research['research'][:200] + "..." if len(web_research['research']) > 200 else web_research['research']
                     print(f"  検索結果: {research_preview}")
@@ -867,21 +1415,35 @@ class DesignerAgent:
             # Phase 2: Reasoning（デザイン分析）
             if use_reasoning:
                 print("\n[Phase 2] デザイン分析（Reasoning）...")
-                reasoning = self._reason(
-                    user_prompt,
-                    input_image=reference_image_base64,
-                    web_research=web_research
-                )
+                if checkpoint.has("reasoning"):
+                    print("  (チェックポイント)")
+                    reasoning = checkpoint.get("reasoning") or ""
+                else:
+                    with span("reason"):
+                        reasoning = await self._areason(
+                            user_prompt,
+                            input_image=reference_image_base64,
+                            web_research=web_research
+                        )
+                    checkpoint.set("reasoning", reasoning)
                 print(f"  分析結果:\n{reasoning[:500]}..." if len(reasoning) > 500 else f"  分析結果:\n{reasoning}")
                 steps.append("デザイン分析完了")
 
-            # Phase 3: 設計JSON生成
+            # Phase 3: 設計JSON生成（要素が届いた順に画像生成を開始）
             print("\n[Phase 3] 設計JSON生成中...")
-            design = self._parse_design(
-                user_prompt,
-                reasoning=reasoning,
-                input_image=reference_image_base64
-            )
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            if checkpoint.has("design_raw"):
+                print("  (チェックポイント)")
+                design = checkpoint.get("design_raw")
+            else:
+                with span("parse_design"):
+                    design = await self._aparse_design(
+                        user_prompt,
+                        reasoning=reasoning,
+                        input_image=reference_image_base64,
+                        on_element=self._element_starter(started, semaphore)
+                    )
+                checkpoint.set("design_raw", design)
             print(f"  設計JSON（プリセット解決前）: {json.dumps(design, ensure_ascii=False, indent=2)}")
 
             # Phase 4: プリセット解決
@@ -889,7 +1451,12 @@ class DesignerAgent:
             preset_info = design.get("preset", {})
             if preset_info:
                 print(f"  プリセット: layout={preset_info.get('layout')}, palette={preset_info.get('palette')}, tone={preset_info.get('tone')}")
-            resolved_design = resolve_presets(design)
+            if checkpoint.has("design"):
+                resolved_design = checkpoint.get("design")
+            else:
+                with span("resolve_presets"):
+                    resolved_design = resolve_presets(design)
+                checkpoint.set("design", resolved_design)
             print(f"  設計JSON（プリセット解決後）: {json.dumps(resolved_design, ensure_ascii=False, indent=2)}")
             steps.append(f"プリセット解決完了: layout={preset_info.get('layout', 'center')}, palette={preset_info.get('palette', 'light')}, tone={preset_info.get('tone', '-')}")
 
@@ -899,11 +1466,27 @@ class DesignerAgent:
 
             # Phase 5: 実行（各要素を生成 → PPTX統合）
             print("\n[Phase 5] 設計を実行中...")
-            result = self._execute_design(resolved_design)
+            with span("execute_design", prestarted=len(started)):
+                result = await self._aexecute_design(
+                    resolved_design,
+                    started=started,
+                    semaphore=semaphore,
+                    checkpoint=checkpoint
+                )
 
             # ステップをマージ
             all_steps = steps + result.get("steps", [])
 
+            # 一部の要素が生成できなかった場合は resume で再実行できるよう failed として残す
+            failed_elements = [
+                key for key, entry in checkpoint.data["elements"].items()
+                if entry.get("status") != "done"
+            ]
+            checkpoint.finish(
+                result.get("success", False) and not failed_elements,
+                error=result.get("error") or (f"要素の生成に失敗: {', '.join(failed_elements)}" if failed_elements else None)
+            )
+
             return {
                 "success": result.get("success", False),
                 "session_id": self.session_id,
@@ -913,16 +1496,18 @@ class DesignerAgent:
                 "reasoning": reasoning,
                 "web_research": web_research,
                 "steps": all_steps,
-                "image_base64": result.get("image_base64"),
+                "image": result.get("image"),
                 "elements": result.get("elements"),
                 "result_path": result.get("result_path"),
                 "pptx_result_path": result.get("pptx_result_path"),
                 "element_files": result.get("element_files"),
+                "failed_elements": failed_elements,
                 "response": "\n".join(all_steps)
             }
 
         except Exception as e:
             import traceback
+            checkpoint.finish(False, error=str(e))
             return {
                 "success": False,
                 "session_id": self.session_id,
@@ -930,21 +1515,247 @@ class DesignerAgent:
                 "traceback": traceback.format_exc()
             }
 
+        finally:
+            # 途中で失敗した場合、開始済みの画像生成を止める
+            for _, task in started.values():
+                if not task.done():
+                    task.cancel()
+
+    def generate_deck(
+        self,
+        outline: List[str],
+        deck_prompt: Optional[str] = None,
+        reference_image_base64: Optional[str] = None,
+        use_reasoning: bool = True,
+        use_web_research: bool = True
+    ) -> dict:
+        """アウトラインから複数スライドのデッキを生成（agenerate_deck の同期ラッパー）"""
+        return run_sync(self.agenerate_deck(
+            outline,
+            deck_prompt=deck_prompt,
+            reference_image_base64=reference_image_base64,
+            use_reasoning=use_reasoning,
+            use_web_research=use_web_research
+        ))
+
+    async def agenerate_deck(
+        self,
+        outline: List[str],
+        deck_prompt: Optional[str] = None,
+        reference_image_base64: Optional[str] = None,
+        use_reasoning: bool = True,
+        use_web_research: bool = True
+    ) -> dict:
+        """
+        アウトラインから複数スライドのデッキを生成（非同期版）
+
+        Web Research と Reasoning はデッキ全体で1回だけ実行し、
+        スライドごとの設計JSON生成は並行に行う。全スライドの画像生成は
+        1つの同時実行数制限（max_concurrency）を共有し、1つのPPTXに出力する。
+
+        Args:
+            outline: スライドごとの指示（1要素 = 1スライド）
+            deck_prompt: デッキ全体のテーマ・目的（オプション）
+            reference_image_base64: 参照画像のBase64データ（オプション）
+            use_reasoning: reasoningフェーズを使用するか（デフォルト: True）
+            use_web_research: webリサーチを使用するか（デフォルト: True）
+
+        Returns:
+            dict: 生成結果（slides にスライドごとの設計・要素を含む）
+        """
+        tracer = Tracer(self.session_id, exporter=self.trace_exporter)
+        with tracer.activate(), span("generate_deck", slide_count=len(outline)):
+            result = await self._agenerate_deck(
+                outline,
+                deck_prompt=deck_prompt,
+                reference_image_base64=reference_image_base64,
+                use_reasoning=use_reasoning,
+                use_web_research=use_web_research
+            )
+        result["trace"] = tracer.finish(get_session_output_dir(self.session_id))
+        return result
+
+    async def _agenerate_deck(
+        self,
+        outline: List[str],
+        deck_prompt: Optional[str] = None,
+        reference_image_base64: Optional[str] = None,
+        use_reasoning: bool = True,
+        use_web_research: bool = True
+    ) -> dict:
+        """agenerate_deck の本体"""
+        slide_count = len(outline)
+        # スライドごとの開始済み画像生成タスク
+        started: List[dict] = [{} for _ in outline]
+        try:
+            if not outline:
+                raise ValueError("outline must contain at least one slide")
+
+            steps = []
+            reasoning: Optional[str] = None
+            web_research: Optional[dict] = None
+
+            # デッキ全体の指示（リサーチ・分析はこの指示で1回だけ行う）
+            outline_text = "\n".join(f"{n + 1}. {slide}" for n, slide in enumerate(outline))
+            deck_text = (deck_prompt + "\n\n" if deck_prompt else "") + f"## スライド構成（全{slide_count}枚）\n{outline_text}"
+
+            # Phase 1: Web Research
+            if use_web_research:
+                print("\n[Deck Phase 1] Web Research...")
+                with span("web_research"):
+                    web_research = await self._aweb_research(deck_text, input_image=reference_image_base64)
+                steps.append("Webリサーチ完了" if web_research else "Webリサーチ: 不要と判断")
+
+            # Phase 2: Reasoning
+            if use_reasoning:
+                print("\n[Deck Phase 2] デザイン分析（Reasoning）...")
+                with span("reason"):
+                    reasoning = await self._areason(
+                        deck_text,
+                        input_image=reference_image_base64,
+                        web_research=web_research
+                    )
+                steps.append("デザイン分析完了")
+
+            # Phase 3: スライドごとの設計・要素生成（画像生成の同時実行数は全スライドで共有）
+            print(f"\n[Deck Phase 3] {slide_count}枚のスライドを設計・生成中...")
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def build_slide(n: int, slide_prompt: str) -> dict:
+                with span("slide", index=n + 1):
+                    user_prompt = (
+                        f"{deck_text}\n\n## このスライド（{n + 1}/{slide_count}枚目）\n{slide_prompt}\n"
+                        "デッキ全体で配色・トーンを統一してください。"
+                    )
+                    with span("parse_design"):
+                        design = await self._aparse_design(
+                            user_prompt,
+                            reasoning=reasoning,
+                            input_image=reference_image_base64,
+                            on_element=self._element_starter(started[n], semaphore)
+                        )
+                    with span("resolve_presets"):
+                        resolved_design = resolve_presets(design)
+                    generated = await self._agenerate_elements(
+                        resolved_design,
+                        started=started[n],
+                        semaphore=semaphore,
+                        file_prefix=f"slide{n + 1:02d}_"
+                    )
+                    return {
+                        "index": n + 1,
+                        "success": generated["success"],
+                        "design": resolved_design,
+                        "design_raw": design,
+                        "elements": generated.get("elements", []),
+                        "steps": generated.get("steps", []),
+                        "error": generated.get("error"),
+                    }
+
+            outcomes = await asyncio.gather(
+                *(build_slide(n, slide) for n, slide in enumerate(outline)),
+                return_exceptions=True
+            )
+            slides = []
+            for n, outcome in enumerate(outcomes):
+                if isinstance(outcome, BaseException):
+                    outcome = {"index": n + 1, "success": False, "elements": [], "steps": [], "error": str(outcome)}
+                slides.append(outcome)
+                if outcome["success"]:
+                    steps.append(f"スライド{n + 1}: {len(outcome['elements'])}要素")
+                else:
+                    steps.append(f"スライド{n + 1}の生成に失敗: {outcome.get('error')}")
+
+            # 設計を保存
+            design_path = save_deck(
+                [slide.get("design") for slide in slides],
+                self.session_id,
+                outline,
+                reasoning,
+                web_research
+            )
+            steps.append(f"デッキ設計を保存: {design_path}")
+
+            # Phase 4: 1つのPPTXに統合（失敗したスライドは空白のまま残す）
+            print(f"\n[Deck Phase 4] PPTX生成中... ({slide_count}スライド)")
+            with span("pptx", slide_count=slide_count):
+                pptx_result = await asyncio.to_thread(
+                    _image_to_pptx,
+                    elements=[],
+                    session_id=self.session_id,
+                    output_dir=get_session_output_dir(self.session_id),
+                    slides=[slide["elements"] for slide in slides],
+                    optimize_media=self.optimize_media
+                )
+            if pptx_result.get("success"):
+                steps.append(f"PPTX生成完了: {pptx_result['file_path']}")
+            else:
+                steps.append(f"PPTX生成に失敗: {pptx_result.get('error')}")
+
+            return {
+                "success": pptx_result.get("success", False) and any(slide["success"] for slide in slides),
+                "session_id": self.session_id,
+                "slides": slides,
+                "reasoning": reasoning,
+                "web_research": web_research,
+                "steps": steps,
+                "pptx_result_path": pptx_result.get("file_path"),
+                "element_files": pptx_result.get("element_files", []),
+                "response": "\n".join(steps)
+            }
+
+        except Exception as e:
+            import traceback
+            return {
+                "success": False,
+                "session_id": self.session_id,
+                "error": str(e),
+                "traceback": traceback.format_exc()
+            }
+
+        finally:
+            for slide_started in started:
+                for _, task in slide_started.values():
+                    if not task.done():
+                        task.cancel()
+
     def refine(
         self,
         feedback: str,
         session_id: Optional[str] = None
+    ) -> dict:
+        """既存の設計を修正して再生成（arefine の同期ラッパー）"""
+        return run_sync(self.arefine(feedback, session_id=session_id))
+
+    async def arefine(
+        self,
+        feedback: str,
+        session_id: Optional[str] = None
     ) -> dict:
         """
-        既存の設計を修正して再生成
+        既存の設計を修正して再生成（非同期版）
 
         Args:
             feedback: ユーザーのフィードバック（修正指示）
             session_id: 修正対象のセッションID（省略時は現在のセッション）
 
         Returns:
-            dict: 生成結果
+            dict: 生成結果（trace にフェーズごとの計測結果を含む）
         """
+        tracer = Tracer(self.session_id, exporter=self.trace_exporter)
+        with tracer.activate(), span("refine", previous_session_id=session_id or self.session_id):
+            result = await self._arefine(feedback, session_id=session_id)
+        # 修正版は新しいセッションIDで保存される
+        tracer.trace_id = self.session_id
+        result["trace"] = tracer.finish(get_session_output_dir(self.session_id))
+        return result
+
+    async def _arefine(
+        self,
+        feedback: str,
+        session_id: Optional[str] = None
+    ) -> dict:
+        """arefine の本体"""
         try:
             target_session = session_id or self.session_id
             steps = []
@@ -971,13 +1782,16 @@ class DesignerAgent:
                 feedback=feedback
             )
 
-            response = self.client.models.generate_content(
-                model=DESIGN_MODEL,
-                contents=[refine_prompt]
-            )
+            with span("refine_design"):
+                response = await agenerate_content(
+                    self.client,
+                    model=DESIGN_MODEL,
+                    contents=[refine_prompt],
+                    name="refine"
+                )
 
             # JSONを抽出
-            text = response.text
+            text = response.text or ""
             json_match = re.search(r'\{[\s\S]*\}', text)
             if not json_match:
                 return {
@@ -992,22 +1806,35 @@ class DesignerAgent:
             preset_info = new_design.get("preset", {})
             if preset_info:
                 print(f"  プリセット: layout={preset_info.get('layout')}, palette={preset_info.get('palette')}, tone={preset_info.get('tone')}")
-            resolved_design = resolve_presets(new_design)
+            with span("resolve_presets"):
+                resolved_design = resolve_presets(new_design)
             print(f"  修正後の設計（プリセット解決後）: {json.dumps(resolved_design, ensure_ascii=False, indent=2)}")
 
-            # 変更された要素を特定
-            changes = self._detect_changes(current_design, resolved_design)
+            # 要素ごとの差分（id で対応付け、画像は生成に関わる内容のハッシュで比較）
+            diff = self._diff_designs(current_design, resolved_design)
+            changes = diff["changed"] + diff["added"] + diff["removed"]
             print(f"  変更された要素: {changes}")
+            print(f"  再生成: {diff['regenerate']} / 再利用: {len(diff['reusable'])}件")
             steps.append(f"変更を検出: {', '.join(changes) if changes else 'なし'}")
 
+            # 変更のない画像は以前のセッションのファイルを使う
+            previous_dir = AGENT_OUTPUT_DIR / target_session
+            previous_files = element_filenames(current_design.get("elements", []))
+            reuse = {}
+            for new_index, old_index in diff["reusable"].items():
+                matches = sorted(previous_dir.glob(f"{previous_files[old_index]}.*"))
+                if matches:
+                    reuse[new_index] = str(matches[0])
+
             # 新しいセッションIDで保存（修正版）
-            self.session_id = self._generate_session_id()
+            self.session_id = generate_session_id()
             design_path = save_design(resolved_design, self.session_id, reasoning=None)
             steps.append(f"修正後の設計を保存: {design_path}")
 
-            # 実行（各要素を生成 → PPTX統合）
+            # 実行（変更された要素だけを生成 → PPTX統合）
             print("\n[Refine] 修正後の設計を実行中...")
-            result = self._execute_design(resolved_design)
+            with span("execute_design", reused=len(reuse)):
+                result = await self._aexecute_design(resolved_design, reuse=reuse)
 
             all_steps = steps + result.get("steps", [])
 
@@ -1019,8 +1846,10 @@ class DesignerAgent:
                 "design_raw": new_design,
                 "preset": preset_info,
                 "changes": changes,
+                "regenerated": diff["regenerate"],
+                "reused": [element_key(resolved_design["elements"][i], i) for i in reuse],
                 "steps": all_steps,
-                "image_base64": result.get("image_base64"),
+                "image": result.get("image"),
                 "elements": result.get("elements"),
                 "result_path": result.get("result_path"),
                 "pptx_result_path": result.get("pptx_result_path"),
@@ -1037,37 +1866,220 @@ class DesignerAgent:
                 "traceback": traceback.format_exc()
             }
 
-    def _detect_changes(self, old_design: dict, new_design: dict) -> List[str]:
-        """設計の変更点を検出"""
-        changes = []
-        elements = ["background", "illustration", "title", "subtitle"]
+    def _diff_designs(self, old_design: dict, new_design: dict) -> dict:
+        """
+        設計の変更点を要素単位で検出する
 
-        for element in elements:
-            old_val = old_design.get(element)
-            new_val = new_design.get(element)
+        要素は id（無ければ種類とインデックス）で対応付ける。
+        背景・画像は生成に関わる内容（プロンプト・スタイル・配色・サイズ）のハッシュが一致すれば、
+        位置やサイズだけが変わっても既存の画像を再利用できる。
 
-            if old_val != new_val:
-                changes.append(element)
+        Args:
+            old_design: 修正前の設計JSON
+            new_design: 修正後の設計JSON
+
+        Returns:
+            dict: {
+                "changed": 内容が変わった要素のキー,
+                "added": 追加された要素のキー,
+                "removed": 削除された要素のキー,
+                "regenerate": 画像の再生成が必要な要素のキー,
+                "reusable": 画像を再利用できる要素（新しいインデックス → 以前のインデックス）
+            }
+        """
+        old_elements = old_design.get("elements", [])
+        new_elements = new_design.get("elements", [])
+        old_jobs = self._plan_image_jobs(old_elements, old_design.get("meta", {}).get("color_scheme", {}))
+        new_jobs = self._plan_image_jobs(new_elements, new_design.get("meta", {}).get("color_scheme", {}))
+
+        old_indices = {}
+        for i, elem in enumerate(old_elements):
+            old_indices.setdefault(element_key(elem, i), i)
+
+        changed, added, regenerate = [], [], []
+        reusable = {}
+        matched = set()
+        for i, elem in enumerate(new_elements):
+            key = element_key(elem, i)
+            old_index = old_indices.get(key)
+            if old_index is None or old_index in matched:
+                added.append(key)
+                if i in new_jobs:
+                    regenerate.append(key)
+                continue
+            matched.add(old_index)
+
+            if old_elements[old_index] != elem:
+                changed.append(key)
+            if i in new_jobs:
+                if old_index in old_jobs and (
+                    image_content_hash(old_jobs[old_index]["params"]) == image_content_hash(new_jobs[i]["params"])
+                ):
+                    reusable[i] = old_index
+                else:
+                    regenerate.append(key)
 
-        return changes
+        removed = [
+            element_key(elem, i) for i, elem in enumerate(old_elements)
+            if i not in matched
+        ]
+
+        return {
+            "changed": changed,
+            "added": added,
+            "removed": removed,
+            "regenerate": regenerate,
+            "reusable": reusable
+        }
+
+
+async def _handle_request(params: dict, client: Optional[genai.Client] = None) -> dict:
+    """CLI/ワーカー共通のリクエスト処理
+
+    Args:
+        params: リクエストパラメータ
+            - method: "generate"（デフォルト）、"deck"、"refine" または "resume"
+            - userPrompt / imageBase64: generate 用
+            - outline / deckPrompt / imageBase64: deck 用
+            - feedback / sessionId: refine 用
+            - sessionId: resume 用
+            - inlineImages: True で画像をBase64で返す（デフォルトはパス・サイズ・ハッシュのみ）
+            - noCache: True で応答キャッシュ・画像生成キャッシュを使わない（「再生成」用）
+            - useResponseCache / useImageCache: キャッシュを個別に指定（noCache より優先）
+        client: 使用する genai クライアント（省略時は共有クライアント）
+    """
+    method = params.get("method", "generate")
+    use_cache = not params.get("noCache", False)
+    agent = DesignerAgent(
+        client=client,
+        use_response_cache=bool(params.get("useResponseCache", use_cache)),
+        use_image_cache=bool(params.get("useImageCache", use_cache))
+    )
+
+    if method == "generate":
+        return await agent.agenerate(
+            user_prompt=params.get("userPrompt", ""),
+            reference_image_base64=params.get("imageBase64")
+        )
+    if method == "deck":
+        return await agent.agenerate_deck(
+            outline=params.get("outline", []),
+            deck_prompt=params.get("deckPrompt"),
+            reference_image_base64=params.get("imageBase64")
+        )
+    if method == "refine":
+        return await agent.arefine(
+            feedback=params.get("feedback", ""),
+            session_id=params.get("sessionId")
+        )
+    if method == "resume":
+        return await agent.aresume(session_id=params.get("sessionId"))
+    return {"success": False, "error": f"Unknown method: {method}"}
+
+
+async def _serve_worker(out, max_jobs: int) -> None:
+    """常駐ワーカーモード
+
+    stdin から1行1リクエストのJSONを読み、stdout に1行1レスポンスのJSONを書く。
+    インタプリタ・genai クライアント・プリセット/データセットを使い回すため、
+    リクエストごとのプロセス起動コストがかからない。
+
+    リクエスト: {"id": ..., "method": "generate" | "deck" | "refine" | "ping", ...params}
+    レスポンス: {"id": ..., "result": {...}} または {"id": ..., "error": "..."}
+
+    画像はデフォルトでファイルパス・サイズ・ハッシュのみ返す（inlineImages: true でBase64を含める）。
+    """
+    import sys
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY is required")
+    client = get_shared_client(api_key)
+
+    # 参照データセットをウォームアップ
+    get_references_summary()
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_jobs)
+    tasks = set()
+
+    def write(message: dict) -> None:
+        out.write(json.dumps(message, ensure_ascii=False) + "\n")
+        out.flush()
+
+    async def run(request_id, params: dict) -> None:
+        async with semaphore:
+            try:
+                result = await _handle_request(params, client=client)
+                inline = bool(params.get("inlineImages", False))
+                write({"id": request_id, "result": encode_images(result, inline=inline)})
+            except Exception as e:
+                write({"id": request_id, "error": str(e)})
+
+    write({"event": "ready", "pid": os.getpid()})
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            params = json.loads(line)
+        except json.JSONDecodeError:
+            write({"id": None, "error": "Invalid JSON input"})
+            continue
+
+        request_id = params.get("id")
+        if params.get("method") == "ping":
+            write({"id": request_id, "result": {"success": True}})
+            continue
+
+        task = asyncio.create_task(run(request_id, params))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # stdin が閉じられたら処理中のリクエストを完了させて終了
+    if tasks:
+        await asyncio.gather(*tasks)
 
 
 def main():
-    """CLI エントリーポイント"""
+    """CLI エントリーポイント
+
+    通常モード: stdin のJSONを1件処理して結果を stdout に出力
+    ワーカーモード（--worker）: 改行区切りJSONを連続処理する常駐プロセス
+    """
     import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Designer Agent CLI")
+    parser.add_argument("--worker", action="store_true", help="改行区切りJSONを連続処理する常駐モード")
+    parser.add_argument("--max-jobs", type=int, default=8, help="ワーカーモードの同時処理数")
+    args = parser.parse_args()
+
+    # 進捗ログ（print）は stderr に流し、stdout はJSON応答専用にする
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    if args.worker:
+        asyncio.run(_serve_worker(out, max(1, args.max_jobs)))
+        return
 
     input_data = sys.stdin.read()
 
     try:
         params = json.loads(input_data)
     except json.JSONDecodeError:
-        print(json.dumps({"success": False, "error": "Invalid JSON input"}))
+        out.write(json.dumps({"success": False, "error": "Invalid JSON input"}) + "\n")
         sys.exit(1)
 
-    agent = DesignerAgent()
-    result = agent.generate(user_prompt=params.get("userPrompt", ""))
+    result = asyncio.run(_handle_request(params))
 
-    print(json.dumps(result, ensure_ascii=False))
+    inline = bool(params.get("inlineImages", False))
+    out.write(json.dumps(encode_images(result, inline=inline), ensure_ascii=False) + "\n")
 
 
 if __name__ == "__main__":
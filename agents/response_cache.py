@@ -0,0 +1,190 @@
+"""
+テキストフェーズの応答キャッシュ
+Web Research / Reasoning / 設計JSON生成の応答を、モデル名と入力内容のハッシュで保存する
+（メモリ上のLRU + 任意でSQLiteに永続化、フェーズごとのTTL付き）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Union
+
+# フェーズごとのTTL（秒）: Web検索結果は鮮度が重要なため短め
+PHASE_TTLS = {
+    "web_research": 60 * 60,
+    "reason": 24 * 60 * 60,
+    "parse_design": 7 * 24 * 60 * 60,
+}
+
+# TTL未定義のフェーズのデフォルト
+DEFAULT_TTL = 60 * 60
+
+# メモリキャッシュの最大件数
+DEFAULT_MAX_ENTRIES = 256
+
+# キャッシュミスを表す番兵（None自体もキャッシュ可能な値のため）
+MISS = object()
+
+
+def make_key(model: str, *parts: Union[str, bytes, None]) -> str:
+    """
+    モデル名と入力内容から正規化したキャッシュキー（SHA-256）を生成
+
+    Args:
+        model: モデル名
+        *parts: プロンプト文字列や画像データ（順序も含めてキーになる）
+    """
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for part in parts:
+        if part is None:
+            chunk = b""
+        elif isinstance(part, bytes):
+            chunk = part
+        else:
+            chunk = part.encode("utf-8")
+        # 区切りが曖昧にならないよう長さを前置する
+        digest.update(len(chunk).to_bytes(8, "big"))
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """フェーズ別TTL付きの応答キャッシュ"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        db_path: Optional[Union[str, Path]] = None,
+        ttls: Optional[dict] = None
+    ):
+        """
+        Args:
+            max_entries: メモリに保持する最大件数
+            db_path: SQLiteファイルのパス（省略時はメモリのみ）
+            ttls: フェーズ名 → TTL（秒）。PHASE_TTLS を上書きする
+        """
+        self.max_entries = max_entries
+        self.ttls = {**PHASE_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " phase TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, phase: str, key: str) -> Any:
+        """
+        キャッシュから応答を取得
+
+        Returns:
+            保存された値（ミス時は MISS）。毎回新しいオブジェクトを返す
+        """
+        now = time.time()
+        cache_key = f"{phase}:{key}"
+
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(cache_key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._memory[cache_key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?",
+                    (cache_key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._remember(cache_key, expires_at, value)
+                        self.hits += 1
+                        return json.loads(value)
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (cache_key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return MISS
+
+    def set(self, phase: str, key: str, value: Any) -> None:
+        """応答を保存（値はJSONシリアライズ可能であること）"""
+        ttl = self.ttls.get(phase, DEFAULT_TTL)
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        cache_key = f"{phase}:{key}"
+        serialized = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._remember(cache_key, expires_at, serialized)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, phase, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (cache_key, phase, serialized, expires_at)
+                )
+                self._db.commit()
+
+    def _remember(self, cache_key: str, expires_at: float, value: str) -> None:
+        """メモリLRUに追加（ロック取得済みで呼ぶ）"""
+        if self.max_entries <= 0:
+            return
+        self._memory[cache_key] = (expires_at, value)
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """ヒット/ミス数を取得"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._memory),
+            }
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    プロセス共通の応答キャッシュを取得
+
+    環境変数 RESPONSE_CACHE_DB にパスを指定するとSQLiteに永続化する。
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(db_path=os.environ.get("RESPONSE_CACHE_DB") or None)
+        return _default_cache
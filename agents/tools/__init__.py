@@ -4,6 +4,7 @@ Designer Agent ツール
 
 from .text_to_image import text_to_image
 from .image_to_pptx import image_to_pptx
+from .editable_pptx import image_to_editable_pptx
 from .design_references import (
     search_references,
     get_design_patterns,
@@ -14,6 +15,7 @@ from .design_references import (
 __all__ = [
     "text_to_image",
     "image_to_pptx",
+    "image_to_editable_pptx",
     "search_references",
     "get_design_patterns",
     "get_reference_image",
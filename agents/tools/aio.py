@@ -0,0 +1,50 @@
+"""
+非同期ユーティリティ
+同期APIから非同期実装を呼び出すための共有イベントループ
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+# 同期ラッパー用のイベントループ（プロセス内で1つだけ起動）
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """バックグラウンドスレッドで動くイベントループを取得（初回に起動）"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever,
+                name="agents-aio-loop",
+                daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    コルーチンを共有イベントループで実行し、結果を待って返す
+
+    呼び出し元でイベントループが動いていても使える（Jupyter、Strands等）。
+    非同期クライアントのコネクションは共有ループに紐づくため、
+    同期APIからの呼び出しは全てこのループを経由させる。
+
+    Args:
+        coro: 実行するコルーチン
+
+    Returns:
+        コルーチンの戻り値（例外はそのまま送出）
+    """
+    loop = _get_loop()
+    if threading.current_thread() is _loop_thread:
+        if asyncio.iscoroutine(coro):
+            coro.close()
+        raise RuntimeError("run_sync() cannot be called from the shared event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()  # type: ignore[arg-type]
@@ -6,14 +6,25 @@ Gemini 3 Proで画像を分析し、要素を識別してテキストはSVGを
 import os
 import json
 import re
-from typing import Optional
-from google import genai
-from PIL import Image
-from io import BytesIO
-import base64
+from typing import Any, Optional, Union
+
+from .client_pool import get_shared_client
+from .decoded_images import get_decoded_image_cache
+from .gemini import generate_content
+from .image_handle import ImageHandle
 
 MODEL = "gemini-3-pro-preview"
 
+# 送信前に縮小する長辺の上限（px、0 で元の解像度のまま送る）
+MAX_UPLOAD_EDGE = int(os.environ.get("ANALYZE_MAX_UPLOAD_EDGE", "2048"))
+
+# 送信する画像の形式（JPEG / WEBP / PNG）と品質
+UPLOAD_FORMAT = os.environ.get("ANALYZE_UPLOAD_FORMAT", "JPEG")
+UPLOAD_QUALITY = int(os.environ.get("ANALYZE_UPLOAD_QUALITY", "85"))
+
+# style のうちピクセル単位の値（縮小送信時は bbox と同じ比率で元画像の単位に戻す）
+PIXEL_STYLE_KEYS = ("fontSize", "letterSpacing", "strokeWidth")
+
 PROMPT_TEMPLATE = """この画像を分析し、編集可能なPowerPointスライドを作成するために、全ての要素を識別してください。
 
 ## タスク
@@ -70,43 +81,64 @@ JSONのみを出力してください。"""
 
 
 def analyze_image(
-    image_base64: str,
-    api_key: Optional[str] = None
+    image_base64: Union[str, ImageHandle],
+    api_key: Optional[str] = None,
+    client: Optional[Any] = None,
+    max_upload_edge: Optional[int] = MAX_UPLOAD_EDGE,
+    image_format: Optional[str] = UPLOAD_FORMAT,
+    quality: int = UPLOAD_QUALITY
 ) -> dict:
     """
     画像を分析して要素リストを返す
 
+    大きな画像は長辺 max_upload_edge まで縮小して送り、縮小後のサイズで座標を指示する。
+    返ってきた bbox は元画像のピクセル座標に戻してから返す。
+
     Args:
-        image_base64: 画像のBase64データ
+        image_base64: 画像のBase64データ（ImageHandle も可）
         api_key: Google API Key（省略時は環境変数から取得）
+        client: 使用する genai クライアント（省略時は api_key の共有クライアント）
+        max_upload_edge: 送信する画像の長辺の上限（px）。None / 0 で縮小しない
+        image_format: 送信する画像の形式（"JPEG" / "WEBP" / "PNG"、None で元の形式。透過ありの画像は JPEG 指定でも PNG）
+        quality: JPEG / WebP の品質
 
     Returns:
         dict: {
             "success": bool,
-            "elements": list,  # 要素リスト
+            "elements": list,  # 要素リスト（bbox は元画像の座標）
+            "image_size": dict,  # 元画像のサイズ
+            "upload_size": dict,  # 送信した画像のサイズ
             "error": str  # エラー時のみ
         }
     """
     try:
-        # API Key
-        key = api_key or os.environ.get("GOOGLE_API_KEY")
-        if not key:
-            return {"success": False, "error": "GOOGLE_API_KEY is required"}
-
-        client = genai.Client(api_key=key)
-
-        # Base64からPIL Imageに変換
-        image_data = base64.b64decode(image_base64)
-        image = Image.open(BytesIO(image_data))
-        width, height = image.size
+        if client is None:
+            # API Key
+            key = api_key or os.environ.get("GOOGLE_API_KEY")
+            if not key:
+                return {"success": False, "error": "GOOGLE_API_KEY is required"}
+
+            client = get_shared_client(key)
+
+        # 画像を準備（縮小・エンコードはプロセス内で1回だけ）
+        prepared = get_decoded_image_cache().get(
+            image_base64,
+            max_edge=max_upload_edge,
+            image_format=image_format,
+            quality=quality
+        )
+        width, height = prepared.original_size
+        upload_width, upload_height = prepared.size
 
-        # プロンプト生成
-        prompt = PROMPT_TEMPLATE.format(width=width, height=height)
+        # プロンプト生成（座標は送信する画像のサイズで指示する）
+        prompt = PROMPT_TEMPLATE.format(width=upload_width, height=upload_height)
 
         # Gemini呼び出し
-        response = client.models.generate_content(
+        response = generate_content(
+            client,
             model=MODEL,
-            contents=[prompt, image]
+            contents=[prompt, prepared.part],
+            name="analyze_image"
         )
 
         # レスポンスからテキストを取得
@@ -130,16 +162,48 @@ def analyze_image(
             else:
                 return {"success": False, "error": f"Failed to parse JSON: {text[:500]}"}
 
+        elements = result.get("elements", [])
+        if (upload_width, upload_height) != (width, height):
+            for elem in elements:
+                if isinstance(elem.get("bbox"), dict):
+                    elem["bbox"] = _scale_bbox(elem["bbox"], width / upload_width, height / upload_height, width, height)
+                if isinstance(elem.get("style"), dict):
+                    elem["style"] = _scale_style(elem["style"], height / upload_height)
+
         return {
             "success": True,
-            "elements": result.get("elements", []),
-            "image_size": {"width": width, "height": height}
+            "elements": elements,
+            "image_size": {"width": width, "height": height},
+            "upload_size": {"width": upload_width, "height": upload_height}
         }
 
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def _scale_bbox(bbox: dict, scale_x: float, scale_y: float, width: int, height: int) -> dict:
+    """送信画像の座標の bbox を元画像の座標に変換（画像の範囲内に収める）"""
+    x = min(max(0, round(float(bbox.get("x", 0)) * scale_x)), width)
+    y = min(max(0, round(float(bbox.get("y", 0)) * scale_y)), height)
+    return {
+        **bbox,
+        "x": x,
+        "y": y,
+        "width": min(max(0, round(float(bbox.get("width", 0)) * scale_x)), width - x),
+        "height": min(max(0, round(float(bbox.get("height", 0)) * scale_y)), height - y)
+    }
+
+
+def _scale_style(style: dict, scale: float) -> dict:
+    """送信画像の単位の style（fontSize など）を元画像の単位に変換（数値でない値はそのまま）"""
+    scaled = dict(style)
+    for key in PIXEL_STYLE_KEYS:
+        value = scaled.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            scaled[key] = round(value * scale, 1) if isinstance(value, float) else round(value * scale)
+    return scaled
+
+
 # ツール関数のラッパー
 class _tool_func:
     @staticmethod
@@ -0,0 +1,134 @@
+"""
+genai クライアントプール
+API Key ごとに genai.Client をプロセス内で1つだけ作成して使い回す
+（HTTP接続の keep-alive を効かせ、画像ごとのTLSハンドシェイクを避ける）
+
+非同期側（client.aio）の接続はイベントループに紐づくため、イベントループごとに別の
+genai.Client を使う（run_sync の共有ループと、呼び出し側の asyncio.run が混在しても
+閉じたループの接続を使い回さない）。
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+from google import genai  # type: ignore
+from google.genai import types
+
+# 接続プールの上限（ホストあたりの同時接続数・待機中に保持する接続数）
+MAX_CONNECTIONS = int(os.environ.get("GENAI_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("GENAI_MAX_KEEPALIVE_CONNECTIONS", "16"))
+# 待機中の接続を閉じるまでの秒数
+KEEPALIVE_EXPIRY = float(os.environ.get("GENAI_KEEPALIVE_EXPIRY", "60"))
+
+_clients: Dict[str, "SharedClient"] = {}
+_lock = threading.Lock()
+_limits: Optional[httpx.Limits] = None
+
+
+def configure_pool(
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = KEEPALIVE_EXPIRY
+) -> None:
+    """
+    接続プールの上限を設定する
+
+    設定は以降に作成されるクライアントに適用されるため、作成済みのクライアントは破棄する。
+
+    Args:
+        max_connections: 同時接続数の上限
+        max_keepalive_connections: 待機中に保持する接続数の上限
+        keepalive_expiry: 待機中の接続を閉じるまでの秒数
+    """
+    global _limits
+    with _lock:
+        _limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        _clients.clear()
+
+
+def _http_options() -> types.HttpOptions:
+    limits = _limits or httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    return types.HttpOptions(
+        client_args={"limits": limits},
+        async_client_args={"limits": limits}
+    )
+
+
+class SharedClient:
+    """
+    プロセス内で共有する genai.Client
+
+    同期API（client.models など）は1つの genai.Client を使い回し、client.aio は
+    実行中のイベントループごとの genai.Client のものを返す（ループが破棄されると一緒に破棄される）。
+    """
+
+    def __init__(self, api_key: str, http_options: Optional[types.HttpOptions] = None):
+        """
+        Args:
+            api_key: Google API Key
+            http_options: genai.Client の http_options（省略時は接続プールの設定）
+        """
+        self._api_key = api_key
+        self._http_options = http_options or _http_options()
+        self._client = genai.Client(api_key=api_key, http_options=self._http_options)
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, genai.Client]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def aio(self) -> Any:
+        """実行中のイベントループ用の非同期クライアント（ループ外では同期側のクライアントのもの）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._client.aio
+        with self._lock:
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = genai.Client(api_key=self._api_key, http_options=self._http_options)
+                self._loop_clients[loop] = client
+        return client.aio
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def get_shared_client(api_key: Optional[str] = None) -> SharedClient:
+    """
+    API Key に対応する共有クライアントを取得（なければ作成）
+
+    Args:
+        api_key: Google API Key（省略時は環境変数 GOOGLE_API_KEY）
+
+    Returns:
+        SharedClient: genai.Client と同じように使える共有クライアント
+    """
+    key = api_key or os.environ.get("GOOGLE_API_KEY")
+    if not key:
+        raise ValueError("GOOGLE_API_KEY environment variable is required")
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = SharedClient(key)
+            _clients[key] = client
+        return client
+
+
+def clear_clients() -> None:
+    """共有クライアントを破棄する（テスト・API Key のローテーション用）"""
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,211 @@
+"""
+参照画像の準備済みキャッシュ
+Base64 / バイト列の画像を一度だけデコード・縮小・エンコードし、
+内容のハッシュをキーにプロセス内で使い回す（メモリ上限付きLRU）
+
+Web Research・Reasoning・設計生成・各要素の画像生成・画像分析が
+同じ参照画像を毎回フル解像度でデコードし、PNGに再エンコードしていたのを1回にまとめる。
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Optional, Tuple, Union
+
+from google.genai import types
+from PIL import Image
+
+from .image_handle import ImageHandle
+
+# 参照画像として渡すときの長辺の上限（px、0 で縮小しない）
+REFERENCE_MAX_EDGE = int(os.environ.get("REFERENCE_IMAGE_MAX_EDGE", "1536"))
+
+# キャッシュが保持するエンコード済みデータの合計の上限（バイト）
+DEFAULT_MAX_BYTES = int(os.environ.get("DECODED_IMAGE_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+
+# PIL の形式名 → MIMEタイプ（この形式なら縮小不要のときデコードも再エンコードもせずそのまま送る）
+_FORMAT_MIME = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class PreparedImage:
+    """モデルに渡す形に準備した画像（縮小・エンコード済み）"""
+
+    __slots__ = ("data", "mime_type", "size", "original_size", "_part")
+
+    def __init__(self, data: bytes, mime_type: str, size: Tuple[int, int], original_size: Tuple[int, int]):
+        self.data = data
+        self.mime_type = mime_type
+        # 準備後の (幅, 高さ)
+        self.size = size
+        # 元画像の (幅, 高さ)
+        self.original_size = original_size
+        self._part: Optional[types.Part] = None
+
+    @property
+    def scale(self) -> float:
+        """元画像に対する縮小率（1.0 で等倍）"""
+        return self.size[0] / self.original_size[0] if self.original_size[0] else 1.0
+
+    @property
+    def part(self) -> types.Part:
+        """generate_content の contents にそのまま渡せるパート"""
+        if self._part is None:
+            self._part = types.Part.from_bytes(data=self.data, mime_type=self.mime_type)
+        return self._part
+
+    def to_pil(self) -> Image.Image:
+        """PIL Image として開く"""
+        return Image.open(BytesIO(self.data))
+
+    def __repr__(self) -> str:
+        return f"PreparedImage(mime_type={self.mime_type!r}, size={self.size}, original_size={self.original_size})"
+
+
+def _source_bytes(source: Union[ImageHandle, bytes, str]) -> Tuple[bytes, str]:
+    """入力を (バイト列, sha256) に変換"""
+    if isinstance(source, ImageHandle):
+        return source.data, source.sha256
+    data = source if isinstance(source, (bytes, bytearray)) else base64.b64decode(source)
+    return bytes(data), hashlib.sha256(data).hexdigest()
+
+
+def prepare_image(
+    data: bytes,
+    max_edge: Optional[int] = None,
+    image_format: Optional[str] = None,
+    quality: int = 90
+) -> PreparedImage:
+    """
+    画像を縮小・エンコードする（キャッシュなし）
+
+    Args:
+        data: 画像のバイト列
+        max_edge: 長辺の上限（px）。None / 0 で縮小しない
+        image_format: "JPEG" / "WEBP" / "PNG"。None で自動（縮小不要なら元のまま、
+                      縮小する場合は透過ありなら PNG、なければ JPEG）。
+                      透過ありの画像は "JPEG" を指定しても PNG にする
+        quality: JPEG / WebP の品質
+
+    Returns:
+        PreparedImage
+    """
+    image = Image.open(BytesIO(data))
+    original_size = image.size
+    needs_resize = bool(max_edge) and max(original_size) > max_edge
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha and image_format and image_format.upper() == "JPEG":
+        # JPEG では透過が失われるため PNG で送る
+        image_format = "PNG"
+
+    if not needs_resize and (image_format is None or image_format.upper() == image.format):
+        mime_type = _FORMAT_MIME.get(image.format or "")
+        if mime_type is not None:
+            return PreparedImage(data, mime_type, original_size, original_size)
+
+    if needs_resize:
+        scale = max_edge / max(original_size)
+        target = (max(1, round(original_size[0] * scale)), max(1, round(original_size[1] * scale)))
+        # JPEG は縮小デコードで全画素の展開を避ける
+        if image.format == "JPEG":
+            image.draft("RGB", target)
+        image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+    else:
+        image.load()
+
+    fmt = (image_format or ("PNG" if has_alpha else "JPEG")).upper()
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif fmt in ("PNG", "WEBP") and image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    buffer = BytesIO()
+    save_params = {"quality": quality} if fmt in ("JPEG", "WEBP") else {}
+    image.save(buffer, fmt, **save_params)
+    return PreparedImage(buffer.getvalue(), _FORMAT_MIME.get(fmt, "image/png"), image.size, original_size)
+
+
+class DecodedImageCache:
+    """準備済み画像のLRUキャッシュ（キー: 内容のsha256 + 準備条件）"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, PreparedImage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        source: Union[ImageHandle, bytes, str],
+        max_edge: Optional[int] = REFERENCE_MAX_EDGE,
+        image_format: Optional[str] = None,
+        quality: int = 90
+    ) -> PreparedImage:
+        """
+        準備済みの画像を取得（無ければ準備してキャッシュする）
+
+        Args:
+            source: ImageHandle / バイト列 / Base64文字列
+            max_edge: 長辺の上限（px）。None / 0 で縮小しない
+            image_format: 出力形式（prepare_image を参照）
+            quality: JPEG / WebP の品質
+
+        Returns:
+            PreparedImage
+        """
+        data, sha256 = _source_bytes(source)
+        key = (sha256, max_edge or 0, (image_format or "").upper(), quality)
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prepared
+            self.misses += 1
+
+        prepared = prepare_image(data, max_edge=max_edge, image_format=image_format, quality=quality)
+
+        with self._lock:
+            if key not in self._entries and len(prepared.data) <= self.max_bytes:
+                self._entries[key] = prepared
+                self._bytes += len(prepared.data)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted.data)
+        return prepared
+
+    def stats(self) -> dict:
+        """ヒット/ミス数と使用量"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_default_cache: Optional[DecodedImageCache] = None
+_default_lock = threading.Lock()
+
+
+def get_decoded_image_cache() -> DecodedImageCache:
+    """プロセス共通のキャッシュを取得"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DecodedImageCache()
+        return _default_cache
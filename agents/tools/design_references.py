@@ -6,6 +6,7 @@
 
 import json
 import base64
+import threading
 from pathlib import Path
 from typing import Optional, List
 
@@ -14,13 +15,93 @@ DATASET_PATH = Path(__file__).parent.parent.parent / "traning-img" / "dataset.js
 IMAGES_DIR = Path(__file__).parent.parent.parent / "traning-img"
 
 
-def _load_dataset() -> dict:
-    """データセットを読み込む"""
-    if not DATASET_PATH.exists():
-        return {"images": [], "design_patterns": {}}
+class _DatasetSnapshot:
+    """
+    ある時点の dataset.json から構築したインデックス（構築後は変更しない）
+
+    カテゴリ・テイスト・配色の転置インデックスと ID → レコードの対応表を持つ。
+    """
+
+    __slots__ = ("signature", "version", "dataset", "by_id", "by_category", "by_taste", "by_palette", "summary")
+
+    def __init__(self, signature: Optional[tuple], version: int, dataset: dict):
+        by_id, by_category, by_taste, by_palette = {}, {}, {}, {}
+        for position, img in enumerate(dataset.get("images", [])):
+            by_id.setdefault(img.get("id"), position)
+            by_category.setdefault(img.get("category", ""), []).append(position)
+            for tag in set(img.get("taste", [])):
+                by_taste.setdefault(tag, []).append(position)
+            for tag in set(img.get("palette", [])):
+                by_palette.setdefault(tag, []).append(position)
+
+        self.signature = signature
+        self.version = version
+        self.dataset = dataset
+        self.by_id = by_id
+        self.by_category = by_category
+        self.by_taste = by_taste
+        self.by_palette = by_palette
+        # get_references_summary が遅延生成する（同じスナップショットなら内容は同じ）
+        self.summary: Optional[str] = None
+
+    @property
+    def images(self) -> list:
+        return self.dataset.get("images", [])
+
+
+class _DatasetIndex:
+    """
+    データセットのインメモリインデックス
+
+    dataset.json の mtime/サイズが変わった時だけ新しいスナップショットを構築し、
+    参照を1回の代入で差し替える（読み手は常に一貫したスナップショットを見る）。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._snapshot: Optional[_DatasetSnapshot] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> _DatasetSnapshot:
+        """ファイルが更新されていれば再構築し、最新のスナップショットを返す"""
+        try:
+            stat = self.path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.signature != signature:
+                snapshot = self._build(signature, snapshot.version + 1 if snapshot else 1)
+                self._snapshot = snapshot
+        return snapshot
+
+    def _build(self, signature: Optional[tuple], version: int) -> _DatasetSnapshot:
+        """スナップショットを構築（ロック取得済みで呼ぶ）"""
+        if signature is None:
+            dataset = {"images": [], "design_patterns": {}}
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                dataset = json.load(f)
+        return _DatasetSnapshot(signature, version, dataset)
+
 
-    with open(DATASET_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+_index = _DatasetIndex(DATASET_PATH)
+
+
+def _get_index() -> _DatasetSnapshot:
+    """最新のデータセットインデックスを取得"""
+    return _index.refresh()
+
+
+def _load_dataset() -> dict:
+    """データセットを読み込む（ファイル更新時のみ再読み込み）"""
+    return _get_index().dataset
 
 
 def search_references(
@@ -46,43 +127,40 @@ def search_references(
         }
     """
     try:
-        dataset = _load_dataset()
-        images = dataset.get("images", [])
-
-        results = []
-
-        for img in images:
-            score = 0
-
-            # カテゴリマッチ
-            if category and category in img.get("category", ""):
-                score += 10
-
-            # テイストマッチ
-            if taste:
-                img_taste = img.get("taste", [])
-                matches = len(set(taste) & set(img_taste))
-                score += matches * 5
-
-            # パレットマッチ
-            if palette:
-                img_palette = img.get("palette", [])
-                matches = len(set(palette) & set(img_palette))
-                score += matches * 3
-
-            # スコアがあれば追加
-            if score > 0 or (not category and not taste and not palette):
-                results.append({
-                    **img,
-                    "_score": score
-                })
-
-        # スコア順にソート
-        results.sort(key=lambda x: x.get("_score", 0), reverse=True)
-
-        # スコアを削除してlimit件返す
-        for r in results:
-            r.pop("_score", None)
+        index = _get_index()
+        images = index.images
+
+        if not category and not taste and not palette:
+            # 条件なしは全件（データセット順、コピーするのは返す分だけ）
+            return {
+                "success": True,
+                "references": [dict(img) for img in images[:limit]],
+                "count": len(images)
+            }
+
+        # 転置インデックスからヒットした画像のみスコア加算
+        scores: dict = {}
+
+        # カテゴリマッチ（部分一致のため、カテゴリ名の一覧を走査）
+        if category:
+            for name, positions in index.by_category.items():
+                if category in name:
+                    for position in positions:
+                        scores[position] = scores.get(position, 0) + 10
+
+        # テイストマッチ
+        for tag in set(taste or []):
+            for position in index.by_taste.get(tag, []):
+                scores[position] = scores.get(position, 0) + 5
+
+        # パレットマッチ
+        for tag in set(palette or []):
+            for position in index.by_palette.get(tag, []):
+                scores[position] = scores.get(position, 0) + 3
+
+        # スコア順（同点はデータセット順）にソート
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = [dict(images[position]) for position, _ in ranked]
 
         return {
             "success": True,
@@ -110,7 +188,7 @@ def get_design_patterns() -> dict:
     """
     try:
         dataset = _load_dataset()
-        patterns = dataset.get("design_patterns", {})
+        patterns = dict(dataset.get("design_patterns", {}))
 
         return {
             "success": True,
@@ -141,23 +219,23 @@ def get_reference_image(image_id: str, include_base64: bool = False) -> dict:
         }
     """
     try:
-        dataset = _load_dataset()
-        images = dataset.get("images", [])
+        index = _get_index()
+        position = index.by_id.get(image_id)
 
-        for img in images:
-            if img.get("id") == image_id:
-                result = {
-                    "success": True,
-                    "image": img
-                }
+        if position is not None:
+            img = dict(index.images[position])
+            result = {
+                "success": True,
+                "image": img
+            }
 
-                if include_base64:
-                    img_path = IMAGES_DIR / img.get("filename", "")
-                    if img_path.exists():
-                        with open(img_path, "rb") as f:
-                            result["image_base64"] = base64.b64encode(f.read()).decode()
+            if include_base64:
+                img_path = IMAGES_DIR / img.get("filename", "")
+                if img_path.exists():
+                    with open(img_path, "rb") as f:
+                        result["image_base64"] = base64.b64encode(f.read()).decode()
 
-                return result
+            return result
 
         return {
             "success": False,
@@ -179,9 +257,15 @@ def get_references_summary() -> str:
         str: サマリーテキスト
     """
     try:
-        dataset = _load_dataset()
-        images = dataset.get("images", [])
-        patterns = dataset.get("design_patterns", {})
+        index = _get_index()
+
+        # データセットが更新されるまで同じサマリーを使い回す
+        summary = index.summary
+        if summary is not None:
+            return summary
+
+        images = index.images
+        patterns = index.dataset.get("design_patterns", {})
 
         lines = ["## 参照デザインパターン\n"]
 
@@ -198,7 +282,9 @@ def get_references_summary() -> str:
             taste = ", ".join(img.get("taste", [])[:3])
             lines.append(f"- **{img.get('category')}**: {taste} ({img.get('comment', '')})")
 
-        return "\n".join(lines)
+        summary = "\n".join(lines)
+        index.summary = summary
+        return summary
 
     except Exception:
         return ""
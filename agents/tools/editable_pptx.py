@@ -0,0 +1,216 @@
+"""
+画像 → 編集可能なPPTX
+analyze_image で要素を識別し、元画像の座標をスライド座標（1920x1080）に変換して image_to_pptx で組み立てる
+
+- テキスト要素: 編集可能なテキストボックス
+- 背景・イラスト・写真: 元画像の該当範囲
+  - crop_mode="native": 元画像を1回だけ埋め込み、PPTXのトリミングで表示（切り出し・再エンコードなし）
+  - crop_mode="pixel": 元画像を1回デコードして全範囲を切り出し、配置サイズへの縮小と
+    最終形式（写真調は JPEG、透過・図版は PNG）でのエンコードをスレッドで並列に行って埋め込む
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .analyze_image import analyze_image
+from .image_handle import ImageHandle
+from .image_to_pptx import (
+    AGENT_OUTPUT_DIR,
+    SLIDE_HEIGHT,
+    SLIDE_WIDTH,
+    clamp_crop_box,
+    generate_session_id,
+    image_to_pptx
+)
+from .media_optimizer import OPTIMIZE_MEDIA, encode_picture, picture_kind, resize_to_display
+
+# 非テキスト要素の配置方法（native / pixel）
+CROP_MODE = os.environ.get("EDITABLE_PPTX_CROP_MODE", "native")
+
+# crop_mode="pixel" のエンコードに使うスレッド数
+ENCODE_WORKERS = int(os.environ.get("EDITABLE_PPTX_ENCODE_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def image_to_editable_pptx(
+    image: Union[ImageHandle, str, Path],
+    session_id: Optional[str] = None,
+    output_dir: Optional[Path] = None,
+    api_key: Optional[str] = None,
+    client: Optional[Any] = None,
+    analysis: Optional[dict] = None,
+    crop_mode: str = CROP_MODE,
+    max_workers: int = ENCODE_WORKERS
+) -> dict:
+    """
+    画像を分析し、要素ごとに編集可能なPPTXを生成する
+
+    Args:
+        image: 元画像（ImageHandle またはファイルパス）
+        session_id: セッションID（PPTXのファイル名。省略時は自動生成）
+        output_dir: 出力ディレクトリ（省略時は agent_output/{session_id}）
+        api_key: Google API Key（省略時は環境変数から取得）
+        client: 使用する genai クライアント（省略時は api_key の共有クライアント）
+        analysis: analyze_image の結果（指定すると分析を省略する）
+        crop_mode: "native"（PPTXのトリミング）/ "pixel"（切り出した画像を埋め込む）
+        max_workers: crop_mode="pixel" のエンコードに使うスレッド数
+
+    Returns:
+        dict: {
+            "success": bool,
+            "session_id": str,
+            "file_path": str,
+            "analysis_path": str,  # 分析結果（元画像の座標）
+            "elements": list,  # 配置した要素（スライド座標、画像は含まない）
+            "image_size": dict,
+            "media": dict,  # image_to_pptx の media
+            "error": str  # エラー時のみ
+        }
+    """
+    session_id = session_id or generate_session_id()
+    try:
+        if crop_mode not in ("native", "pixel"):
+            raise ValueError(f"Unknown crop_mode: {crop_mode}")
+
+        source = image if isinstance(image, ImageHandle) else ImageHandle.from_file(image)
+        out_dir = Path(output_dir) if output_dir else AGENT_OUTPUT_DIR / session_id
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        # Step 1: 分析（bbox は元画像の座標）
+        if analysis is None:
+            analysis = analyze_image(source, api_key=api_key, client=client)
+            if not analysis.get("success"):
+                return {"success": False, "session_id": session_id, "error": analysis.get("error", "analyze_image failed")}
+
+        analysis_path = out_dir / f"{session_id}.analysis.json"
+        with open(analysis_path, "w", encoding="utf-8") as f:
+            json.dump(analysis, f, ensure_ascii=False, indent=2)
+
+        # Step 2: スライド座標に変換して要素を組み立てる
+        with Image.open(source.stream()) as pil:
+            image_size = pil.size
+        elements = _to_slide_elements(analysis.get("elements", []), source, image_size)
+
+        # Step 3: pixel モードは全範囲を1回のデコードで切り出し、並列にエンコード
+        if crop_mode == "pixel":
+            _crop_in_memory(elements, source, max_workers)
+
+        # Step 4: PPTXを組み立てる（pixel モードは最終形式でエンコード済みなので再エンコードしない）
+        result = image_to_pptx(
+            elements=elements,
+            session_id=session_id,
+            output_dir=out_dir,
+            optimize_media=OPTIMIZE_MEDIA and crop_mode == "native"
+        )
+        if not result.get("success"):
+            return {"success": False, "session_id": session_id, "error": result.get("error")}
+
+        return {
+            "success": True,
+            "session_id": session_id,
+            "file_path": result["file_path"],
+            "analysis_path": str(analysis_path),
+            "elements": [
+                {k: v for k, v in elem.items() if k not in ("source_image", "image")}
+                for elem in elements
+            ],
+            "image_size": {"width": image_size[0], "height": image_size[1]},
+            "media": result["media"]
+        }
+
+    except Exception as e:
+        return {"success": False, "session_id": session_id, "error": str(e)}
+
+
+def _to_slide_elements(
+    analyzed: List[dict],
+    source: ImageHandle,
+    image_size: Tuple[int, int]
+) -> List[dict]:
+    """
+    分析結果の要素（元画像の座標）を image_to_pptx の要素（スライド座標）に変換する
+
+    非テキスト要素は source_image + crop_bbox（元画像の座標）で元画像の範囲を指定する。
+    """
+    scale_x = SLIDE_WIDTH / image_size[0]
+    scale_y = SLIDE_HEIGHT / image_size[1]
+
+    elements = []
+    for i, elem in enumerate(analyzed):
+        elem_type = elem.get("type", "")
+        elem_id = elem.get("id") or f"{elem_type}_{i}"
+        bbox = elem.get("bbox") or {}
+        crop_bbox = {
+            "x": int(bbox.get("x", 0)),
+            "y": int(bbox.get("y", 0)),
+            "width": int(bbox.get("width", image_size[0])),
+            "height": int(bbox.get("height", image_size[1]))
+        }
+        slide_bbox = {
+            "x": int(crop_bbox["x"] * scale_x),
+            "y": int(crop_bbox["y"] * scale_y),
+            "width": int(crop_bbox["width"] * scale_x),
+            "height": int(crop_bbox["height"] * scale_y)
+        }
+
+        if elem_type == "text":
+            if not elem.get("content"):
+                continue
+            style = dict(elem.get("style") or {})
+            if "fontSize" in style:
+                style["fontSize"] = max(1, round(float(style["fontSize"]) * scale_y))
+            elements.append({"id": elem_id, "type": "text", "content": elem["content"], "bbox": slide_bbox, "style": style})
+
+        elif elem_type == "background":
+            elements.append({"id": elem_id, "type": "background", "source_image": source, "crop_bbox": crop_bbox})
+
+        elif crop_bbox["width"] > 0 and crop_bbox["height"] > 0:
+            # illustration / image など
+            elements.append({
+                "id": elem_id,
+                "type": "image",
+                "source_image": source,
+                "crop_bbox": crop_bbox,
+                "bbox": slide_bbox
+            })
+    return elements
+
+
+def _crop_in_memory(elements: List[dict], source: ImageHandle, max_workers: int) -> None:
+    """
+    source_image + crop_bbox の要素を、切り出した画像（image）に置き換える
+
+    元画像のデコードは1回だけ行い、配置サイズへの縮小と最終形式でのエンコード
+    （Pillow のリサイズ・zlib / libjpeg は GIL を解放する）はスレッドで並列に行う。
+    """
+    targets = [elem for elem in elements if elem.get("source_image") is not None]
+    if not targets:
+        return
+
+    with Image.open(source.stream()) as pil:
+        pil.load()
+        has_alpha = pil.mode in ("RGBA", "LA") or (pil.mode == "P" and "transparency" in pil.info)
+        if pil.mode not in ("RGB", "RGBA", "L", "LA"):
+            pil = pil.convert("RGBA" if has_alpha else "RGB")
+        # native モードと同じく範囲を画像内に収める（はみ出した部分を黒で埋めない）
+        crops = [pil.crop(clamp_crop_box(elem["crop_bbox"], pil.size)) for elem in targets]
+
+    def encode(elem: dict, crop: Image.Image) -> ImageHandle:
+        if elem["type"] == "background":
+            display_size = (SLIDE_WIDTH, SLIDE_HEIGHT)
+        else:
+            display_size = (elem["bbox"]["width"], elem["bbox"]["height"])
+        has_alpha, flat = picture_kind(crop)
+        return encode_picture(resize_to_display(crop, display_size), has_alpha, flat)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        handles = list(pool.map(encode, targets, crops))
+
+    for elem, handle in zip(targets, handles):
+        del elem["source_image"]
+        del elem["crop_bbox"]
+        elem["image"] = handle
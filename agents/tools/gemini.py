@@ -0,0 +1,177 @@
+"""
+Gemini 呼び出しの共通処理
+全ての generate_content 呼び出しをここに集約し、計測（スパン記録）とレート制御を行う
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, List, Optional
+
+from ..tracing import span, estimate_request_bytes, record_response
+from .rate_limit import get_limiter, is_rate_limit_error
+from .retry import notify_request_done, notify_request_requeued, notify_request_sent
+
+# 429 / RESOURCE_EXHAUSTED を受けたときに再キューする回数
+MAX_REQUEUES = int(os.environ.get("GEMINI_MAX_REQUEUES", "5"))
+
+
+async def agenerate_content(
+    client: Any,
+    model: str,
+    contents: Any,
+    config: Optional[Any] = None,
+    name: str = "generate_content"
+) -> Any:
+    """
+    client.aio.models.generate_content を計測・レート制御付きで呼び出す
+
+    モデルごとのリミッターで枠を確保してから呼び出し、
+    429 / RESOURCE_EXHAUSTED の場合は同時実行数を下げて最大 MAX_REQUEUES 回まで再キューする。
+
+    Args:
+        client: genai クライアント
+        model: モデル名
+        contents: リクエスト内容
+        config: GenerateContentConfig（任意）
+        name: スパン名（gemini:{name} として記録）
+
+    Returns:
+        GenerateContentResponse
+    """
+    limiter = get_limiter(model)
+    with span(f"gemini:{name}", model=model, request_bytes=estimate_request_bytes(contents)) as current:
+        waited = 0.0
+        for attempt in range(MAX_REQUEUES + 1):
+            waited += await limiter.aacquire()
+            # リトライ・ヘッジングには送信から応答までの時間だけを伝える
+            notify_request_sent()
+            sent_at = time.perf_counter()
+            try:
+                response = await client.aio.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config
+                )
+            except asyncio.CancelledError:
+                # ヘッジングで負けた側など、キャンセル時も枠を返す
+                limiter.release(success=False)
+                raise
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                limiter.release(throttled=throttled, success=False)
+                if not throttled or attempt == MAX_REQUEUES:
+                    current.set(rate_limit_wait_ms=round(waited * 1000, 3), requeues=attempt)
+                    raise
+                notify_request_requeued()
+                await asyncio.sleep(limiter.backoff())
+                continue
+            notify_request_done(time.perf_counter() - sent_at)
+            limiter.release()
+            current.set(rate_limit_wait_ms=round(waited * 1000, 3), requeues=attempt)
+            record_response(current, response)
+            return response
+
+
+def generate_content(
+    client: Any,
+    model: str,
+    contents: Any,
+    config: Optional[Any] = None,
+    name: str = "generate_content"
+) -> Any:
+    """client.models.generate_content を計測・レート制御付きで呼び出す（同期版）"""
+    limiter = get_limiter(model)
+    with span(f"gemini:{name}", model=model, request_bytes=estimate_request_bytes(contents)) as current:
+        waited = 0.0
+        for attempt in range(MAX_REQUEUES + 1):
+            waited += limiter.acquire()
+            try:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config
+                )
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                limiter.release(throttled=throttled, success=False)
+                if not throttled or attempt == MAX_REQUEUES:
+                    current.set(rate_limit_wait_ms=round(waited * 1000, 3), requeues=attempt)
+                    raise
+                time.sleep(limiter.backoff())
+                continue
+            limiter.release()
+            current.set(rate_limit_wait_ms=round(waited * 1000, 3), requeues=attempt)
+            record_response(current, response)
+            return response
+
+
+async def agenerate_content_stream(
+    client: Any,
+    model: str,
+    contents: Any,
+    config: Optional[Any] = None,
+    name: str = "generate_content",
+    on_text: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    client.aio.models.generate_content_stream を計測・レート制御付きで呼び出す
+
+    応答テキストの断片が届くたびに on_text を呼び、全文を返す。
+    429 / RESOURCE_EXHAUSTED は最初の断片を受け取る前であれば再キューする。
+
+    Args:
+        client: genai クライアント
+        model: モデル名
+        contents: リクエスト内容
+        config: GenerateContentConfig（任意）
+        name: スパン名（gemini:{name} として記録）
+        on_text: 断片ごとに呼ばれるコールバック
+
+    Returns:
+        str: 応答テキスト全文
+    """
+    limiter = get_limiter(model)
+    with span(f"gemini:{name}", model=model, request_bytes=estimate_request_bytes(contents), stream=True) as current:
+        waited = 0.0
+        for attempt in range(MAX_REQUEUES + 1):
+            waited += await limiter.aacquire()
+            started = time.perf_counter()
+            texts: List[str] = []
+            last_chunk = None
+            try:
+                stream = await client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=config
+                )
+                async for chunk in stream:
+                    if last_chunk is None:
+                        current.set(first_chunk_ms=round((time.perf_counter() - started) * 1000, 3))
+                    last_chunk = chunk
+                    text = chunk.text
+                    if text:
+                        texts.append(text)
+                        if on_text is not None:
+                            on_text(text)
+            except asyncio.CancelledError:
+                limiter.release(success=False)
+                raise
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                limiter.release(throttled=throttled, success=False)
+                if not throttled or last_chunk is not None or attempt == MAX_REQUEUES:
+                    current.set(rate_limit_wait_ms=round(waited * 1000, 3), requeues=attempt)
+                    raise
+                await asyncio.sleep(limiter.backoff())
+                continue
+            limiter.release()
+            full_text = "".join(texts)
+            # トークン使用量は最後の断片に含まれる
+            record_response(current, last_chunk)
+            current.set(
+                rate_limit_wait_ms=round(waited * 1000, 3),
+                requeues=attempt,
+                response_bytes=len(full_text.encode("utf-8"))
+            )
+            return full_text
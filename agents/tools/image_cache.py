@@ -0,0 +1,184 @@
+"""
+画像生成キャッシュ
+generate_image の入力（プロンプト・スタイル・解像度・参照画像）をハッシュ化し、
+生成結果をディスクに保存する（コンテンツアドレス方式、サイズ上限付きLRU）
+
+画像ストアが有効な場合、キャッシュのファイルはストアの実体へのハードリンクにする
+（セッションに保存される同じ画像とディスク上の実体を共有する）。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .image_handle import MIME_EXTENSIONS, ImageHandle
+
+# キャッシュディレクトリ
+CACHE_DIR = Path(os.environ.get(
+    "IMAGE_CACHE_DIR",
+    str(Path(__file__).parent.parent.parent / "agent_output" / "_cache" / "images")
+))
+
+# キャッシュ容量の上限（バイト）
+DEFAULT_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# 拡張子 → MIMEタイプ（MIME_EXTENSIONS の逆引き）
+_EXT_MIME = {ext: mime for mime, ext in MIME_EXTENSIONS.items()}
+
+
+def make_cache_key(**inputs) -> str:
+    """
+    入力値から正規化したキャッシュキー（SHA-256）を生成
+
+    Args:
+        **inputs: JSONシリアライズ可能な入力値（キー順は問わない）
+
+    Returns:
+        str: 16進数のハッシュ値
+    """
+    canonical = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """ディスク上の画像キャッシュ（最終アクセス時刻によるLRU削除）"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str, mime_type: str) -> Path:
+        return self.cache_dir / f"{key}.{MIME_EXTENSIONS.get(mime_type, 'bin')}"
+
+    def _find(self, key: str) -> Optional[Path]:
+        for ext in list(_EXT_MIME) + ["bin"]:
+            path = self.cache_dir / f"{key}.{ext}"
+            if path.exists():
+                return path
+        return None
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        キャッシュから画像を取得
+
+        Returns:
+            (画像データ, MIMEタイプ) または None
+        """
+        path = self._find(key)
+        if path is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            data = path.read_bytes()
+            # LRU用に最終アクセス時刻を更新
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data, _EXT_MIME.get(path.suffix[1:], "application/octet-stream")
+
+    def put(self, key: str, data: bytes, mime_type: str) -> None:
+        """画像をキャッシュに保存し、容量を超えていれば古いものから削除"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key, mime_type)
+
+        # agents.blob_store は agents.tools に依存するため遅延インポート
+        from ..blob_store import USE_BLOB_STORE, get_blob_store
+
+        if USE_BLOB_STORE:
+            # 実体はストアに1つだけ置き、キャッシュはそのハードリンクにする（セッションの参照とは別扱い）
+            get_blob_store().link(ImageHandle(data, mime_type), path, record=False)
+        else:
+            # 書き込み途中のファイルを読まれないよう一時ファイル経由で置き換える
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list:
+        return [p for p in self.cache_dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+
+    def _scan_size(self) -> int:
+        if not self.cache_dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self._entries())
+
+    def _evict(self) -> None:
+        """最終アクセスが古い順に削除して容量上限に収める（ロック取得済みで呼ぶ）"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+        self._total_bytes = total
+
+    def stats(self) -> dict:
+        """ヒット/ミス数と使用容量を取得"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        with self._lock:
+            if self.cache_dir.exists():
+                for path in self._entries():
+                    try:
+                        path.unlink()
+                    except OSError:
+                        continue
+            self._total_bytes = 0
+
+
+_default_cache: Optional[ImageCache] = None
+_default_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    """プロセス共通の画像キャッシュを取得"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ImageCache()
+        return _default_cache
@@ -0,0 +1,137 @@
+"""
+画像ハンドル
+生成からディスク保存・PPTX埋め込みまで、画像を生のバイト列のまま受け渡すための型
+Base64 への変換は JSON API の境界（encode_images）でのみ行う
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Optional, Union
+
+# MIMEタイプ → 拡張子
+MIME_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+# 先頭のマジックバイト → MIMEタイプ（MIMEタイプが分からない入力の判定用）
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class ImageHandle:
+    """画像のバイト列とMIMEタイプ"""
+
+    __slots__ = ("data", "mime_type", "_sha256")
+
+    def __init__(self, data: bytes, mime_type: str = "image/png"):
+        self.data = data
+        self.mime_type = mime_type
+        self._sha256: Optional[str] = None
+
+    @classmethod
+    def from_base64(cls, image_base64: str, mime_type: Optional[str] = None) -> "ImageHandle":
+        """Base64文字列から作成（JSON API からの入力用。MIMEタイプ省略時は内容から判定）"""
+        data = base64.b64decode(image_base64)
+        return cls(data, mime_type or sniff_mime_type(data))
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], mime_type: Optional[str] = None) -> "ImageHandle":
+        """ファイルから作成（MIMEタイプ省略時は拡張子、不明な拡張子なら内容から推定）"""
+        path = Path(path)
+        if mime_type is None:
+            ext = path.suffix.lower().lstrip(".")
+            ext = "jpg" if ext == "jpeg" else ext
+            mime_type = next((m for m, e in MIME_EXTENSIONS.items() if e == ext), None)
+        data = path.read_bytes()
+        return cls(data, mime_type or sniff_mime_type(data))
+
+    @property
+    def size(self) -> int:
+        """バイト数"""
+        return len(self.data)
+
+    @property
+    def sha256(self) -> str:
+        """内容のSHA-256（初回のみ計算）"""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self.data).hexdigest()
+        return self._sha256
+
+    @property
+    def extension(self) -> str:
+        """MIMEタイプに対応する拡張子"""
+        return MIME_EXTENSIONS.get(self.mime_type, "png")
+
+    def stream(self) -> BytesIO:
+        """読み取り用のストリーム（コピーせずにバッファを共有）"""
+        return BytesIO(self.data)
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """
+        バイト列をそのままファイルに書き出す
+
+        一時ファイルからの置き換えで書き込むため、path が画像ストアの実体への
+        ハードリンクだった場合も実体は書き換えない。
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.data)
+        os.replace(tmp_path, path)
+        return path
+
+    def to_base64(self) -> str:
+        """Base64文字列に変換（JSON API の境界でのみ使う）"""
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def __repr__(self) -> str:
+        return f"ImageHandle(mime_type={self.mime_type!r}, size={self.size})"
+
+
+def sniff_mime_type(data: bytes, default: str = "image/png") -> str:
+    """バイト列の先頭から画像のMIMEタイプを判定する（判定できなければ default）"""
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def encode_images(obj: Any, inline: bool = True) -> Any:
+    """
+    結果dict内の画像ハンドルをJSONシリアライズ可能な形に変換する
+
+    inline=True:  {"image": ImageHandle} → {"image_base64": str, "mime_type": str}
+    inline=False: {"image": ImageHandle} → {"image_sha256": str, "image_size": int, "mime_type": str}
+                  （画像本体は file_path 等で参照する軽量モード）
+
+    dict / list は再帰的に処理し、それ以外はそのまま返す。
+    """
+    if isinstance(obj, dict):
+        encoded = {}
+        for key, value in obj.items():
+            if isinstance(value, ImageHandle):
+                if inline:
+                    encoded["image_base64" if key == "image" else f"{key}_base64"] = value.to_base64()
+                else:
+                    encoded[f"{key}_sha256"] = value.sha256
+                    encoded[f"{key}_size"] = value.size
+                encoded.setdefault("mime_type", value.mime_type)
+            else:
+                encoded[key] = encode_images(value, inline)
+        return encoded
+    if isinstance(obj, list):
+        return [encode_images(item, inline) for item in obj]
+    return obj
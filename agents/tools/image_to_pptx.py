@@ -6,16 +6,21 @@ PPTXを生成するツール
 """
 
 import os
-import base64
+import random
+import string
 from pathlib import Path
-from io import BytesIO
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple, Union
 from PIL import Image
 from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.shapes.shapetree import SlideShapes
 from pptx.util import Pt, Emu
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 
+from .image_handle import ImageHandle
+from .media_optimizer import OPTIMIZE_MEDIA, MEDIA_DPI, MEDIA_MAX_BYTES, MediaOptimizer
+
 # フォントパス
 FONT_PATH = Path(__file__).parent.parent / "fonts" / "NotoSansCJKjp-Regular.otf"
 
@@ -26,31 +31,64 @@ SLIDE_HEIGHT = 1080
 # 出力ベースディレクトリ
 AGENT_OUTPUT_DIR = Path(__file__).parent.parent.parent / "agent_output"
 
+# 既存の画像パートから直接図形を作る python-pptx の内部API（無いバージョンでは公開APIの add_picture を使う）
+_PICTURE_FROM_PART = (
+    hasattr(SlideShapes, "_add_pic_from_image_part") and hasattr(SlideShapes, "_shape_factory")
+)
+
+
+def generate_session_id() -> str:
+    """セッションID（英数字4桁-数字4桁）を生成"""
+    chars = string.ascii_uppercase + string.digits
+    return ''.join(random.choices(chars, k=4)) + '-' + ''.join(random.choices(string.digits, k=4))
+
 
 def image_to_pptx(
     elements: List[dict],
     session_id: str,
     original_image_base64: Optional[str] = None,
-    output_dir: Optional[Path] = None
+    output_dir: Optional[Path] = None,
+    slides: Optional[List[List[dict]]] = None,
+    optimize_media: bool = OPTIMIZE_MEDIA,
+    media_dpi: int = MEDIA_DPI,
+    max_media_bytes: Optional[int] = MEDIA_MAX_BYTES
 ) -> dict:
     """
     要素リストからPPTXを生成
 
     Args:
         elements: 要素リスト
-            - type="background": 背景画像（image_base64またはfile_pathで指定）
-            - type="image": 画像（image_base64またはfile_pathで指定）
+            - type="background": 背景画像（image / image_base64 / file_path で指定）
+            - type="image": 画像（image / image_base64 / file_path で指定）
+              image は ImageHandle（バイト列のままスライドに埋め込む）
+            - type="background" / "image" で source_image（ImageHandle またはファイルパス）と
+              crop_bbox（元画像のピクセル座標 {"x","y","width","height"}）を指定すると、
+              元画像を1つのメディアパートとして埋め込み、PPTXのトリミングで該当範囲だけを表示する
+              （切り出し・再エンコードをしない。要素ファイルも書き出さない）
             - type="text": テキストボックス（content, style, bboxで指定）
             - type="shape": 図形（shape, bbox, styleで指定）
         session_id: セッションID
         original_image_base64: 非推奨（後方互換性のため残存）
         output_dir: 出力ディレクトリ（省略時はagent_output/{session_id}）
+        slides: スライドごとの要素リスト。指定すると elements の代わりに使い、複数スライドのPPTXを生成する
+        optimize_media: 画像を配置サイズ × media_dpi まで縮小し、JPEG / PNG を選び直して埋め込む
+                        （要素ファイルは元の画像のまま）
+        media_dpi: 表示サイズに対する解像度
+        max_media_bytes: 埋め込む画像の合計サイズの上限（超える場合は品質・解像度を下げる）。None で上限なし
 
     Returns:
         dict: {
             "success": bool,
             "file_path": str,
             "element_files": list,
+            "media": {
+                "parts": int,    # 埋め込んだ画像パート数
+                "reused": int,   # 共有により省いた数
+                "cropped": int,  # トリミングで配置した数（source_image + crop_bbox）
+                "bytes": int,    # 埋め込んだ画像の合計サイズ
+                # optimize_media 時のみ
+                "original_bytes": int, "saved_bytes": int, "budget_met": bool
+            },
             "error": str  # エラー時のみ
         }
     """
@@ -65,54 +103,42 @@ def image_to_pptx(
         prs.slide_height = Emu(SLIDE_HEIGHT * 914400 // 96)
 
         blank_layout = prs.slide_layouts[6]
-        slide = prs.slides.add_slide(blank_layout)
-
         element_files = []
-
-        # レイヤー順: 背景 → 画像 → テキスト
-        def sort_key(e):
-            t = e.get("type", "")
-            order = {"background": 0, "image": 1, "text": 2}
-            return order.get(t, 1)
-
-        sorted_elements = sorted(elements, key=sort_key)
-
-        for elem in sorted_elements:
-            elem_type = elem.get("type", "")
-            elem_id = elem.get("id", "unknown")
-
-            if elem_type == "text":
-                # テキスト要素 → 編集可能なテキストボックス
-                _add_textbox(slide, elem, prs)
-
-            elif elem_type == "background":
-                # 背景画像 → 全画面配置
-                png_path = _get_image_path(elem, out_dir, elem_id)
-                if png_path:
-                    element_files.append(str(png_path))
-                    slide.shapes.add_picture(
-                        str(png_path),
-                        Emu(0), Emu(0),
-                        prs.slide_width, prs.slide_height
-                    )
-
-            elif elem_type == "image":
-                # 画像要素 → bbox位置に配置
-                png_path = _get_image_path(elem, out_dir, elem_id)
-                if png_path:
-                    element_files.append(str(png_path))
-                    bbox = elem.get("bbox", {})
-                    x, y, width, height = _bbox_to_emu(bbox)
-                    slide.shapes.add_picture(str(png_path), x, y, width, height)
+        slide_elements = slides if slides is not None else [elements]
+        # Base64 入力を保存するファイル名が複数スライドで衝突しないようにする
+        prefixes = [f"slide{i + 1:02d}_" if slides is not None else "" for i in range(len(slide_elements))]
+
+        media = _MediaRegistry()
+        if optimize_media:
+            # 全スライドの配置サイズが揃ってから縮小・エンコードする（予算は全体で判定するため）
+            media.optimizer = MediaOptimizer(target_dpi=media_dpi, max_bytes=max_media_bytes)
+            slide_elements = [
+                _resolve_images(elems, out_dir, prefix, media)
+                for elems, prefix in zip(slide_elements, prefixes)
+            ]
+            optimize_stats = media.optimizer.run()
+
+        for elements_in_slide, file_prefix in zip(slide_elements, prefixes):
+            slide = prs.slides.add_slide(blank_layout)
+            _add_elements(slide, elements_in_slide, prs, out_dir, element_files, media, file_prefix)
 
         # 保存
         pptx_path = out_dir / f"{session_id}.pptx"
         prs.save(pptx_path)
 
+        media_stats = media.stats()
+        if media.optimizer is not None:
+            media_stats.update(
+                original_bytes=optimize_stats["original_bytes"],
+                saved_bytes=optimize_stats["original_bytes"] - media_stats["bytes"],
+                budget_met=optimize_stats["budget_met"]
+            )
+
         return {
             "success": True,
             "file_path": str(pptx_path),
-            "element_files": element_files
+            "element_files": element_files,
+            "media": media_stats
         }
 
     except Exception as e:
@@ -124,21 +150,255 @@ def image_to_pptx(
         }
 
 
-def _get_image_path(elem: dict, out_dir: Path, elem_id: str) -> Optional[Path]:
-    """要素から画像パスを取得（file_pathまたはimage_base64から）"""
+class _MediaRegistry:
+    """
+    プレゼンテーション内の画像パートを内容のSHA-256で共有する
+
+    同じ画像（スライド間で使い回す背景・ロゴなど）は1つのメディアパートとして保存し、
+    2回目以降はリレーションを張るだけにする（再読み込み・パッケージ全体の走査をしない）。
+    optimizer を設定した場合は最適化後の画像を埋め込む（同じ元画像は同じ最適化結果になるため共有も保たれる）。
+    """
+
+    def __init__(self, optimizer: Optional[MediaOptimizer] = None):
+        self.optimizer = optimizer
+        self._parts: Dict[str, object] = {}
+        self._sources: Dict[str, ImageHandle] = {}
+        self._pixel_sizes: Dict[str, Tuple[int, int]] = {}
+        self.reused = 0
+        self.bytes = 0
+        self.cropped = 0
+
+    def source(self, value: Union[ImageHandle, str, Path]) -> ImageHandle:
+        """source_image を ImageHandle に解決する（同じファイルは1回だけ読み込む）"""
+        if isinstance(value, ImageHandle):
+            return value
+        key = str(value)
+        if key not in self._sources:
+            self._sources[key] = ImageHandle.from_file(key)
+        return self._sources[key]
+
+    def pixel_size(self, image: ImageHandle) -> Tuple[int, int]:
+        """画像のピクセルサイズ（ヘッダーのみ読む）"""
+        if image.sha256 not in self._pixel_sizes:
+            with Image.open(image.stream()) as pil:
+                self._pixel_sizes[image.sha256] = pil.size
+        return self._pixel_sizes[image.sha256]
+
+    def add_cropped_picture(self, slide, image: ImageHandle, crop_bbox: dict, x, y, width, height):
+        """
+        元画像をそのまま埋め込み、crop_bbox の範囲だけを表示する
+
+        トリミング量は元画像に対する比率なので、最適化で縮小された画像でもそのまま使える。
+        """
+        left, top, right, bottom = _crop_fractions(crop_bbox, self.pixel_size(image))
+        picture = self.add_picture(slide, image, x, y, width, height)
+        picture.crop_left = left
+        picture.crop_top = top
+        picture.crop_right = right
+        picture.crop_bottom = bottom
+        self.cropped += 1
+        return picture
+
+    def add_picture(self, slide, image: ImageHandle, x, y, width, height):
+        if self.optimizer is not None:
+            image = self.optimizer.get(image)
+        if image.sha256 in self._parts:
+            self.reused += 1
+        else:
+            self.bytes += image.size
+        if not _PICTURE_FROM_PART:
+            # 互換パス: 公開APIで追加（同じ画像のパートは python-pptx がパッケージを走査して共有する）
+            self._parts[image.sha256] = None
+            return slide.shapes.add_picture(image.stream(), x, y, width, height)
+
+        part = self._parts.get(image.sha256)
+        if part is None:
+            part, rId = slide.part.get_or_add_image_part(image.stream())
+            self._parts[image.sha256] = part
+        else:
+            rId = slide.part.relate_to(part, RT.IMAGE)
+        return _picture_from_part(slide, part, rId, x, y, width, height)
+
+    def stats(self) -> dict:
+        return {"parts": len(self._parts), "reused": self.reused, "cropped": self.cropped, "bytes": self.bytes}
+
+
+def _resolve_images(
+    elements: List[dict],
+    out_dir: Path,
+    file_prefix: str,
+    media: _MediaRegistry
+) -> List[dict]:
+    """
+    1スライド分の画像要素を ImageHandle に解決し、配置サイズを media.optimizer に登録する
+
+    Returns:
+        list: 画像要素に image / file_path（トリミング要素は source_image）を設定した要素リスト
+              （元のリストは変更しない）
+    """
+    resolved = []
+    for elem in elements:
+        elem_type = elem.get("type", "")
+        if elem_type in ("background", "image"):
+            if elem_type == "background":
+                display_size = (SLIDE_WIDTH, SLIDE_HEIGHT)
+            else:
+                bbox = elem.get("bbox", {})
+                display_size = (int(bbox.get("width", 100)), int(bbox.get("height", 100)))
+
+            if elem.get("source_image") is not None:
+                image = media.source(elem["source_image"])
+                elem = {**elem, "source_image": image}
+                crop_bbox = elem.get("crop_bbox")
+                if crop_bbox:
+                    # 元画像全体が表示されるとしたときのサイズに換算して登録する
+                    source_width, source_height = media.pixel_size(image)
+                    display_size = (
+                        display_size[0] * source_width / max(1, int(crop_bbox.get("width", source_width))),
+                        display_size[1] * source_height / max(1, int(crop_bbox.get("height", source_height)))
+                    )
+                media.optimizer.add(image, display_size)
+            else:
+                image, file_path = _get_image_source(elem, out_dir, file_prefix + elem.get("id", "unknown"))
+                if image is not None:
+                    elem = {**elem, "image": image, "file_path": file_path}
+                    media.optimizer.add(image, display_size)
+        resolved.append(elem)
+    return resolved
+
+
+def _picture_from_part(slide, part, rId, x, y, width, height):
+    """
+    登録済みの画像パートから図形を作る（python-pptx の内部APIを使うのはここだけ）
+
+    add_picture は呼ぶたびにパッケージ内の全画像パートを走査するため、
+    _MediaRegistry で共有しているパートから直接図形を作る。
+    """
+    pic = slide.shapes._add_pic_from_image_part(part, rId, x, y, width, height)
+    return slide.shapes._shape_factory(pic)
+
+
+def clamp_crop_box(crop_bbox: dict, image_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """
+    元画像のピクセル座標の範囲を画像内に収める
+
+    Returns:
+        (左, 上, 右, 下) のピクセル座標（幅・高さは1px以上）
+    """
+    image_width, image_height = image_size
+    raw_x = int(crop_bbox.get("x", 0))
+    raw_y = int(crop_bbox.get("y", 0))
+    x = min(max(0, raw_x), image_width - 1)
+    y = min(max(0, raw_y), image_height - 1)
+    # 右端・下端は元の範囲のまま（開始位置を画像内に寄せても範囲を広げない）
+    right = min(image_width, max(x + 1, raw_x + int(crop_bbox.get("width", image_width))))
+    bottom = min(image_height, max(y + 1, raw_y + int(crop_bbox.get("height", image_height))))
+    return x, y, right, bottom
+
+
+def _crop_fractions(crop_bbox: dict, image_size: Tuple[int, int]) -> Tuple[float, float, float, float]:
+    """
+    元画像のピクセル座標の範囲を、PPTXのトリミング量（左・上・右・下の比率）に変換する
+
+    範囲は画像内に収める。
+    """
+    image_width, image_height = image_size
+    x, y, right, bottom = clamp_crop_box(crop_bbox, image_size)
+    return (
+        x / image_width,
+        y / image_height,
+        (image_width - right) / image_width,
+        (image_height - bottom) / image_height
+    )
+
+
+def _add_elements(
+    slide,
+    elements: List[dict],
+    prs,
+    out_dir: Path,
+    element_files: List[str],
+    media: _MediaRegistry,
+    file_prefix: str = ""
+) -> None:
+    """1スライド分の要素を配置"""
+    # レイヤー順: 背景 → 画像 → テキスト
+    def sort_key(e):
+        t = e.get("type", "")
+        order = {"background": 0, "image": 1, "text": 2}
+        return order.get(t, 1)
+
+    sorted_elements = sorted(elements, key=sort_key)
+
+    for elem in sorted_elements:
+        elem_type = elem.get("type", "")
+        elem_id = elem.get("id", "unknown")
+
+        if elem_type == "text":
+            # テキスト要素 → 編集可能なテキストボックス
+            _add_textbox(slide, elem, prs)
+
+        elif elem_type in ("background", "image") and elem.get("source_image") is not None:
+            # 元画像のトリミング → 元画像は1つのメディアパートとして共有する
+            image = media.source(elem["source_image"])
+            if elem_type == "background":
+                x, y, width, height = Emu(0), Emu(0), prs.slide_width, prs.slide_height
+            else:
+                x, y, width, height = _bbox_to_emu(elem.get("bbox", {}))
+            if elem.get("crop_bbox"):
+                media.add_cropped_picture(slide, image, elem["crop_bbox"], x, y, width, height)
+            else:
+                media.add_picture(slide, image, x, y, width, height)
+
+        elif elem_type == "background":
+            # 背景画像 → 全画面配置
+            image, file_path = _get_image_source(elem, out_dir, file_prefix + elem_id)
+            if image is not None:
+                if file_path:
+                    element_files.append(file_path)
+                media.add_picture(
+                    slide,
+                    image,
+                    Emu(0), Emu(0),
+                    prs.slide_width, prs.slide_height
+                )
+
+        elif elem_type == "image":
+            # 画像要素 → bbox位置に配置
+            image, file_path = _get_image_source(elem, out_dir, file_prefix + elem_id)
+            if image is not None:
+                if file_path:
+                    element_files.append(file_path)
+                bbox = elem.get("bbox", {})
+                x, y, width, height = _bbox_to_emu(bbox)
+                media.add_picture(slide, image, x, y, width, height)
+
+
+def _get_image_source(elem: dict, out_dir: Path, elem_id: str) -> Tuple[Optional[ImageHandle], Optional[str]]:
+    """
+    要素から埋め込む画像を取得
+
+    Returns:
+        (画像, 要素ファイルのパス)。画像が無い場合は (None, None)
+    """
+    file_path = elem.get("file_path")
+
+    # メモリ上のバイト列（再読み込み・再エンコードしない）
+    image = elem.get("image")
+    if isinstance(image, ImageHandle):
+        return image, (str(file_path) if file_path else None)
+
     # 既にファイルパスがある場合
-    if elem.get("file_path"):
-        return Path(elem["file_path"])
+    if file_path:
+        return ImageHandle.from_file(file_path), str(file_path)
 
-    # Base64から保存
+    # Base64（JSON API からの入力）→ デコードしたバイト列をそのまま保存・埋め込み
     if elem.get("image_base64"):
-        png_path = out_dir / f"{elem_id}.png"
-        image_data = base64.b64decode(elem["image_base64"])
-        image = Image.open(BytesIO(image_data))
-        image.save(png_path)
-        return png_path
+        handle = ImageHandle.from_base64(elem["image_base64"], elem.get("mime_type", "image/png"))
+        saved = handle.save(out_dir / f"{elem_id}.{handle.extension}")
+        return handle, str(saved)
 
-    return None
+    return None, None
 
 
 def _bbox_to_emu(bbox: dict) -> tuple:
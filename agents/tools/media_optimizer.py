@@ -0,0 +1,220 @@
+"""
+PPTX埋め込み画像の最適化
+配置サイズ（スライド上の表示サイズ × 目標DPI）まで縮小し、
+透過のない写真調の画像は JPEG、透過あり・色数の少ない図版は PNG で埋め込む
+
+    optimizer = MediaOptimizer(max_bytes=20 * 1024 ** 2)
+    optimizer.add(image, (400, 400))     # 表示サイズ（96dpi 基準の px）
+    ...
+    stats = optimizer.run()              # 縮小・エンコード（予算超過なら品質・解像度を下げる）
+    optimized = optimizer.get(image)     # 埋め込む画像
+"""
+
+import os
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from .image_handle import ImageHandle
+
+# 1 で image_to_pptx の既定を最適化ありにする（縮小・JPEG再圧縮で出力が変わるため既定は無効）
+OPTIMIZE_MEDIA = os.environ.get("PPTX_OPTIMIZE_MEDIA", "0") == "1"
+
+# 表示サイズに対する解像度（スライドの px は 96dpi 基準）
+MEDIA_DPI = int(os.environ.get("PPTX_MEDIA_DPI", "150"))
+
+# JPEG の品質
+MEDIA_JPEG_QUALITY = int(os.environ.get("PPTX_MEDIA_JPEG_QUALITY", "85"))
+
+# 1プレゼンテーションあたりの画像の合計サイズの上限（バイト、0 で上限なし）
+MEDIA_MAX_BYTES = int(os.environ.get("PPTX_MEDIA_MAX_BYTES", "0")) or None
+
+# 予算超過時に下げる品質の下限と、解像度の縮小率の下限
+_MIN_JPEG_QUALITY = 50
+_MIN_SCALE = 0.4
+
+# この色数以下の不透明画像は図版とみなして PNG にする
+_FLAT_COLORS = 256
+
+
+class _Entry:
+    """最適化対象の画像1つ分"""
+
+    __slots__ = ("image", "display_size", "kind", "result")
+
+    def __init__(self, image: ImageHandle, display_size: Tuple[float, float]):
+        self.image = image
+        self.display_size = display_size
+        # picture_kind の結果（初回のデコード時に判定）
+        self.kind: Optional[Tuple[bool, bool]] = None
+        self.result: ImageHandle = image
+
+
+class MediaOptimizer:
+    """プレゼンテーション1つ分の画像を配置サイズに合わせて縮小・再エンコードする"""
+
+    def __init__(
+        self,
+        target_dpi: int = MEDIA_DPI,
+        jpeg_quality: int = MEDIA_JPEG_QUALITY,
+        max_bytes: Optional[int] = MEDIA_MAX_BYTES
+    ):
+        """
+        Args:
+            target_dpi: 表示サイズに対する解像度（96 で表示サイズと同じピクセル数）
+            jpeg_quality: JPEG の品質
+            max_bytes: 画像の合計サイズの上限（超える場合は品質 → 解像度の順に下げる）。None で上限なし
+        """
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self._entries: Dict[str, _Entry] = {}
+
+    def add(self, image: ImageHandle, display_size: Tuple[float, float]) -> None:
+        """
+        配置する画像を登録する（同じ画像を複数箇所に置く場合は最大の表示サイズに合わせる）
+
+        Args:
+            image: 元の画像
+            display_size: スライド上の表示サイズ（96dpi 基準の px）
+        """
+        entry = self._entries.get(image.sha256)
+        if entry is None:
+            self._entries[image.sha256] = _Entry(image, display_size)
+        else:
+            entry.display_size = (
+                max(entry.display_size[0], display_size[0]),
+                max(entry.display_size[1], display_size[1])
+            )
+
+    def get(self, image: ImageHandle) -> ImageHandle:
+        """最適化後の画像（未登録なら元の画像）"""
+        entry = self._entries.get(image.sha256)
+        return entry.result if entry is not None else image
+
+    def run(self) -> dict:
+        """
+        登録した画像を最適化する
+
+        Returns:
+            dict: {
+                "images": 画像数,
+                "original_bytes": 元の合計サイズ,
+                "bytes": 最適化後の合計サイズ,
+                "saved_bytes": 削減したサイズ,
+                "budget_met": max_bytes 以内に収まったか（max_bytes 未指定なら True）
+            }
+        """
+        quality = self.jpeg_quality
+        scale = 1.0
+        total = self._encode_all(quality, scale)
+
+        # 予算を超える場合は JPEG の品質、次に解像度を段階的に下げる
+        while self.max_bytes is not None and total > self.max_bytes:
+            if quality > _MIN_JPEG_QUALITY and any(e.kind == (False, False) for e in self._entries.values()):
+                quality = max(_MIN_JPEG_QUALITY, quality - 10)
+            elif scale > _MIN_SCALE:
+                scale = max(_MIN_SCALE, scale * 0.8)
+            else:
+                break
+            total = self._encode_all(quality, scale)
+
+        original = sum(e.image.size for e in self._entries.values())
+        return {
+            "images": len(self._entries),
+            "original_bytes": original,
+            "bytes": total,
+            "saved_bytes": original - total,
+            "budget_met": self.max_bytes is None or total <= self.max_bytes
+        }
+
+    def _encode_all(self, quality: int, scale: float) -> int:
+        total = 0
+        for entry in self._entries.values():
+            entry.result = self._encode(entry, quality, scale)
+            total += entry.result.size
+        return total
+
+    def _encode(self, entry: _Entry, quality: int, scale: float) -> ImageHandle:
+        """
+        1枚を目標サイズに縮小して再エンコード（元より大きくなる場合は元の画像を使う）
+
+        デコードした画像は1枚ずつ破棄し、全画像を同時にメモリに展開しない。
+        """
+        with Image.open(entry.image.stream()) as pil:
+            pil.load()
+            if entry.kind is None:
+                entry.kind = picture_kind(pil)
+            has_alpha, flat = entry.kind
+            resized = resize_to_display(pil, entry.display_size, self.target_dpi, scale)
+            encoded = encode_picture(resized, has_alpha, flat, quality)
+        # 縮小した場合でも、元の方が小さければ元の画像を使う
+        if encoded.size >= entry.image.size:
+            return entry.image
+        return encoded
+
+
+def picture_kind(image: Image.Image) -> Tuple[bool, bool]:
+    """
+    埋め込み形式の判定に使う画像の性質
+
+    Returns:
+        (透過あり, 不透明で色数が少ない図版か)
+    """
+    has_alpha = _has_alpha(image)
+    return has_alpha, not has_alpha and image.getcolors(_FLAT_COLORS) is not None
+
+
+def resize_to_display(
+    image: Image.Image,
+    display_size: Tuple[float, float],
+    target_dpi: int = MEDIA_DPI,
+    scale: float = 1.0
+) -> Image.Image:
+    """
+    表示サイズ × target_dpi まで縮小する（拡大はしない。縮小不要なら image をそのまま返す）
+
+    Args:
+        image: 画像
+        display_size: スライド上の表示サイズ（96dpi 基準の px）
+        target_dpi: 表示サイズに対する解像度
+        scale: 追加の縮小率（予算超過時）
+    """
+    ratio = target_dpi / 96.0 * scale
+    target = (
+        max(1, round(display_size[0] * ratio)),
+        max(1, round(display_size[1] * ratio))
+    )
+    # 元画像のアスペクト比を保ったまま、表示領域を満たす最小のサイズにする
+    fit = max(target[0] / image.width, target[1] / image.height)
+    if fit >= 1.0:
+        return image
+    return image.resize(
+        (max(1, round(image.width * fit)), max(1, round(image.height * fit))),
+        Image.LANCZOS,
+        reducing_gap=3.0
+    )
+
+
+def encode_picture(image: Image.Image, has_alpha: bool, flat: bool, quality: int = MEDIA_JPEG_QUALITY) -> ImageHandle:
+    """透過あり・図版は PNG、写真調は JPEG でエンコードする"""
+    buffer = BytesIO()
+    if has_alpha or flat:
+        if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        image.save(buffer, "PNG")
+        return ImageHandle(buffer.getvalue(), "image/png")
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.save(buffer, "JPEG", quality=quality, optimize=True)
+    return ImageHandle(buffer.getvalue(), "image/jpeg")
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    """実際に透過している画素があるか（アルファチャンネルが全て不透明なら False）"""
+    if image.mode in ("RGBA", "LA"):
+        return image.getchannel("A").getextrema()[0] < 255
+    if image.mode == "P" and "transparency" in image.info:
+        return True
+    return False
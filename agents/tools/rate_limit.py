@@ -0,0 +1,196 @@
+"""
+Gemini 呼び出しのレート制御
+モデルごとに RPM（トークンバケット）と同時実行数（AIMD）を制御する
+
+- 429 / RESOURCE_EXHAUSTED を受けたら同時実行数の上限を半分にする
+- 成功するたびに上限を少しずつ戻す（上限1回分の成功でおよそ +1）
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# テキストモデル（設計・推論・分析）の既定値
+TEXT_RPM = float(os.environ.get("GEMINI_TEXT_RPM", "60"))
+TEXT_MAX_CONCURRENCY = int(os.environ.get("GEMINI_TEXT_MAX_CONCURRENCY", "8"))
+
+# 画像モデルの既定値
+IMAGE_RPM = float(os.environ.get("GEMINI_IMAGE_RPM", "20"))
+IMAGE_MAX_CONCURRENCY = int(os.environ.get("GEMINI_IMAGE_MAX_CONCURRENCY", "8"))
+
+# 待機中に空きを確認する間隔の上限（秒）
+_POLL_INTERVAL = 0.05
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """429 / RESOURCE_EXHAUSTED によるエラーか"""
+    if getattr(error, "code", None) == 429 or getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+class ModelLimiter:
+    """1モデル分のレート制御（トークンバケット + AIMD 同時実行数）"""
+
+    def __init__(self, rpm: float, max_concurrency: int, min_concurrency: int = 1):
+        """
+        Args:
+            rpm: 1分あたりのリクエスト数の上限（0 以下で無制限）
+            max_concurrency: 同時実行数の上限
+            min_concurrency: 429 を受けても下回らない同時実行数
+        """
+        self.rpm = rpm
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.concurrency_limit: float = float(self.max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self._tokens = float(rpm) if rpm > 0 else 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.rpm > 0:
+            self._tokens = min(self.rpm, self._tokens + (now - self._updated) * self.rpm / 60.0)
+        self._updated = now
+
+    def _try_acquire(self) -> float:
+        """
+        枠を確保できれば 0 を、できなければ次に確認するまでの秒数を返す
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.in_flight >= int(self.concurrency_limit):
+                return _POLL_INTERVAL
+            if self.rpm > 0 and self._tokens < 1.0:
+                return min(1.0, (1.0 - self._tokens) * 60.0 / self.rpm)
+            if self.rpm > 0:
+                self._tokens -= 1.0
+            self.in_flight += 1
+            self.requests += 1
+            return 0.0
+
+    def acquire(self) -> float:
+        """
+        枠が空くまで待って確保する（同期版）
+
+        Returns:
+            float: 待機した秒数
+        """
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                break
+            time.sleep(wait)
+        return self._add_wait(time.monotonic() - start)
+
+    async def aacquire(self) -> float:
+        """枠が空くまで待って確保する（非同期版）"""
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                break
+            await asyncio.sleep(wait)
+        return self._add_wait(time.monotonic() - start)
+
+    def _add_wait(self, waited: float) -> float:
+        with self._lock:
+            self.wait_seconds += waited
+        return waited
+
+    def release(self, throttled: bool = False, success: bool = True) -> None:
+        """
+        枠を返却し、結果に応じて同時実行数の上限を調整する
+
+        Args:
+            throttled: 429 / RESOURCE_EXHAUSTED だった場合 True（上限を半分に）
+            success: 成功した場合 True（上限を加算）。その他のエラーは上限を変えない
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.throttled += 1
+                self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+                # 直後のリクエストが連続で弾かれないようバケットも空にする
+                self._tokens = min(self._tokens, 0.0)
+            elif success:
+                self.concurrency_limit = min(
+                    float(self.max_concurrency),
+                    self.concurrency_limit + 1.0 / self.concurrency_limit
+                )
+
+    def backoff(self) -> float:
+        """429 の後、再キューまでに待つ秒数（トークン1つ分、最低1秒）"""
+        return max(1.0, 60.0 / self.rpm) if self.rpm > 0 else 1.0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rpm": self.rpm,
+                "tokens": round(self._tokens, 3),
+                "concurrency_limit": int(self.concurrency_limit),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_overrides: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def configure_model(model: str, rpm: Optional[float] = None, max_concurrency: Optional[int] = None) -> None:
+    """
+    モデルのレート上限を設定する（作成済みのリミッターは作り直す）
+
+    Args:
+        model: モデル名
+        rpm: 1分あたりのリクエスト数の上限（0 以下で無制限）
+        max_concurrency: 同時実行数の上限
+    """
+    with _lock:
+        settings = _overrides.setdefault(model, {})
+        if rpm is not None:
+            settings["rpm"] = rpm
+        if max_concurrency is not None:
+            settings["max_concurrency"] = max_concurrency
+        _limiters.pop(model, None)
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    """モデルのリミッターを取得（なければ既定値で作成。モデル名に image を含むものは画像モデル扱い）"""
+    with _lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            is_image = "image" in model
+            settings = _overrides.get(model, {})
+            limiter = ModelLimiter(
+                rpm=settings.get("rpm", IMAGE_RPM if is_image else TEXT_RPM),
+                max_concurrency=settings.get("max_concurrency", IMAGE_MAX_CONCURRENCY if is_image else TEXT_MAX_CONCURRENCY)
+            )
+            _limiters[model] = limiter
+        return limiter
+
+
+def get_metrics() -> dict:
+    """モデルごとの現在の上限・使用状況"""
+    with _lock:
+        limiters = dict(_limiters)
+    return {model: limiter.metrics() for model, limiter in limiters.items()}
+
+
+def reset_limiters() -> None:
+    """リミッターを破棄する（テスト用）"""
+    with _lock:
+        _limiters.clear()
@@ -0,0 +1,286 @@
+"""
+リトライ・ヘッジング
+一時的なエラーを指数バックオフ（ジッター付き）で再試行し、
+遅いリクエストには p95 を超えた時点で複製リクエストを投げて先に返った方を使う
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+from google.genai import errors
+
+from ..tracing import current_span
+from .rate_limit import is_rate_limit_error
+
+T = TypeVar("T")
+
+# 画像生成のリトライ既定値
+IMAGE_RETRY_ATTEMPTS = int(os.environ.get("IMAGE_RETRY_ATTEMPTS", "3"))
+IMAGE_RETRY_BASE_DELAY = float(os.environ.get("IMAGE_RETRY_BASE_DELAY", "1.0"))
+IMAGE_RETRY_MAX_DELAY = float(os.environ.get("IMAGE_RETRY_MAX_DELAY", "20.0"))
+# 1 でヘッジング（p95 超過時の複製リクエスト）を有効化
+IMAGE_HEDGE = os.environ.get("IMAGE_HEDGE", "0") == "1"
+
+# リトライ対象の HTTP ステータス
+# 429 / RESOURCE_EXHAUSTED は gemini.agenerate_content がリミッターと連動して再キューするため含めない
+_RETRYABLE_STATUS = {408, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """再試行すれば成功する可能性があるエラー（例: 応答に画像が含まれていない）"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    再試行する価値のあるエラーか
+
+    一時的なもの（応答不備・408・5xx・タイムアウト・接続断）は True、
+    リクエスト内容に起因するもの（4xx・不正な引数など）は False。
+    429 / RESOURCE_EXHAUSTED は再キューを使い切った後なので False（ここで重ねて再試行しない）。
+    """
+    if isinstance(error, RetryableError):
+        return True
+    if isinstance(error, errors.APIError):
+        return error.code in _RETRYABLE_STATUS and not is_rate_limit_error(error)
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError))
+
+
+class RetryPolicy:
+    """リトライ・ヘッジングの設定"""
+
+    def __init__(
+        self,
+        max_attempts: int = IMAGE_RETRY_ATTEMPTS,
+        base_delay: float = IMAGE_RETRY_BASE_DELAY,
+        max_delay: float = IMAGE_RETRY_MAX_DELAY,
+        hedge: bool = IMAGE_HEDGE,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20
+    ):
+        """
+        Args:
+            max_attempts: 最大試行回数（1 でリトライなし）
+            base_delay: 初回リトライまでの待機時間の上限（秒）。以降は倍々に増える
+            max_delay: 待機時間の上限（秒）
+            hedge: True で各試行にヘッジングを使う
+            hedge_quantile: 複製リクエストを投げる遅延のパーセンタイル
+            hedge_min_samples: ヘッジングを始めるのに必要な遅延サンプル数
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, attempt: int) -> float:
+        """attempt 回目（1始まり）の失敗後に待つ秒数（フルジッター）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class LatencyTracker:
+    """直近の成功リクエストの遅延（ヘッジングの閾値計算用）"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """q 分位点の遅延（秒）。サンプル不足なら None"""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str) -> LatencyTracker:
+    """名前（モデル名など）ごとの遅延トラッカーを取得"""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = _trackers[name] = LatencyTracker()
+        return tracker
+
+
+class _Attempt:
+    """
+    1回の試行で実際にAPIへ送信した時刻と応答時間
+
+    gemini.agenerate_content がリミッターの枠を得て送信した時点で notify_request_sent を、
+    429 で再キューに戻る時点で notify_request_requeued を、応答を受け取った時点で
+    notify_request_done を呼ぶ。待ち行列・再キューの待機時間を遅延に含めないために使う。
+    """
+
+    def __init__(self):
+        self.in_flight = asyncio.Event()
+        self.sent_at: Optional[float] = None
+        self.api_seconds: Optional[float] = None
+
+
+_current_attempt: ContextVar[Optional[_Attempt]] = ContextVar("retry_attempt", default=None)
+
+
+def notify_request_sent() -> None:
+    """現在の試行のリクエストをAPIへ送信した"""
+    attempt = _current_attempt.get()
+    if attempt is not None:
+        attempt.sent_at = time.perf_counter()
+        attempt.in_flight.set()
+
+
+def notify_request_requeued() -> None:
+    """現在の試行が 429 で待ち行列に戻った"""
+    attempt = _current_attempt.get()
+    if attempt is not None:
+        attempt.in_flight.clear()
+
+
+def notify_request_done(seconds: float) -> None:
+    """現在の試行のAPI呼び出しが完了した（seconds: 送信から応答までの時間）"""
+    attempt = _current_attempt.get()
+    if attempt is not None:
+        attempt.api_seconds = seconds
+
+
+async def _timed(
+    func: Callable[[], Awaitable[T]],
+    tracker: Optional[LatencyTracker],
+    attempt: Optional[_Attempt] = None
+) -> T:
+    """
+    func を呼び出し、成功時の遅延を tracker に記録する
+
+    gemini.agenerate_content を通る場合はAPI呼び出しそのものの時間だけを記録する
+    （リミッターの待ち時間・再キューの待機を含めると閾値が膨らむため）。
+    """
+    attempt = attempt or _Attempt()
+    token = _current_attempt.set(attempt)
+    try:
+        start = time.perf_counter()
+        result = await func()
+    finally:
+        _current_attempt.reset(token)
+    if tracker is not None:
+        tracker.record(attempt.api_seconds if attempt.api_seconds is not None else time.perf_counter() - start)
+    return result
+
+
+async def _wait_until_overdue(primary: "asyncio.Future", attempt: _Attempt, threshold: float) -> bool:
+    """
+    プライマリが送信されてから threshold 秒経っても終わらないのを待つ
+
+    リミッターの待ち行列にいる間（未送信・再キュー中）は時間を数えない。
+
+    Returns:
+        bool: True ならヘッジすべき（送信済みのまま threshold を超えた）、False ならプライマリが完了した
+    """
+    while not primary.done():
+        if not attempt.in_flight.is_set():
+            sent = asyncio.ensure_future(attempt.in_flight.wait())
+            try:
+                await asyncio.wait({primary, sent}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sent.cancel()
+            continue
+        remaining = threshold - (time.perf_counter() - (attempt.sent_at or time.perf_counter()))
+        if remaining > 0:
+            await asyncio.wait({primary}, timeout=remaining)
+            continue
+        return True
+    return False
+
+
+async def _hedged(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    tracker: Optional[LatencyTracker]
+) -> T:
+    """送信から p95 を超えても終わらなければ複製リクエストを投げ、先に成功した方を返す"""
+    threshold = tracker.quantile(policy.hedge_quantile, policy.hedge_min_samples) if tracker else None
+    attempt = _Attempt()
+    primary = asyncio.ensure_future(_timed(func, tracker, attempt))
+    tasks = {primary}
+    try:
+        if threshold is None:
+            return await primary
+
+        if not await _wait_until_overdue(primary, attempt, threshold):
+            return primary.result()
+
+        current = current_span()
+        if current is not None:
+            current.set(hedged=True)
+        tasks.add(asyncio.ensure_future(_timed(func, tracker)))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                # キャンセルされたタスクは exception() が CancelledError を送出するため先に判定する
+                if task.cancelled():
+                    error = error or asyncio.CancelledError()
+                    continue
+                exception = task.exception()
+                if exception is None:
+                    return task.result()
+                error = exception
+        assert error is not None
+        raise error
+    finally:
+        # 負けた側（または呼び出し元のキャンセル時は全て）を止める
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[T]],
+    policy: Optional[RetryPolicy] = None,
+    tracker: Optional[LatencyTracker] = None
+) -> T:
+    """
+    func を再試行付きで呼び出す
+
+    Args:
+        func: 呼び出すたびに新しいリクエストを行うコルーチン関数
+        policy: リトライ設定（省略時は既定値）
+        tracker: 遅延トラッカー（ヘッジングの閾値に使う）
+
+    Returns:
+        func の戻り値（再試行しても失敗した場合は最後の例外を送出）
+    """
+    policy = policy or RetryPolicy()
+    current = current_span()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            if policy.hedge:
+                result = await _hedged(func, policy, tracker)
+            else:
+                result = await _timed(func, tracker)
+            if current is not None and attempt > 1:
+                current.set(attempts=attempt)
+            return result
+        except Exception as e:
+            if current is not None:
+                current.set(attempts=attempt)
+            if not is_retryable(e) or attempt == policy.max_attempts:
+                raise
+            await asyncio.sleep(policy.backoff(attempt))
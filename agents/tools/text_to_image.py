@@ -4,12 +4,18 @@ Gemini 3 Pro Image (Nano Banana Pro) による高品質画像生成
 """
 
 import base64
-import io
-import os
-from typing import Optional, List
-from google import genai  # type: ignore
+import hashlib
+from typing import Any, Optional, List, Union
 from google.genai import types
-from PIL import Image
+
+from .aio import run_sync
+from .client_pool import get_shared_client
+from .image_cache import get_image_cache, make_cache_key
+from .decoded_images import get_decoded_image_cache
+from .gemini import agenerate_content
+from .image_handle import ImageHandle, encode_images
+from .retry import RetryPolicy, RetryableError, call_with_retry, get_latency_tracker
+from ..tracing import current_span
 
 MODEL = "gemini-3-pro-image-preview"
 
@@ -21,42 +27,77 @@ IMAGE_SIZES = ["1K", "2K", "4K"]
 
 
 def get_client():
-    """Google GenAI クライアントを取得"""
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY environment variable is required")
-    return genai.Client(api_key=api_key)
+    """Google GenAI クライアントを取得（プロセス内で共有）"""
+    return get_shared_client()
 
 
-def generate_image(
+async def agenerate_image(
     prompt: str,
-    reference_images: Optional[List[str]] = None,
+    reference_images: Optional[List[Union[str, ImageHandle]]] = None,
     aspect_ratio: str = "16:9",
     image_size: str = "2K",
     style_description: Optional[str] = None,
-    no_text: bool = True
+    no_text: bool = True,
+    use_cache: bool = True,
+    client: Optional[Any] = None,
+    retry_policy: Optional[RetryPolicy] = None
 ) -> dict:
     """
-    高品質な画像を生成します。
+    高品質な画像を生成します（非同期版）。
+
+    一時的なエラー（5xx・タイムアウト・画像を含まない応答など）は retry_policy に従って再試行します。
 
     Args:
         prompt: 画像生成のプロンプト。場面を叙述的に描写してください。
-        reference_images: 参照画像のBase64リスト（最大14枚）。スタイル参考用。
+        reference_images: 参照画像のリスト（Base64 または ImageHandle、最大14枚）。スタイル参考用。
         aspect_ratio: アスペクト比 ("16:9", "1:1", "9:16", "4:3", "3:4")
         image_size: 解像度 ("1K", "2K", "4K")
         style_description: スタイルの詳細説明（照明、色調、雰囲気など）
         no_text: テキストを含めない場合True
+        use_cache: 同一入力の生成結果をディスクキャッシュから返す場合True
+        client: 使用する genai クライアント（省略時は get_client()）
+        retry_policy: リトライ・ヘッジングの設定（省略時は既定値）
 
     Returns:
         dict: {
             "success": bool,
-            "image_base64": str,
+            "image": ImageHandle,  # 生成画像（生のバイト列）
             "mime_type": str,
+            "cached": bool,
             "error": str (失敗時)
         }
     """
     try:
-        client = get_client()
+        cache = get_image_cache() if use_cache else None
+        cache_key = None
+        if cache is not None:
+            cache_key = make_cache_key(
+                model=MODEL,
+                prompt=prompt,
+                style_description=style_description,
+                aspect_ratio=aspect_ratio,
+                image_size=image_size,
+                no_text=no_text,
+                reference_images=[
+                    img.sha256 if isinstance(img, ImageHandle)
+                    else hashlib.sha256(base64.b64decode(img)).hexdigest()
+                    for img in (reference_images or [])[:14]
+                ]
+            )
+            cached = cache.get(cache_key)
+            current = current_span()
+            if current is not None:
+                current.set(cache_hit=cached is not None)
+            if cached is not None:
+                image_data, mime_type = cached
+                return {
+                    "success": True,
+                    "image": ImageHandle(image_data, mime_type),
+                    "mime_type": mime_type,
+                    "cached": True,
+                }
+
+        client = client or get_client()
         contents: List = []
 
         # 叙述的なプロンプトを構築
@@ -68,13 +109,12 @@ def generate_image(
         )
         contents.append(full_prompt)
 
-        # 参照画像を追加（最大14枚）
+        # 参照画像を追加（最大14枚、デコード・縮小は要素間で共有）
         if reference_images:
-            for i, img_base64 in enumerate(reference_images[:14]):
+            decoded = get_decoded_image_cache()
+            for ref in reference_images[:14]:
                 try:
-                    image_bytes = base64.b64decode(img_base64)
-                    pil_image = Image.open(io.BytesIO(image_bytes))
-                    contents.append(pil_image)
+                    contents.append(decoded.get(ref).part)
                 except Exception:
                     continue
 
@@ -83,29 +123,69 @@ def generate_image(
             response_modalities=["image", "text"],
         )
 
-        # generate_content で画像生成
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=contents,
-            config=config,
-        )
+        async def attempt() -> tuple:
+            # generate_content で画像生成
+            response = await agenerate_content(
+                client,
+                model=MODEL,
+                contents=contents,
+                config=config,
+                name="generate_image"
+            )
 
-        # レスポンスから画像を抽出
-        for part in response.parts:
-            if part.inline_data is not None:
-                image_data = part.inline_data.data
-                return {
-                    "success": True,
-                    "image_base64": base64.b64encode(image_data).decode("utf-8"),
-                    "mime_type": part.inline_data.mime_type or "image/png",
-                }
+            # レスポンスから画像を抽出
+            for part in response.parts or []:
+                if part.inline_data is not None and part.inline_data.data:
+                    return part.inline_data.data, part.inline_data.mime_type or "image/png"
+            raise RetryableError("No image was generated in response")
 
-        return {"success": False, "error": "No image was generated in response"}
+        image_data, mime_type = await call_with_retry(
+            attempt,
+            policy=retry_policy,
+            tracker=get_latency_tracker(MODEL)
+        )
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, image_data, mime_type)
+        return {
+            "success": True,
+            "image": ImageHandle(image_data, mime_type),
+            "mime_type": mime_type,
+            "cached": False,
+        }
 
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def generate_image(
+    prompt: str,
+    reference_images: Optional[List[Union[str, ImageHandle]]] = None,
+    aspect_ratio: str = "16:9",
+    image_size: str = "2K",
+    style_description: Optional[str] = None,
+    no_text: bool = True,
+    use_cache: bool = True,
+    client: Optional[Any] = None,
+    retry_policy: Optional[RetryPolicy] = None
+) -> dict:
+    """
+    高品質な画像を生成します（agenerate_image の同期ラッパー）。
+
+    引数・戻り値は agenerate_image と同じです。
+    """
+    return run_sync(agenerate_image(
+        prompt=prompt,
+        reference_images=reference_images,
+        aspect_ratio=aspect_ratio,
+        image_size=image_size,
+        style_description=style_description,
+        no_text=no_text,
+        use_cache=use_cache,
+        client=client,
+        retry_policy=retry_policy
+    ))
+
+
 def _build_descriptive_prompt(
     prompt: str,
     style_description: Optional[str] = None,
@@ -156,15 +236,15 @@ def text_to_image(
     prompt: str,
     reference_image_base64: Optional[str] = None
 ) -> dict:
-    """後方互換性のためのラッパー関数"""
-    reference_images = [reference_image_base64] if reference_image_base64 else None
-    return generate_image(
+    """後方互換性のためのラッパー関数（ツールの境界なので Base64 で返す）"""
+    reference_images: Optional[List[Union[str, ImageHandle]]] = [reference_image_base64] if reference_image_base64 else None
+    return encode_images(generate_image(
         prompt=prompt,
         reference_images=reference_images,
         aspect_ratio="16:9",
         image_size="2K",
         no_text=True
-    )
+    ))
 
 
 # Strands tool用のデコレーター付きバージョン
@@ -0,0 +1,196 @@
+"""
+トレーシング
+生成パイプラインの各フェーズ・各Gemini呼び出しの所要時間やサイズを記録する軽量スパンAPI
+"""
+
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional
+
+# 現在のトレーサー/スパン（asyncio タスク・to_thread にも引き継がれる）
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("current_tracer", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# トレース完了時に呼ばれるデフォルトのエクスポーター
+_default_exporter: Optional[Callable[[dict], None]] = None
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """計測区間"""
+
+    def __init__(self, name: str, parent_id: Optional[int] = None, **attributes: Any):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes: dict = dict(attributes)
+        self.start_time = time.time()
+        self.duration_ms: Optional[float] = None
+        self._start = time.perf_counter()
+
+    def set(self, **attributes: Any) -> None:
+        """属性を追加（None は無視）"""
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value
+
+    def end(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """1回の生成（セッション）分のスパンを集める"""
+
+    def __init__(self, trace_id: str, exporter: Optional[Callable[[dict], None]] = None):
+        """
+        Args:
+            trace_id: トレースID（通常はセッションID）
+            exporter: finish() 時にトレースを受け取るコールバック（省略時はデフォルト）
+        """
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """このトレーサーを現在のコンテキストに設定する"""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_time)
+        return {
+            "trace_id": self.trace_id,
+            "spans": [s.to_dict() for s in spans],
+        }
+
+    def finish(self, output_dir: Optional[Path] = None) -> dict:
+        """
+        トレースを確定し、trace.json への書き出しとエクスポートを行う
+
+        Args:
+            output_dir: trace.json の出力先（省略時は書き出さない）
+
+        Returns:
+            dict: トレース（結果dictに添付する用）
+        """
+        trace = self.to_dict()
+
+        if output_dir is not None:
+            try:
+                with open(Path(output_dir) / "trace.json", "w", encoding="utf-8") as f:
+                    json.dump(trace, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                print(f"  [Warning] trace.json の書き出しに失敗: {e}")
+
+        exporter = self.exporter or _default_exporter
+        if exporter is not None:
+            try:
+                exporter(trace)
+            except Exception as e:
+                print(f"  [Warning] トレースのエクスポートに失敗: {e}")
+
+        return trace
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    現在のトレーサーにスパンを記録する
+
+    トレーサーが無いコンテキストでも使える（記録されないだけ）。
+    例外が発生した場合は error 属性を付けて再送出する。
+    """
+    tracer = _current_tracer.get()
+    parent = _current_span.get()
+    current = Span(name, parent_id=parent.span_id if parent else None, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        if tracer is not None:
+            tracer._record(current)
+
+
+def current_span() -> Optional[Span]:
+    """現在のスパンを取得"""
+    return _current_span.get()
+
+
+def set_trace_exporter(exporter: Optional[Callable[[dict], None]]) -> None:
+    """全トレーサー共通のエクスポーターを設定（None で解除）"""
+    global _default_exporter
+    _default_exporter = exporter
+
+
+def estimate_request_bytes(contents: Any) -> int:
+    """リクエスト内容のおおよそのバイト数（画像は非圧縮サイズで概算）"""
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+
+    total = 0
+    for part in contents:
+        if isinstance(part, str):
+            total += len(part.encode("utf-8"))
+        elif isinstance(part, (bytes, bytearray)):
+            total += len(part)
+        elif hasattr(part, "size") and hasattr(part, "getbands"):
+            # PIL Image
+            width, height = part.size
+            total += width * height * len(part.getbands())
+        else:
+            data = getattr(getattr(part, "inline_data", None), "data", None)
+            if data:
+                total += len(data)
+    return total
+
+
+def record_response(current: Span, response: Any) -> None:
+    """Gemini のレスポンスからサイズとトークン使用量をスパンに記録"""
+    response_bytes = 0
+    for part in getattr(response, "parts", None) or []:
+        if getattr(part, "text", None):
+            response_bytes += len(part.text.encode("utf-8"))
+        inline_data = getattr(part, "inline_data", None)
+        if inline_data is not None and inline_data.data:
+            response_bytes += len(inline_data.data)
+    current.set(response_bytes=response_bytes)
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        current.set(
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+            thoughts_tokens=getattr(usage, "thoughts_token_count", None),
+            total_tokens=getattr(usage, "total_token_count", None),
+        )
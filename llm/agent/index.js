@@ -1,13 +1,186 @@
 /**
  * LLM Agent: Strands Agent ラッパー
  * Python の DesignerAgent を Node.js から呼び出す
+ *
+ * `python3 -m agents.designer_agent --worker` を常駐させ、
+ * 改行区切りJSONでリクエスト/レスポンスをやり取りする。
+ * インタプリタ・genai クライアントを使い回すため、リクエストごとの起動コストがかからない。
+ *
+ * 処理中のリクエストが無い間はワーカー（プロセスと stdio パイプ）を unref し、
+ * 呼び出し側の Node プロセスが自然に終了できるようにする（終了時に stdin が閉じてワーカーも終了する）。
  */
 
 const { spawn } = require('child_process');
 const path = require('path');
 
 const PROJECT_ROOT = path.resolve(__dirname, '..', '..');
-const AGENTS_DIR = path.join(PROJECT_ROOT, 'agents');
+
+/**
+ * 常駐 Designer Agent ワーカー
+ */
+class DesignerWorker {
+  constructor() {
+    this.process = null;
+    this.ready = null;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.chunks = [];
+    this.stderr = '';
+    this.active = 0;
+  }
+
+  /**
+   * 処理中のリクエストがある間だけワーカーでイベントループを保持する
+   */
+  updateRef() {
+    const child = this.process;
+    if (!child) {
+      return;
+    }
+    const method = this.active > 0 ? 'ref' : 'unref';
+    child[method]();
+    for (const stream of [child.stdin, child.stdout, child.stderr]) {
+      if (stream && typeof stream[method] === 'function') {
+        stream[method]();
+      }
+    }
+  }
+
+  /**
+   * ワーカープロセスを起動（起動済みなら何もしない）
+   * @returns {Promise<void>} ready イベント受信で解決
+   */
+  start() {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    this.ready = new Promise((resolve, reject) => {
+      const pythonProcess = spawn('python3', ['-m', 'agents.designer_agent', '--worker'], {
+        cwd: PROJECT_ROOT,
+        env: { ...process.env }
+      });
+      this.process = pythonProcess;
+      this.onReady = resolve;
+      this.updateRef();
+
+      pythonProcess.stdout.on('data', (data) => {
+        // 改行が来るまでチャンクを溜め、1行揃った時点で1回だけ結合する
+        let start = 0;
+        let newline;
+        while ((newline = data.indexOf(0x0a, start)) >= 0) {
+          this.chunks.push(data.subarray(start, newline));
+          const line = Buffer.concat(this.chunks).toString('utf8');
+          this.chunks = [];
+          start = newline + 1;
+          if (line.trim()) {
+            this.handleLine(line);
+          }
+        }
+        if (start < data.length) {
+          this.chunks.push(data.subarray(start));
+        }
+      });
+
+      pythonProcess.stderr.on('data', (data) => {
+        // 直近のログのみ保持（エラーメッセージ用）
+        this.stderr = (this.stderr + data.toString()).slice(-8192);
+      });
+
+      pythonProcess.on('close', (code) => {
+        const error = new Error(`Python worker exited with code ${code}: ${this.stderr}`);
+        reject(error);
+        this.reset(error);
+      });
+
+      pythonProcess.on('error', (err) => {
+        reject(err);
+        this.reset(err);
+      });
+    });
+
+    return this.ready;
+  }
+
+  /**
+   * stdout の1行（JSONメッセージ）を処理
+   * @param {string} line
+   */
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (err) {
+      return;
+    }
+
+    if (message.event === 'ready') {
+      this.onReady();
+      return;
+    }
+
+    const entry = this.pending.get(message.id);
+    if (!entry) {
+      return;
+    }
+    this.pending.delete(message.id);
+
+    if (message.error) {
+      entry.reject(new Error(message.error));
+    } else {
+      entry.resolve(message.result);
+    }
+  }
+
+  /**
+   * プロセス終了時に待機中のリクエストを失敗させ、次回呼び出しで再起動できるようにする
+   * @param {Error} error
+   */
+  reset(error) {
+    for (const entry of this.pending.values()) {
+      entry.reject(error);
+    }
+    this.pending.clear();
+    this.process = null;
+    this.ready = null;
+    this.chunks = [];
+  }
+
+  /**
+   * リクエストを送信
+   * @param {string} method - "generate" | "deck" | "refine" | "resume"
+   * @param {Object} params
+   * @returns {Promise<Object>} 生成結果
+   */
+  async request(method, params) {
+    this.active += 1;
+    this.updateRef();
+    try {
+      await this.start();
+      this.updateRef();
+
+      const id = this.nextId++;
+      return await new Promise((resolve, reject) => {
+        this.pending.set(id, { resolve, reject });
+        this.process.stdin.write(JSON.stringify({ id, method, ...params }) + '\n');
+      });
+    } finally {
+      this.active -= 1;
+      this.updateRef();
+    }
+  }
+
+  /**
+   * ワーカーを終了（stdin を閉じると処理中のリクエストを完了してから終了する）
+   */
+  stop() {
+    if (this.process) {
+      this.process.stdin.end();
+    }
+  }
+}
+
+const worker = new DesignerWorker();
 
 /**
  * Designer Agent を実行
@@ -15,55 +188,63 @@ const AGENTS_DIR = path.join(PROJECT_ROOT, 'agents');
  * @param {string} options.userPrompt - ユーザーの自然言語指示
  * @param {string} [options.imageBase64] - 元画像のBase64データ
  * @param {string} [options.mimeType] - 画像のMIMEタイプ
+ * @param {boolean} [options.inlineImages] - 画像をBase64で受け取る（デフォルトはファイルパス・サイズ・ハッシュのみ）
+ * @param {boolean} [options.noCache] - 応答キャッシュ・画像生成キャッシュを使わずに生成し直す
  * @returns {Promise<Object>} 生成結果
  */
-async function runDesignerAgent({ userPrompt, imageBase64, mimeType = 'image/png' }) {
-  return new Promise((resolve, reject) => {
-    const input = JSON.stringify({
-      userPrompt,
-      imageBase64,
-      mimeType
-    });
-
-    const pythonProcess = spawn('python3', ['-m', 'agents.designer_agent'], {
-      cwd: PROJECT_ROOT,
-      env: { ...process.env }
-    });
-
-    let stdout = '';
-    let stderr = '';
-
-    pythonProcess.stdout.on('data', (data) => {
-      stdout += data.toString();
-    });
-
-    pythonProcess.stderr.on('data', (data) => {
-      stderr += data.toString();
-    });
+async function runDesignerAgent({ userPrompt, imageBase64, mimeType = 'image/png', inlineImages = false, noCache = false }) {
+  return worker.request('generate', { userPrompt, imageBase64, mimeType, inlineImages, noCache });
+}
 
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        reject(new Error(`Python process exited with code ${code}: ${stderr}`));
-        return;
-      }
+/**
+ * アウトラインから複数スライドのデッキを生成
+ * @param {Object} options
+ * @param {string[]} options.outline - スライドごとの指示（1要素 = 1スライド）
+ * @param {string} [options.deckPrompt] - デッキ全体のテーマ・目的
+ * @param {string} [options.imageBase64] - 参照画像のBase64データ
+ * @param {boolean} [options.inlineImages] - 画像をBase64で受け取る
+ * @param {boolean} [options.noCache] - 応答キャッシュ・画像生成キャッシュを使わずに生成し直す
+ * @returns {Promise<Object>} 生成結果
+ */
+async function generateDeck({ outline, deckPrompt, imageBase64, inlineImages = false, noCache = false }) {
+  return worker.request('deck', { outline, deckPrompt, imageBase64, inlineImages, noCache });
+}
 
-      try {
-        const result = JSON.parse(stdout);
-        resolve(result);
-      } catch (err) {
-        reject(new Error(`Failed to parse Python output: ${stdout}`));
-      }
-    });
+/**
+ * 既存セッションの設計を修正
+ * @param {Object} options
+ * @param {string} options.feedback - 修正指示
+ * @param {string} options.sessionId - 修正対象のセッションID
+ * @param {boolean} [options.inlineImages] - 画像をBase64で受け取る
+ * @param {boolean} [options.noCache] - 応答キャッシュ・画像生成キャッシュを使わずに生成し直す
+ * @returns {Promise<Object>} 生成結果
+ */
+async function refineDesignerAgent({ feedback, sessionId, inlineImages = false, noCache = false }) {
+  return worker.request('refine', { feedback, sessionId, inlineImages, noCache });
+}
 
-    pythonProcess.on('error', (err) => {
-      reject(err);
-    });
+/**
+ * 中断・失敗したセッションを続きから再開（完了済みのフェーズ・要素は再実行しない）
+ * @param {Object} options
+ * @param {string} options.sessionId - 再開するセッションID
+ * @param {boolean} [options.inlineImages] - 画像をBase64で受け取る
+ * @returns {Promise<Object>} 生成結果
+ */
+async function resumeDesignerAgent({ sessionId, inlineImages = false }) {
+  return worker.request('resume', { sessionId, inlineImages });
+}
 
-    pythonProcess.stdin.write(input);
-    pythonProcess.stdin.end();
-  });
+/**
+ * 常駐ワーカーを終了
+ */
+function stopDesignerAgent() {
+  worker.stop();
 }
 
 module.exports = {
-  runDesignerAgent
+  runDesignerAgent,
+  generateDeck,
+  refineDesignerAgent,
+  resumeDesignerAgent,
+  stopDesignerAgent
 };
@@ -0,0 +1,139 @@
+"""
+ベンチマーク: 生成パイプラインのオーケストレーションオーバーヘッド計測
+FakeGenaiClient を注入し、API を呼ばずに generate / refine のスループットと
+レイテンシ（p50/p95/p99）を同時実行数・要素数ごとに計測する
+
+    python tests/bench_pipeline.py
+    python tests/bench_pipeline.py --concurrency 1,8,32 --elements 1,4 --jobs 64
+    python tests/bench_pipeline.py --text-latency 0 --image-latency 0   # 純粋なオーバーヘッド
+    python tests/bench_pipeline.py --image-quota 4                       # 429 を受けたときの挙動
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents import designer_agent
+from agents.designer_agent import DesignerAgent, DESIGN_MODEL
+from agents.tools import rate_limit
+from agents.tools.text_to_image import MODEL as IMAGE_MODEL
+from tests.fake_genai import FakeGenaiClient, Latency
+
+
+def percentile(values: list, p: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _new_agent(client: FakeGenaiClient) -> DesignerAgent:
+    # キャッシュを無効化して毎回パイプライン全体を通す
+    return DesignerAgent(
+        api_key="fake",
+        client=client,
+        use_image_cache=False,
+        use_response_cache=False
+    )
+
+
+async def _run_jobs(mode: str, client: FakeGenaiClient, jobs: int, concurrency: int) -> tuple:
+    """jobs 件を最大 concurrency 件ずつ並行実行し、(各ジョブの秒数, 全体の秒数, 失敗数) を返す"""
+    base_session = None
+    if mode == "refine":
+        seed = await _new_agent(client).agenerate("ベンチマーク用のベース設計", use_web_research=False)
+        base_session = seed["session_id"]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            agent = _new_agent(client)
+            start = time.perf_counter()
+            if mode == "generate":
+                result = await agent.agenerate(f"テック系セミナーの告知スライド #{i}")
+            else:
+                result = await agent.arefine(f"タイトルの色を変更 #{i}", session_id=base_session)
+            latencies.append(time.perf_counter() - start)
+            if not result.get("success"):
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(jobs)))
+    return latencies, time.perf_counter() - start, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成パイプラインのベンチマーク（オフライン）")
+    parser.add_argument("--modes", default="generate,refine", help="計測対象（generate,refine）")
+    parser.add_argument("--concurrency", default="1,4,16", help="同時実行数（カンマ区切り）")
+    parser.add_argument("--elements", default="1,4", help="設計JSONの画像要素数（カンマ区切り）")
+    parser.add_argument("--jobs", type=int, default=32, help="条件ごとのジョブ数")
+    parser.add_argument("--text-latency", type=float, default=50, help="テキストモデルの遅延中央値（ms）")
+    parser.add_argument("--image-latency", type=float, default=200, help="画像モデルの遅延中央値（ms）")
+    parser.add_argument("--sigma", type=float, default=0.3, help="遅延のばらつき（対数正規分布のσ）")
+    parser.add_argument("--image-scale", type=float, default=0.25, help="生成PNGのサイズ倍率（1.0 で1K相当）")
+    parser.add_argument("--text-rpm", type=float, default=0, help="テキストモデルのRPM上限（0 で無制限）")
+    parser.add_argument("--image-rpm", type=float, default=0, help="画像モデルのRPM上限（0 で無制限）")
+    parser.add_argument("--image-quota", type=int, default=None, help="Fake の画像モデルが受け付ける同時リクエスト数（超過分は 429）")
+    parser.add_argument("--verbose", action="store_true", help="パイプラインの進捗ログを表示")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+    element_counts = [int(e) for e in args.elements.split(",")]
+
+    # 出力はテンポラリディレクトリに書く
+    output_dir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    designer_agent.AGENT_OUTPUT_DIR = output_dir
+
+    header = f"{'mode':<9} {'conc':>5} {'imgs':>5} {'jobs':>5} {'fail':>5} {'429':>5} {'jobs/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for mode in modes:
+        for image_count in element_counts:
+            for concurrency in concurrencies:
+                rate_limit.reset_limiters()
+                rate_limit.configure_model(DESIGN_MODEL, rpm=args.text_rpm)
+                rate_limit.configure_model(IMAGE_MODEL, rpm=args.image_rpm)
+                client = FakeGenaiClient(
+                    image_count=image_count,
+                    text_latency=Latency(args.text_latency, args.sigma, seed=1),
+                    image_latency=Latency(args.image_latency, args.sigma, seed=2),
+                    image_scale=args.image_scale,
+                    image_quota=args.image_quota
+                )
+
+                log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with log:
+                    latencies, elapsed, failures = asyncio.run(
+                        _run_jobs(mode, client, args.jobs, concurrency)
+                    )
+
+                ms = [v * 1000 for v in latencies]
+                print(
+                    f"{mode:<9} {concurrency:>5} {image_count:>5} {args.jobs:>5} {failures:>5} {client.rejected:>5} "
+                    f"{args.jobs / elapsed:>8.2f} {percentile(ms, 50):>9.1f} {percentile(ms, 95):>9.1f} "
+                    f"{percentile(ms, 99):>9.1f} {statistics.mean(ms):>9.1f}"
+                )
+
+    print(f"\n出力ディレクトリ: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+pytest の共通設定
+リポジトリのルートを import パスに追加し、agents パッケージを読み込めるようにする
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
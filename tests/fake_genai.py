@@ -0,0 +1,334 @@
+"""
+オフライン用の Gemini スタンドイン
+google.genai.Client と同じ呼び出し口（models / aio.models の generate_content・generate_content_stream）を持ち、
+設定した遅延分布で待ってから定型の設計JSON・生成PNGを返す
+
+    from tests.fake_genai import FakeGenaiClient
+    client = FakeGenaiClient(image_count=4)
+    agent = DesignerAgent(api_key="fake", client=client)
+"""
+
+import asyncio
+import io
+import json
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from google.genai import errors, types
+from PIL import Image, ImageDraw
+
+# プロンプト中の目印 → 応答の種類
+_MARKERS = [
+    ("既存の設計JSONに対して", "design"),
+    ("スライド設計JSONを出力", "design"),
+    ("デザインリサーチャー", "web_research"),
+    ("PowerPointスライドを作成するために", "analysis"),
+    ("ユーザーの指示を深く分析", "reason"),
+]
+
+# ストリーミング応答の1断片あたりの文字数
+_STREAM_CHUNK_CHARS = 200
+
+# ストリーミング時、遅延のうち最初の断片が届くまでの割合（残りは断片ごとに均等に配分）
+_FIRST_CHUNK_RATIO = 0.3
+
+# アスペクト比 → 生成画像サイズ（1K相当）
+_ASPECT_SIZES = {
+    "16:9": (1376, 768),
+    "1:1": (1024, 1024),
+    "9:16": (768, 1376),
+    "4:3": (1184, 864),
+    "3:4": (864, 1184),
+}
+
+
+class Latency:
+    """対数正規分布の遅延（ミリ秒）"""
+
+    def __init__(self, median_ms: float, sigma: float = 0.3, seed: Optional[int] = None):
+        """
+        Args:
+            median_ms: 中央値（ミリ秒）。0 で待ち時間なし
+            sigma: ばらつき（対数スケールの標準偏差）。0 で固定値
+            seed: 乱数シード
+        """
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """1回分の遅延（秒）"""
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._random.lognormvariate(0.0, self.sigma) if self.sigma > 0 else 1.0
+        return self.median_ms * factor / 1000.0
+
+
+def make_design(image_count: int = 2, text_count: int = 2) -> dict:
+    """背景1つ + 画像 image_count 個 + テキスト text_count 個の設計JSONを作成"""
+    elements: List[dict] = [{
+        "type": "background",
+        "prompt": "A smooth deep blue gradient background with soft geometric shapes.",
+        "style": {"lighting": "soft", "color_tone": "cool", "texture": "smooth gradient"}
+    }]
+    for i in range(image_count):
+        elements.append({
+            "type": "image",
+            "id": f"image-{i + 1}",
+            "prompt": f"An abstract illustration number {i + 1}",
+            "position": {"x": 120 + i * 420, "y": 620, "width": 360, "height": 360},
+            "style": {"type": "illustration", "details": "flat"}
+        })
+    for i in range(text_count):
+        elements.append({
+            "type": "text",
+            "id": f"text-{i + 1}",
+            "content": f"テキスト {i + 1}",
+            "position": {"x": 160, "y": 160 + i * 180, "width": 1600, "height": 150},
+            "style": {"fontSize": 72 if i == 0 else 36, "fontWeight": "bold", "color": "#FFFFFF", "align": "center"}
+        })
+    return {
+        "meta": {
+            "theme": "tech",
+            "mood": "professional",
+            "color_scheme": {"primary": "#3B82F6", "secondary": "#8B5CF6", "accent": "#06B6D4", "background": "#0F172A"}
+        },
+        "elements": elements
+    }
+
+
+def make_png(width: int, height: int, seed: int = 0) -> bytes:
+    """グラデーションと図形で構成したPNGを生成"""
+    rng = random.Random(seed)
+    start = tuple(rng.randrange(256) for _ in range(3))
+    end = tuple(rng.randrange(256) for _ in range(3))
+
+    image = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        t = y / max(1, height - 1)
+        draw.line([(0, y), (width, y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(start, end)))
+    for _ in range(6):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(max(2, min(width, height) // 8))
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=tuple(rng.randrange(256) for _ in range(3)))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _prompt_text(contents: Any) -> str:
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    return "\n".join(part for part in contents if isinstance(part, str))
+
+
+class _FakeModels:
+    """client.models 相当（同期）"""
+
+    def __init__(self, owner: "FakeGenaiClient"):
+        self._owner = owner
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        self._owner._enter(model)
+        try:
+            delay = self._owner._latency_for(model).sample()
+            if delay:
+                time.sleep(delay)
+            return self._owner._respond(model, contents)
+        finally:
+            self._owner._exit(model)
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[types.GenerateContentResponse]:
+        self._owner._enter(model)
+        try:
+            delay = self._owner._latency_for(model).sample()
+            chunks = self._owner._stream_chunks(model, contents)
+            for i, chunk in enumerate(chunks):
+                time.sleep(_chunk_delay(delay, i, len(chunks)))
+                yield chunk
+        finally:
+            self._owner._exit(model)
+
+
+def _chunk_delay(total: float, index: int, count: int) -> float:
+    if not total:
+        return 0.0
+    if index == 0:
+        return total * _FIRST_CHUNK_RATIO
+    return total * (1 - _FIRST_CHUNK_RATIO) / max(1, count - 1)
+
+
+class _FakeAsyncModels:
+    """client.aio.models 相当（非同期）"""
+
+    def __init__(self, owner: "FakeGenaiClient"):
+        self._owner = owner
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        self._owner._enter(model)
+        try:
+            delay = self._owner._latency_for(model).sample()
+            if delay:
+                await asyncio.sleep(delay)
+            return self._owner._respond(model, contents)
+        finally:
+            self._owner._exit(model)
+
+    async def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> AsyncIterator[types.GenerateContentResponse]:
+        self._owner._enter(model)
+        delay = self._owner._latency_for(model).sample()
+        chunks = self._owner._stream_chunks(model, contents)
+
+        async def stream() -> AsyncIterator[types.GenerateContentResponse]:
+            try:
+                for i, chunk in enumerate(chunks):
+                    await asyncio.sleep(_chunk_delay(delay, i, len(chunks)))
+                    yield chunk
+            finally:
+                self._owner._exit(model)
+
+        return stream()
+
+
+class _FakeAio:
+    def __init__(self, owner: "FakeGenaiClient"):
+        self.models = _FakeAsyncModels(owner)
+
+
+class FakeGenaiClient:
+    """google.genai.Client のオフライン版"""
+
+    def __init__(
+        self,
+        image_count: int = 2,
+        text_count: int = 2,
+        text_latency: Optional[Latency] = None,
+        image_latency: Optional[Latency] = None,
+        image_scale: float = 0.25,
+        design: Optional[dict] = None,
+        web_research_needed: bool = True,
+        image_quota: Optional[int] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            image_count: 設計JSONに含める画像要素の数
+            text_count: 設計JSONに含めるテキスト要素の数
+            text_latency: テキストモデルの遅延分布
+            image_latency: 画像モデルの遅延分布
+            image_scale: 生成PNGのサイズ倍率（1.0 で1K相当）
+            design: 設計JSONを固定する場合に指定
+            web_research_needed: False にすると Web Research が「検索不要」を返す
+            image_quota: 画像モデルの同時リクエスト数の上限。超えた分は 429 RESOURCE_EXHAUSTED を返す
+            seed: 乱数シード
+        """
+        self.design = design or make_design(image_count, text_count)
+        self.text_latency = text_latency or Latency(0)
+        self.image_latency = image_latency or Latency(0)
+        self.image_scale = image_scale
+        self.web_research_needed = web_research_needed
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+        self.image_quota = image_quota
+        self.calls: List[dict] = []
+        self.rejected = 0
+        self._in_flight: dict = {}
+        self._seed = seed
+        self._lock = threading.Lock()
+
+    def _enter(self, model: str) -> None:
+        with self._lock:
+            in_flight = self._in_flight.get(model, 0)
+            if self.image_quota is not None and "image" in model and in_flight >= self.image_quota:
+                self.rejected += 1
+                raise errors.ClientError(429, {"error": {
+                    "code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"
+                }})
+            self._in_flight[model] = in_flight + 1
+
+    def _exit(self, model: str) -> None:
+        with self._lock:
+            self._in_flight[model] -= 1
+
+    def _latency_for(self, model: str) -> Latency:
+        return self.image_latency if "image" in model else self.text_latency
+
+    def _record(self, model: str, kind: str) -> int:
+        with self._lock:
+            self.calls.append({"model": model, "kind": kind})
+            return len(self.calls)
+
+    def _respond(self, model: str, contents: Any) -> types.GenerateContentResponse:
+        text = _prompt_text(contents)
+
+        if "image" in model:
+            count = self._record(model, "image")
+            width, height = _ASPECT_SIZES["1:1"]
+            for aspect, size in _ASPECT_SIZES.items():
+                if f"({aspect} aspect ratio)" in text:
+                    width, height = size
+                    break
+            width = max(8, int(width * self.image_scale))
+            height = max(8, int(height * self.image_scale))
+            data = make_png(width, height, seed=self._seed + count)
+            part = types.Part.from_bytes(data=data, mime_type="image/png")
+            return self._response([part], prompt_tokens=len(text) // 4, output_tokens=1290)
+
+        kind = "text"
+        for marker, marker_kind in _MARKERS:
+            if marker in text:
+                kind = marker_kind
+                break
+        self._record(model, kind)
+
+        if kind == "design":
+            body = "```json\n" + json.dumps(self.design, ensure_ascii=False, indent=2) + "\n```"
+        elif kind == "web_research":
+            body = "### 検索結果\n- **トレンド**: グラデーション" if self.web_research_needed else "検索不要"
+        elif kind == "analysis":
+            body = json.dumps({"elements": [
+                {"id": "background", "type": "background", "label": "背景",
+                 "bbox": {"x": 0, "y": 0, "width": 1376, "height": 768}},
+                {"id": "text_1", "type": "text", "label": "タイトル", "content": "タイトル",
+                 "bbox": {"x": 100, "y": 100, "width": 800, "height": 120},
+                 "style": {"fontSize": 48, "fontWeight": "bold", "fontStyle": "normal", "color": "#FFFFFF", "align": "center"}},
+                {"id": "illustration_1", "type": "illustration", "label": "イラスト",
+                 "bbox": {"x": 900, "y": 300, "width": 300, "height": 300}},
+            ]}, ensure_ascii=False)
+        else:
+            body = "推奨アプローチ: tone=tech, layout=center, palette=dark-tech"
+
+        return self._response([types.Part(text=body)], prompt_tokens=len(text) // 4, output_tokens=len(body) // 4)
+
+    def _stream_chunks(self, model: str, contents: Any) -> List[types.GenerateContentResponse]:
+        """応答を断片に分割（トークン使用量は最後の断片にのみ付ける）"""
+        response = self._respond(model, contents)
+        text = response.text or ""
+        if not text:
+            return [response]
+        pieces = [text[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(text), _STREAM_CHUNK_CHARS)]
+        chunks = [
+            types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=piece)]))]
+            )
+            for piece in pieces
+        ]
+        chunks[-1].usage_metadata = response.usage_metadata
+        return chunks
+
+    @staticmethod
+    def _response(parts: List[types.Part], prompt_tokens: int, output_tokens: int) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens
+            )
+        )
@@ -0,0 +1,83 @@
+"""
+テスト: 画像分析（送信前の縮小・形式の選択と、bbox / style の元画像座標への変換）
+"""
+
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from agents.tools import rate_limit
+from agents.tools.analyze_image import MODEL, _scale_bbox, _scale_style, analyze_image
+from agents.tools.decoded_images import prepare_image
+from agents.tools.image_handle import ImageHandle
+from tests.fake_genai import FakeGenaiClient
+
+
+def _png(width: int, height: int, mode: str = "RGB") -> bytes:
+    buffer = BytesIO()
+    color = (10, 120, 200, 128) if mode == "RGBA" else (10, 120, 200)
+    Image.new(mode, (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_scale_bbox_to_original_and_clamps():
+    assert _scale_bbox({"x": 10, "y": 20, "width": 100, "height": 50, "unit": "px"}, 2.0, 2.0, 1000, 1000) == {
+        "x": 20, "y": 40, "width": 200, "height": 100, "unit": "px"
+    }
+    # 画像の外にはみ出す範囲は画像内に収める
+    assert _scale_bbox({"x": -5, "y": 450, "width": 600, "height": 100}, 2.0, 2.0, 1000, 1000) == {
+        "x": 0, "y": 900, "width": 1000, "height": 100
+    }
+    assert _scale_bbox({"x": 600, "y": 0}, 2.0, 1.5, 1000, 600) == {"x": 1000, "y": 0, "width": 0, "height": 0}
+    assert _scale_bbox({"x": "12.4", "y": 3.6, "width": 10, "height": 10}, 1.5, 1.0, 100, 100)["x"] == 19
+
+
+def test_scale_style_only_pixel_values():
+    style = {"fontSize": 24, "letterSpacing": 1.5, "strokeWidth": True, "color": "#FFFFFF", "fontWeight": "bold", "lineHeight": 1.2}
+
+    scaled = _scale_style(style, 2.5)
+
+    assert scaled == {
+        "fontSize": 60, "letterSpacing": 3.8, "strokeWidth": True,
+        "color": "#FFFFFF", "fontWeight": "bold", "lineHeight": 1.2
+    }
+    assert style["fontSize"] == 24
+
+
+def test_alpha_image_is_not_uploaded_as_jpeg():
+    opaque = prepare_image(_png(400, 200), max_edge=100, image_format="JPEG")
+    transparent = prepare_image(_png(400, 200, "RGBA"), max_edge=100, image_format="JPEG")
+
+    assert (opaque.mime_type, opaque.size) == ("image/jpeg", (100, 50))
+    assert (transparent.mime_type, transparent.size) == ("image/png", (100, 50))
+    with transparent.to_pil() as pil:
+        assert pil.mode == "RGBA"
+        assert pil.getpixel((0, 0))[3] == 128
+
+    # 縮小不要なら PNG のまま送る（再エンコードしない）
+    data = _png(80, 40, "RGBA")
+    assert prepare_image(data, max_edge=100, image_format="JPEG").data == data
+
+
+@pytest.fixture
+def client():
+    rate_limit.configure_model(MODEL, rpm=0, max_concurrency=64)
+    yield FakeGenaiClient()
+    rate_limit._overrides.pop(MODEL, None)
+    rate_limit.reset_limiters()
+
+
+def test_analyze_downscaled_upload_returns_original_coordinates(client):
+    # Fake クライアントは 1376x768 の画像の座標で応答する
+    image = ImageHandle(_png(2752, 1536), "image/png")
+
+    result = analyze_image(image, client=client, max_upload_edge=1376)
+
+    assert result["success"], result.get("error")
+    assert result["upload_size"] == {"width": 1376, "height": 768}
+    assert result["image_size"] == {"width": 2752, "height": 1536}
+    elements = {elem["id"]: elem for elem in result["elements"]}
+    assert elements["illustration_1"]["bbox"] == {"x": 1800, "y": 600, "width": 600, "height": 600}
+    assert elements["text_1"]["bbox"] == {"x": 200, "y": 200, "width": 1600, "height": 240}
+    assert elements["text_1"]["style"]["fontSize"] == 96
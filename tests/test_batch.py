@@ -0,0 +1,150 @@
+"""
+テスト: バッチ変換（対象の列挙・設計JSONの判定・変換・マニフェストによる再開）
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+from agents import batch
+
+DESIGN = {
+    "meta": {"title": "テスト"},
+    "elements": [
+        {"type": "background", "prompt": "blue gradient"},
+        {"type": "image", "id": "hero", "prompt": "robot", "position": {"x": 100, "y": 100, "width": 400, "height": 400}},
+        {"type": "text", "id": "title", "content": "タイトル", "position": {"x": 960, "y": 800, "width": 1600, "height": 200}}
+    ]
+}
+
+
+def _png(path: Path, size=(64, 36), color=(200, 40, 40)) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, color).save(path)
+
+
+def _json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def source(tmp_path):
+    """設計セッション・単体画像・内部ディレクトリ・分析結果を含む入力ディレクトリ"""
+    root = tmp_path / "in"
+    _json(root / "S1" / "design.json", DESIGN)
+    _png(root / "S1" / "background.png", (192, 108))
+    _png(root / "S1" / "image_1.png", (40, 40))
+    _png(root / "photos" / "a.png")
+    _png(root / "photos" / "b.png")
+    # 対象外: 内部ディレクトリ・editable の分析結果・設計でない JSON
+    _png(root / "_blobs" / "ab" / "abcdef.png")
+    _json(root / "photos" / "a.analysis.json", {"elements": [{"type": "text", "content": "x", "bbox": {}}]})
+    _json(root / "photos" / "meta.json", {"elements": [{"name": "not a design element"}]})
+    return root
+
+
+def test_collect_items_classifies_directory(source):
+    items = batch.collect_items(source, exclude=source / "out")
+
+    # 設計のディレクトリの画像は設計の要素なので項目にしない
+    assert items == [
+        {"id": "S1/design.json", "kind": "design", "path": str(source / "S1" / "design.json")},
+        {"id": "photos/a.png", "kind": "image", "path": str(source / "photos" / "a.png")},
+        {"id": "photos/b.png", "kind": "image", "path": str(source / "photos" / "b.png")}
+    ]
+
+
+def test_collect_items_skips_output_inside_source(source):
+    _png(source / "out" / "c.png")
+
+    assert "out/c.png" not in {item["id"] for item in batch.collect_items(source, exclude=source / "out")}
+    assert "out/c.png" in {item["id"] for item in batch.collect_items(source)}
+
+
+def test_collect_items_from_list(source, tmp_path):
+    listing = tmp_path / "items.txt"
+    listing.write_text(f"# comment\nin/photos/a.png\n\n{source / 'S1' / 'design.json'}\nin/notes.txt\n", encoding="utf-8")
+
+    items = batch.collect_items(listing)
+
+    assert [(item["id"], item["kind"]) for item in items] == [("in/photos/a.png", "image"), ("in/S1/design.json", "design")]
+
+
+def test_convert_design_uses_session_images(source, tmp_path):
+    item = {"id": "S1/design.json", "kind": "design", "path": str(source / "S1" / "design.json")}
+
+    result = batch.convert_item(item, str(tmp_path / "out"))
+
+    assert result["status"] == "done", result.get("error")
+    assert Path(result["output"]).name == "S1__design.pptx"
+    shapes = list(Presentation(result["output"]).slides[0].shapes)
+    assert [shape.shape_type for shape in shapes].count(13) == 2  # 背景 + 画像
+    assert any(shape.has_text_frame and shape.text_frame.text == "タイトル" for shape in shapes)
+
+
+def test_convert_deck(tmp_path):
+    deck_dir = tmp_path / "deck"
+    _json(deck_dir / "deck.json", {"slides": [DESIGN, None, DESIGN]})
+    for n in (1, 3):
+        _png(deck_dir / f"slide{n:02d}_background.png", (192, 108))
+        _png(deck_dir / f"slide{n:02d}_image_1.png", (40, 40))
+
+    result = batch.convert_item({"id": "deck.json", "kind": "design", "path": str(deck_dir / "deck.json")}, str(tmp_path / "out"))
+
+    assert result["status"] == "done", result.get("error")
+    assert len(Presentation(result["output"]).slides) == 2
+
+
+def test_convert_failure_is_reported(tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+
+    result = batch.convert_item({"id": "broken.png", "kind": "image", "path": str(broken)}, str(tmp_path / "out"))
+
+    assert result["status"] == "failed"
+    assert result["error"]
+
+
+def test_run_batch_resumes_from_manifest(source, tmp_path):
+    out = tmp_path / "out"
+    broken = source / "photos" / "b.png"
+    broken.write_bytes(b"not an image")
+
+    first = batch.run_batch(source, out, workers=1)
+    assert (first["total"], first["done"], first["failed"], first["skipped"]) == (3, 2, 1, 0)
+    manifest = json.loads((out / batch.MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["photos/b.png"]["status"] == "failed"
+    # 追記ログは終了時にマニフェストへまとめて削除する
+    assert not (out / batch.JOURNAL_NAME).exists()
+
+    # 完了・失敗済みの項目は飛ばす
+    second = batch.run_batch(source, out, workers=1)
+    assert (second["done"], second["failed"], second["skipped"]) == (0, 0, 3)
+
+    # --retry-failed で失敗した項目だけを再実行する
+    _png(broken)
+    third = batch.run_batch(source, out, workers=1, retry_failed=True)
+    assert (third["done"], third["failed"], third["skipped"]) == (1, 0, 2)
+
+    # --force で全件を再実行する
+    fourth = batch.run_batch(source, out, workers=1, force=True)
+    assert (fourth["done"], fourth["skipped"]) == (3, 0)
+
+
+def test_interrupted_journal_is_replayed(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    batch.save_manifest(out / batch.MANIFEST_NAME, {"a.png": {"id": "a.png", "status": "failed"}})
+    # 中断された実行の追記ログ（最後の行は書き込み途中）
+    (out / batch.JOURNAL_NAME).write_text(
+        json.dumps({"id": "a.png", "status": "done"}) + "\n" + json.dumps({"id": "b.png", "status": "done"}) + "\n{\"id\": \"c",
+        encoding="utf-8"
+    )
+
+    manifest = batch.load_manifest(out / batch.MANIFEST_NAME)
+
+    assert manifest == {"a.png": {"id": "a.png", "status": "done"}, "b.png": {"id": "b.png", "status": "done"}}
@@ -0,0 +1,134 @@
+"""
+テスト: コンテンツアドレス方式の画像ストア（保存・リンク・参照数・gc・セッション削除）
+"""
+
+import os
+
+import pytest
+
+from agents import blob_store
+from agents.blob_store import BlobStore, load_manifest
+from agents.tools.image_handle import ImageHandle
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(tmp_path / "agent_output")
+
+
+def _image(seed: int) -> ImageHandle:
+    return ImageHandle(bytes([seed]) * 64, "image/png")
+
+
+def _age(path, seconds: float) -> None:
+    """実体の更新日時を過去にずらす（gc の猶予期間の外に出す）"""
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_put_is_content_addressed(store):
+    image = _image(1)
+    first = store.put(image)
+    second = store.put(ImageHandle(image.data, "image/png"))
+
+    assert first == second == store.blob_path(image.sha256, "png")
+    assert first.read_bytes() == image.data
+
+
+def test_link_shares_one_blob_across_sessions(store):
+    image = _image(1)
+    a = store.link(image, store.output_dir / "S1" / "background.png")
+    b = store.link(image, store.output_dir / "S2" / "background.png")
+    blob = store.blob_path(image.sha256, "png")
+
+    assert a.read_bytes() == b.read_bytes() == image.data
+    assert blob.stat().st_nlink == 3
+    assert load_manifest(store.output_dir / "S1") == {"background.png": {"sha256": image.sha256, "extension": "png"}}
+    assert store.refcounts() == {image.sha256: 2}
+    assert store.stats()["logical_bytes"] == 2 * image.size
+
+
+def test_relinking_does_not_modify_shared_blob(store):
+    old, new = _image(1), _image(2)
+    store.link(old, store.output_dir / "S1" / "image_1.png")
+    store.link(old, store.output_dir / "S2" / "image_1.png")
+    store.link(new, store.output_dir / "S1" / "image_1.png")
+
+    assert (store.output_dir / "S2" / "image_1.png").read_bytes() == old.data
+    assert store.blob_path(old.sha256, "png").read_bytes() == old.data
+    assert store.refcounts() == {old.sha256: 1, new.sha256: 1}
+
+
+def test_gc_removes_only_unreferenced_old_blobs(store):
+    kept, orphan = _image(1), _image(2)
+    store.link(kept, store.output_dir / "S1" / "background.png")
+    store.put(orphan)
+    for blob in store._blobs():
+        _age(blob, 7200)
+
+    result = store.gc(grace_seconds=3600)
+
+    assert result == {"removed": 1, "freed_bytes": orphan.size, "kept": 1}
+    assert store.blob_path(kept.sha256, "png").exists()
+    assert not store.blob_path(orphan.sha256, "png").exists()
+
+
+def test_gc_keeps_new_blobs_within_grace_period(store):
+    # 保存直後（参照の記録前）の実体は削除しない
+    image = _image(1)
+    store.put(image)
+
+    assert store.gc(grace_seconds=3600)["removed"] == 0
+    assert store.blob_path(image.sha256, "png").exists()
+
+
+def test_gc_keeps_hard_linked_blobs_without_manifest(store, tmp_path):
+    # 画像生成キャッシュなど、blobs.json に記録しないリンク
+    image = _image(1)
+    store.link(image, tmp_path / "cache" / "entry.png", record=False)
+    _age(store.blob_path(image.sha256, "png"), 7200)
+
+    assert store.gc(grace_seconds=0)["removed"] == 0
+
+
+def test_dry_run_does_not_delete(store):
+    image = _image(1)
+    store.put(image)
+
+    assert store.gc(dry_run=True, grace_seconds=0)["removed"] == 1
+    assert store.blob_path(image.sha256, "png").exists()
+
+
+def test_remove_session_frees_blobs_only_it_used(store):
+    shared, own = _image(1), _image(2)
+    store.link(shared, store.output_dir / "S1" / "background.png")
+    store.link(own, store.output_dir / "S1" / "image_1.png")
+    store.link(shared, store.output_dir / "S2" / "background.png")
+
+    result = store.remove_session("S1", grace_seconds=0)
+
+    assert not (store.output_dir / "S1").exists()
+    assert result["removed"] == 1
+    assert store.blob_path(shared.sha256, "png").exists()
+    assert not store.blob_path(own.sha256, "png").exists()
+    assert store.refcounts() == {shared.sha256: 1}
+
+
+def test_link_recovers_when_gc_deletes_blob_before_linking(store, monkeypatch):
+    image = _image(1)
+    real_link = os.link
+    calls = []
+
+    def racing_link(src, dst):
+        # put() が返した直後に別プロセスの gc が実体を削除した状況
+        calls.append(src)
+        if len(calls) == 1:
+            os.unlink(src)
+        return real_link(src, dst)
+
+    monkeypatch.setattr(blob_store.os, "link", racing_link)
+    target = store.link(image, store.output_dir / "S1" / "background.png")
+
+    assert len(calls) == 2
+    assert target.read_bytes() == image.data
+    assert store.refcounts() == {image.sha256: 1}
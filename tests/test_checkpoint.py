@@ -0,0 +1,154 @@
+"""
+テスト: セッションのチェックポイントと resume（完了済みのフェーズ・要素を再実行しないこと）
+"""
+
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from agents import designer_agent
+from agents.checkpoint import SessionCheckpoint
+from agents.designer_agent import DESIGN_MODEL, DesignerAgent
+from agents.tools import rate_limit
+from agents.tools.text_to_image import MODEL as IMAGE_MODEL
+from tests.fake_genai import FakeGenaiClient
+
+
+def test_set_invalidates_later_phases(tmp_path):
+    checkpoint = SessionCheckpoint(tmp_path)
+    for phase in ("web_research", "reasoning", "design_raw", "design"):
+        checkpoint.set(phase, {"phase": phase})
+    checkpoint.set_element("background", "done", file_path=str(tmp_path / "background.png"))
+
+    # 推論をやり直すと、それ以降の設計も破棄する
+    checkpoint.set("reasoning", "new")
+
+    assert checkpoint.has("web_research")
+    assert checkpoint.get("reasoning") == "new"
+    assert not checkpoint.has("design_raw")
+    assert not checkpoint.has("design")
+
+
+def test_new_design_discards_element_status(tmp_path):
+    checkpoint = SessionCheckpoint(tmp_path)
+    checkpoint.set("design_raw", {"elements": []})
+    checkpoint.set_element("image_1", "failed", error="boom")
+    checkpoint.set("design", {"elements": []})
+
+    assert checkpoint.element("image_1") == {"status": "failed", "error": "boom"}
+
+    checkpoint.set("design_raw", {"elements": [{"type": "image"}]})
+    assert checkpoint.element("image_1") is None
+
+
+def test_none_phase_counts_as_done(tmp_path):
+    checkpoint = SessionCheckpoint(tmp_path)
+    checkpoint.set("web_research", None)
+
+    assert checkpoint.has("web_research")
+    assert checkpoint.get("web_research") is None
+
+
+def test_completed_image_requires_file(tmp_path):
+    checkpoint = SessionCheckpoint(tmp_path)
+    path = tmp_path / "background.png"
+    checkpoint.set_element("background", "done", file_path=str(path))
+    checkpoint.set_element("image_1", "failed", error="quota")
+
+    assert checkpoint.completed_image("background") is None
+    path.write_bytes(b"png")
+    assert checkpoint.completed_image("background") == str(path)
+    assert checkpoint.completed_image("image_1") is None
+
+
+def test_load_round_trip_with_reference_image(tmp_path):
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), (1, 2, 3)).save(buffer, "JPEG")
+    reference = base64.b64encode(buffer.getvalue()).decode()
+
+    checkpoint = SessionCheckpoint(tmp_path)
+    checkpoint.set_request({"user_prompt": "テスト"}, reference_image=reference)
+    checkpoint.set("reasoning", "分析")
+    checkpoint.finish(False, error="interrupted")
+
+    loaded = SessionCheckpoint.load(tmp_path)
+
+    assert loaded.status == "failed"
+    assert loaded.data["error"] == "interrupted"
+    assert loaded.request["user_prompt"] == "テスト"
+    # 参照画像は元の形式のまま保存され、そのまま復元される
+    assert loaded.request["reference_image_path"].endswith("reference.jpg")
+    assert loaded.reference_image() == reference
+    assert loaded.get("reasoning") == "分析"
+    assert SessionCheckpoint.load(tmp_path / "missing") is None
+
+
+@pytest.fixture
+def fake_pipeline(tmp_path, monkeypatch):
+    """出力先をテンポラリに向け、Fake クライアントのレート制限を外す"""
+    monkeypatch.setattr(designer_agent, "AGENT_OUTPUT_DIR", tmp_path)
+    for model in (DESIGN_MODEL, IMAGE_MODEL):
+        rate_limit.configure_model(model, rpm=0, max_concurrency=64)
+    yield FakeGenaiClient(image_count=2, text_count=2)
+    for model in (DESIGN_MODEL, IMAGE_MODEL):
+        rate_limit._overrides.pop(model, None)
+    rate_limit.reset_limiters()
+
+
+def _agent(client, session_id=None):
+    return DesignerAgent(
+        api_key="fake",
+        client=client,
+        session_id=session_id,
+        use_image_cache=False,
+        use_response_cache=False
+    )
+
+
+def _text_calls(client):
+    return [call for call in client.calls if call["kind"] != "image"]
+
+
+def test_resume_after_interrupted_execution_skips_text_phases(fake_pipeline, monkeypatch):
+    client = fake_pipeline
+    agent = _agent(client)
+
+    async def interrupted(*args, **kwargs):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(agent, "_aexecute_design", interrupted)
+    first = agent.generate("AIセミナーの告知バナー")
+    assert not first["success"]
+
+    checkpoint = SessionCheckpoint.load(designer_agent.AGENT_OUTPUT_DIR / agent.session_id)
+    assert checkpoint.status == "failed"
+    assert all(checkpoint.has(phase) for phase in ("web_research", "reasoning", "design_raw", "design"))
+    text_calls = len(_text_calls(client))
+
+    resumed = _agent(client).resume(agent.session_id)
+
+    assert resumed["success"], resumed.get("error")
+    assert resumed["session_id"] == agent.session_id
+    assert resumed["resumed_phases"] == ["web_research", "reasoning", "design"]
+    # Webリサーチ・推論・設計は再実行しない
+    assert len(_text_calls(client)) == text_calls
+    checkpoint = SessionCheckpoint.load(designer_agent.AGENT_OUTPUT_DIR / agent.session_id)
+    assert checkpoint.status == "completed"
+    assert {key: entry["status"] for key, entry in checkpoint.data["elements"].items()} == {
+        "background": "done", "image_1": "done", "image_2": "done"
+    }
+
+    # 完了済みのセッションを再開しても画像は生成し直さない
+    image_calls = len(client.calls) - text_calls
+    again = _agent(client).resume(agent.session_id)
+    assert again["success"]
+    assert len(client.calls) - text_calls == image_calls
+
+
+def test_resume_unknown_session(fake_pipeline):
+    result = _agent(fake_pipeline).resume("NONE-0000")
+
+    assert not result["success"]
+    assert result["session_id"] == "NONE-0000"
@@ -0,0 +1,83 @@
+"""
+テスト: 共有 genai クライアント（イベントループをまたいでも非同期側の接続を使い回さないこと）
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.genai import types
+
+from agents.tools import client_pool
+from agents.tools.client_pool import SharedClient
+
+_BODY = json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}}]}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """generateContent に固定の応答を返す（keep-alive あり）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_options():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield types.HttpOptions(base_url=f"http://127.0.0.1:{server.server_port}")
+    server.shutdown()
+    server.server_close()
+
+
+def test_sequential_asyncio_run_calls_succeed(http_options):
+    client = SharedClient("test", http_options)
+
+    async def call():
+        response = await client.aio.models.generate_content(model="gemini-test", contents="hi")
+        return response.text
+
+    # 1回目のループが閉じた後も、2回目のループで新しい接続を使う
+    assert asyncio.run(call()) == "ok"
+    assert asyncio.run(call()) == "ok"
+    assert client.models.generate_content(model="gemini-test", contents="hi").text == "ok"
+
+
+def test_async_client_is_per_loop(http_options):
+    client = SharedClient("test", http_options)
+
+    async def get_aio():
+        return client.aio, client.aio
+
+    first_a, first_b = asyncio.run(get_aio())
+    second, _ = asyncio.run(get_aio())
+
+    assert first_a is first_b
+    assert first_a is not second
+    # 同期側は常に同じクライアント
+    assert client.models is client.models
+
+
+def test_get_shared_client_reuses_per_key(monkeypatch):
+    client_pool.clear_clients()
+    try:
+        assert client_pool.get_shared_client("key-a") is client_pool.get_shared_client("key-a")
+        assert client_pool.get_shared_client("key-a") is not client_pool.get_shared_client("key-b")
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        with pytest.raises(ValueError):
+            client_pool.get_shared_client()
+    finally:
+        client_pool.clear_clients()
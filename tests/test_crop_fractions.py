@@ -0,0 +1,66 @@
+"""
+テスト: ネイティブトリミングの比率計算（元画像のピクセル範囲 → PPTXのトリミング量）
+"""
+
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+from agents.tools.image_handle import ImageHandle
+from agents.tools.image_to_pptx import _crop_fractions, image_to_pptx
+
+
+def test_full_image_has_no_crop():
+    assert _crop_fractions({"x": 0, "y": 0, "width": 200, "height": 100}, (200, 100)) == (0.0, 0.0, 0.0, 0.0)
+
+
+def test_inner_region():
+    left, top, right, bottom = _crop_fractions({"x": 50, "y": 10, "width": 100, "height": 40}, (200, 100))
+
+    assert (left, top, right, bottom) == pytest.approx((0.25, 0.1, 0.25, 0.5))
+
+
+def test_missing_size_extends_to_edges():
+    assert _crop_fractions({"x": 100, "y": 50}, (200, 100)) == pytest.approx((0.5, 0.5, 0.0, 0.0))
+
+
+@pytest.mark.parametrize("crop_bbox, expected", [
+    # 画像からはみ出す範囲は画像内に収める
+    ({"x": -20, "y": -10, "width": 120, "height": 60}, (0.0, 0.0, 0.5, 0.5)),
+    ({"x": 150, "y": 80, "width": 500, "height": 500}, (0.75, 0.8, 0.0, 0.0)),
+    # 幅・高さ 0 や画像外の開始位置でも最低1ピクセルは残す
+    ({"x": 10, "y": 10, "width": 0, "height": 0}, (0.05, 0.1, 0.945, 0.89)),
+    ({"x": 500, "y": 500, "width": 10, "height": 10}, (0.995, 0.99, 0.0, 0.0)),
+])
+def test_out_of_range_is_clamped(crop_bbox, expected):
+    left, top, right, bottom = _crop_fractions(crop_bbox, (200, 100))
+
+    assert (left, top, right, bottom) == pytest.approx(expected)
+    assert left + right < 1.0 and top + bottom < 1.0
+
+
+def test_native_crop_embeds_source_once(tmp_path):
+    buffer = BytesIO()
+    Image.new("RGB", (200, 100), (10, 20, 30)).save(buffer, "PNG")
+    source = ImageHandle(buffer.getvalue(), "image/png")
+    elements = [
+        {"id": "a", "type": "image", "source_image": source,
+         "crop_bbox": {"x": 0, "y": 0, "width": 100, "height": 50},
+         "bbox": {"x": 0, "y": 0, "width": 400, "height": 200}},
+        {"id": "b", "type": "image", "source_image": source,
+         "crop_bbox": {"x": 100, "y": 50, "width": 100, "height": 50},
+         "bbox": {"x": 500, "y": 0, "width": 400, "height": 200}}
+    ]
+
+    result = image_to_pptx(elements=elements, session_id="crop", output_dir=tmp_path, optimize_media=False)
+
+    assert result["success"], result.get("error")
+    assert result["media"]["parts"] == 1
+    assert result["media"]["cropped"] == 2
+    pictures = list(Presentation(result["file_path"]).slides[0].shapes)
+    assert [(p.crop_left, p.crop_top, p.crop_right, p.crop_bottom) for p in pictures] == [
+        pytest.approx((0.0, 0.0, 0.5, 0.5)),
+        pytest.approx((0.5, 0.5, 0.0, 0.0))
+    ]
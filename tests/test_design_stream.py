@@ -0,0 +1,84 @@
+"""
+テスト: 設計JSONのストリーミングパーサー（断片の分割位置によらず同じ結果になること）
+"""
+
+import json
+
+from agents.design_stream import DesignStreamParser
+
+DESIGN = {
+    "meta": {"title": "テスト", "color_scheme": {"primary": "#112233"}},
+    "elements": [
+        {"id": "bg", "type": "background", "prompt": "blue {gradient}"},
+        {"id": "title", "type": "text", "content": "引用 \"}]\" と {括弧}", "style": {"fontSize": 48}},
+        {"id": "hero", "type": "image", "prompt": "robot", "bbox": {"x": 1, "y": 2, "width": 3, "height": 4}}
+    ]
+}
+
+
+def _feed_all(chunks):
+    parser = DesignStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def _expected_events():
+    return [("meta", DESIGN["meta"])] + [("element", i, elem) for i, elem in enumerate(DESIGN["elements"])]
+
+
+def test_whole_response_with_code_fence():
+    text = "以下が設計です。\n```json\n" + json.dumps(DESIGN, ensure_ascii=False, indent=2) + "\n```"
+    parser, events = _feed_all([text])
+
+    assert events == _expected_events()
+    assert parser.meta == DESIGN["meta"]
+    assert parser.element_count == 3
+
+
+def test_one_character_chunks():
+    text = json.dumps(DESIGN, ensure_ascii=False)
+    _, events = _feed_all(list(text))
+
+    assert events == _expected_events()
+
+
+def test_every_split_point():
+    # 文字列・エスケープ・ネストしたオブジェクトの途中を含む全ての位置で2分割する
+    text = json.dumps(DESIGN, ensure_ascii=False)
+    for split in range(1, len(text)):
+        _, events = _feed_all([text[:split], text[split:]])
+        assert events == _expected_events(), f"split at {split}"
+
+
+def test_element_is_emitted_only_when_closed():
+    parser = DesignStreamParser()
+
+    assert parser.feed('{"elements": [{"id": "a", "style": {"fontSize": 1}') == []
+    assert parser.feed("}") == [("element", 0, {"id": "a", "style": {"fontSize": 1}})]
+    assert parser.feed(', {"id": "b"') == []
+    assert parser.feed("}]}") == [("element", 1, {"id": "b"})]
+
+
+def test_invalid_element_keeps_index():
+    # 不正な要素はイベントを出さないが、以降の要素のインデックスはずらさない
+    _, events = _feed_all(['{"elements": [{"id": "a",}, {"id": "b"}]}'])
+
+    assert events == [("element", 1, {"id": "b"})]
+
+
+def test_nested_keys_named_elements_are_ignored():
+    # トップレベル以外の "elements" / "meta" は取り出さない
+    text = '{"meta": {"elements": [{"x": 1}]}, "other": {"meta": {"y": 2}}}'
+    parser, events = _feed_all([text])
+
+    assert events == [("meta", {"elements": [{"x": 1}]})]
+    assert parser.element_count == 0
+
+
+def test_empty_chunk():
+    parser = DesignStreamParser()
+
+    assert parser.feed("") == []
+    assert parser.feed(None) == []
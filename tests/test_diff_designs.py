@@ -0,0 +1,99 @@
+"""
+テスト: refine の設計差分（テキストだけの変更では画像を再生成しないこと）
+"""
+
+import copy
+
+import pytest
+
+from agents.designer_agent import DesignerAgent
+
+DESIGN = {
+    "meta": {"color_scheme": {"primary": "#112233", "secondary": "#445566"}},
+    "elements": [
+        {"id": "bg", "type": "background", "prompt": "blue gradient", "style": {"lighting": "soft"}},
+        {"id": "title", "type": "text", "content": "タイトル", "style": {"fontSize": 72}},
+        {"id": "hero", "type": "image", "prompt": "robot", "style": {"type": "3d"},
+         "bbox": {"x": 100, "y": 100, "width": 400, "height": 400}}
+    ]
+}
+
+
+@pytest.fixture
+def agent():
+    return DesignerAgent(api_key="test", client=object(), use_response_cache=False)
+
+
+def _modified(**changes):
+    """DESIGN の要素 id → 上書きする値 を適用したコピー"""
+    design = copy.deepcopy(DESIGN)
+    for elem in design["elements"]:
+        elem.update(changes.get(elem["id"], {}))
+    return design
+
+
+def test_identical_design(agent):
+    diff = agent._diff_designs(DESIGN, copy.deepcopy(DESIGN))
+
+    assert diff == {"changed": [], "added": [], "removed": [], "regenerate": [], "reusable": {0: 0, 2: 2}}
+
+
+def test_text_only_change_reuses_images(agent):
+    diff = agent._diff_designs(DESIGN, _modified(title={"content": "新しいタイトル", "style": {"fontSize": 60}}))
+
+    assert diff["changed"] == ["title"]
+    assert diff["regenerate"] == []
+    assert diff["reusable"] == {0: 0, 2: 2}
+
+
+def test_moving_an_image_reuses_it(agent):
+    diff = agent._diff_designs(DESIGN, _modified(hero={"bbox": {"x": 900, "y": 50, "width": 300, "height": 300}}))
+
+    assert diff["changed"] == ["hero"]
+    assert diff["regenerate"] == []
+    assert diff["reusable"] == {0: 0, 2: 2}
+
+
+def test_prompt_change_regenerates_only_that_image(agent):
+    diff = agent._diff_designs(DESIGN, _modified(hero={"prompt": "cat"}))
+
+    assert diff["changed"] == ["hero"]
+    assert diff["regenerate"] == ["hero"]
+    assert diff["reusable"] == {0: 0}
+
+
+def test_color_scheme_change_regenerates_background(agent):
+    new_design = copy.deepcopy(DESIGN)
+    new_design["meta"]["color_scheme"]["primary"] = "#FF0000"
+    diff = agent._diff_designs(DESIGN, new_design)
+
+    # 配色は背景のスタイル説明にだけ入る
+    assert diff["changed"] == []
+    assert diff["regenerate"] == ["bg"]
+    assert diff["reusable"] == {2: 2}
+
+
+def test_added_and_removed_elements(agent):
+    new_design = copy.deepcopy(DESIGN)
+    new_design["elements"] = [
+        new_design["elements"][0],
+        {"id": "logo", "type": "image", "prompt": "logo"},
+        {"id": "subtitle", "type": "text", "content": "サブタイトル"},
+        new_design["elements"][2]
+    ]
+    diff = agent._diff_designs(DESIGN, new_design)
+
+    assert diff["added"] == ["logo", "subtitle"]
+    assert diff["removed"] == ["title"]
+    assert diff["regenerate"] == ["logo"]
+    # 要素の並びが変わっても id で対応付ける
+    assert diff["reusable"] == {0: 0, 3: 2}
+
+
+def test_elements_without_id_match_by_type_and_index(agent):
+    old_design = {"meta": {}, "elements": [{"type": "image", "prompt": "a"}, {"type": "text", "content": "x"}]}
+    new_design = {"meta": {}, "elements": [{"type": "image", "prompt": "a"}, {"type": "text", "content": "y"}]}
+    diff = agent._diff_designs(old_design, new_design)
+
+    assert diff["changed"] == ["text_1"]
+    assert diff["reusable"] == {0: 0}
@@ -0,0 +1,79 @@
+"""
+テスト: 画像 → 編集可能なPPTX（Fake クライアントでの分析・native / pixel の切り出し）
+"""
+
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from agents.tools import rate_limit
+from agents.tools.analyze_image import MODEL as ANALYZE_MODEL
+from agents.tools.editable_pptx import image_to_editable_pptx
+from agents.tools.image_handle import ImageHandle
+from tests.fake_genai import FakeGenaiClient, make_png
+
+
+@pytest.fixture
+def client():
+    rate_limit.configure_model(ANALYZE_MODEL, rpm=0, max_concurrency=64)
+    yield FakeGenaiClient()
+    rate_limit._overrides.pop(ANALYZE_MODEL, None)
+    rate_limit.reset_limiters()
+
+
+def _pictures(path: str) -> list:
+    slide = Presentation(path).slides[0]
+    return [shape for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+
+
+def _solid(width: int, height: int, color=(220, 30, 30)) -> ImageHandle:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return ImageHandle(buffer.getvalue(), "image/png")
+
+
+@pytest.mark.parametrize("crop_mode", ["native", "pixel"])
+def test_fake_client_round_trip(client, tmp_path, crop_mode):
+    source = ImageHandle(make_png(1376, 768), "image/png")
+
+    result = image_to_editable_pptx(source, session_id="EDIT-0001", output_dir=tmp_path, client=client, crop_mode=crop_mode)
+
+    assert result["success"], result.get("error")
+    assert [call["kind"] for call in client.calls] == ["analysis"]
+    assert [(elem["id"], elem["type"]) for elem in result["elements"]] == [
+        ("background", "background"), ("text_1", "text"), ("illustration_1", "image")
+    ]
+    # イラストは元画像の座標のままスライド（1920x1080）に拡大する
+    assert result["elements"][2]["bbox"] == {"x": 1255, "y": 421, "width": 418, "height": 421}
+
+    pictures = _pictures(result["file_path"])
+    assert len(pictures) == 2
+    slide = Presentation(result["file_path"]).slides[0]
+    assert any(shape.has_text_frame and shape.text_frame.text == "タイトル" for shape in slide.shapes)
+    if crop_mode == "native":
+        # 元画像を1回だけ埋め込み、トリミングで表示する
+        assert pictures[0].image.sha1 == pictures[1].image.sha1
+        assert pictures[1].crop_left == pytest.approx(900 / 1376)
+    else:
+        assert Image.open(BytesIO(pictures[1].image.blob)).size[0] < 1376
+
+
+@pytest.mark.parametrize("bbox", [
+    {"x": -100, "y": -50, "width": 300, "height": 200},
+    {"x": 300, "y": 200, "width": 300, "height": 300},
+])
+def test_pixel_crop_is_clamped_to_image(tmp_path, bbox):
+    source = _solid(400, 300)
+    analysis = {"success": True, "elements": [{"id": "illustration_1", "type": "illustration", "bbox": bbox}]}
+
+    result = image_to_editable_pptx(source, session_id="EDIT-0002", output_dir=tmp_path, analysis=analysis, crop_mode="pixel")
+
+    assert result["success"], result.get("error")
+    with Image.open(BytesIO(_pictures(result["file_path"])[0].image.blob)) as crop:
+        extrema = crop.convert("RGB").getextrema()
+    # はみ出した部分を黒で埋めず、画像内の範囲だけを切り出す
+    for (low, high), expected in zip(extrema, (220, 30, 30)):
+        assert abs(low - expected) < 8 and abs(high - expected) < 8
@@ -0,0 +1,80 @@
+"""
+テスト: 画像生成キャッシュ（キーの正規化・ヒット/ミス・LRU削除）
+"""
+
+import os
+
+import pytest
+
+from agents import blob_store
+from agents.blob_store import BlobStore
+from agents.tools.image_cache import ImageCache, make_cache_key
+
+
+@pytest.fixture(params=[False, True], ids=["files", "blob_store"])
+def cache(request, tmp_path, monkeypatch):
+    """画像ストアなし / あり（キャッシュのファイルを実体へのハードリンクにする）の両方で確認する"""
+    monkeypatch.setattr(blob_store, "USE_BLOB_STORE", request.param)
+    store = BlobStore(tmp_path / "agent_output")
+    monkeypatch.setattr(blob_store, "get_blob_store", lambda output_dir=None: store)
+    return ImageCache(tmp_path / "agent_output" / "_cache" / "images", max_bytes=250)
+
+
+def _set_mtime(cache: ImageCache, key: str, mtime: float) -> None:
+    path = cache._find(key)
+    os.utime(path, (mtime, mtime))
+
+
+def test_cache_key_is_order_independent():
+    a = make_cache_key(prompt="cat", aspect_ratio="1:1", style={"b": 1, "a": 2})
+    b = make_cache_key(style={"a": 2, "b": 1}, aspect_ratio="1:1", prompt="cat")
+
+    assert a == b
+    assert len(a) == 64
+    assert make_cache_key(prompt="cat", aspect_ratio="16:9", style={"b": 1, "a": 2}) != a
+    assert make_cache_key(prompt="猫") == make_cache_key(prompt="猫")
+
+
+def test_hit_and_miss(cache):
+    assert cache.get("missing") is None
+
+    cache.put("k1", b"\x89PNG" + b"1" * 10, "image/png")
+    cache.put("k2", b"GIF89a" + b"2" * 10, "image/gif")
+
+    assert cache.get("k1") == (b"\x89PNG" + b"1" * 10, "image/png")
+    # gif も拡張子から MIME タイプを復元できる
+    assert cache.get("k2") == (b"GIF89a" + b"2" * 10, "image/gif")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["bytes"] == 30
+
+
+def test_put_overwrites_same_key(cache):
+    cache.put("k", b"old" * 10, "image/png")
+    cache.put("k", b"new" * 10, "image/png")
+
+    assert cache.get("k") == (b"new" * 10, "image/png")
+
+
+def test_lru_evicts_least_recently_used(cache):
+    cache.put("a", b"a" * 100, "image/png")
+    cache.put("b", b"b" * 100, "image/png")
+    _set_mtime(cache, "a", 1000)
+    _set_mtime(cache, "b", 2000)
+
+    # a を読むと最終アクセスが最新になり、次の追加では b が削除される
+    assert cache.get("a") is not None
+    cache.put("c", b"c" * 100, "image/jpeg")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"a" * 100, "image/png")
+    assert cache.get("c") == (b"c" * 100, "image/jpeg")
+    assert cache.stats()["bytes"] == 200
+
+
+def test_clear(cache):
+    cache.put("a", b"a" * 10, "image/png")
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
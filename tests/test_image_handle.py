@@ -0,0 +1,79 @@
+"""
+テスト: 画像ハンドル（MIMEタイプの判定・JSON API 境界での変換）
+"""
+
+import base64
+import hashlib
+import json
+
+from agents.tools.image_handle import ImageHandle, encode_images, sniff_mime_type
+from tests.fake_genai import make_png
+
+PNG = make_png(16, 16)
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 16
+
+
+def _result() -> dict:
+    return {
+        "success": True,
+        "file_path": "/tmp/S1/background.png",
+        "image": ImageHandle(PNG, "image/png"),
+        "elements": [
+            {"id": "hero", "image": ImageHandle(JPEG, "image/jpeg"), "bbox": {"x": 0, "y": 0}},
+            {"id": "title", "content": "タイトル"}
+        ],
+        "preview": ImageHandle(PNG, "image/png"),
+        "tags": ["a", None, 1]
+    }
+
+
+def test_encode_images_inline():
+    encoded = encode_images(_result())
+
+    assert encoded["image_base64"] == base64.b64encode(PNG).decode()
+    assert encoded["preview_base64"] == encoded["image_base64"]
+    assert encoded["mime_type"] == "image/png"
+    assert "image" not in encoded and "preview" not in encoded
+    hero = encoded["elements"][0]
+    assert base64.b64decode(hero["image_base64"]) == JPEG
+    assert hero["mime_type"] == "image/jpeg"
+    # 画像以外はそのまま
+    assert hero["bbox"] == {"x": 0, "y": 0}
+    assert encoded["elements"][1] == {"id": "title", "content": "タイトル"}
+    assert encoded["tags"] == ["a", None, 1]
+    json.dumps(encoded)
+
+
+def test_encode_images_by_reference():
+    encoded = encode_images(_result(), inline=False)
+
+    assert encoded["image_sha256"] == hashlib.sha256(PNG).hexdigest()
+    assert encoded["image_size"] == len(PNG)
+    assert encoded["preview_sha256"] == encoded["image_sha256"]
+    assert encoded["mime_type"] == "image/png"
+    assert not any(key.endswith("_base64") for key in encoded)
+    hero = encoded["elements"][0]
+    assert (hero["image_sha256"], hero["image_size"], hero["mime_type"]) == (
+        hashlib.sha256(JPEG).hexdigest(), len(JPEG), "image/jpeg"
+    )
+    assert encoded["file_path"] == "/tmp/S1/background.png"
+    json.dumps(encoded)
+
+
+def test_encode_images_does_not_modify_input():
+    result = _result()
+    encode_images(result)
+
+    assert isinstance(result["image"], ImageHandle)
+    assert isinstance(result["elements"][0]["image"], ImageHandle)
+
+
+def test_sniff_and_from_base64():
+    assert sniff_mime_type(PNG) == "image/png"
+    assert sniff_mime_type(JPEG) == "image/jpeg"
+    assert sniff_mime_type(b"GIF89a...") == "image/gif"
+    assert sniff_mime_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_mime_type(b"unknown", default="image/jpeg") == "image/jpeg"
+
+    handle = ImageHandle.from_base64(base64.b64encode(JPEG).decode())
+    assert (handle.data, handle.mime_type) == (JPEG, "image/jpeg")
@@ -8,6 +8,7 @@ import json
 import re
 from pathlib import Path
 from io import BytesIO
+from typing import Optional
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -18,6 +19,10 @@ from pptx import Presentation
 from pptx.util import Inches, Pt, Emu
 from pptx.dml.color import RGBColor
 
+from agents.tools.editable_pptx import _to_slide_elements
+from agents.tools.image_handle import ImageHandle
+from agents.tools.image_to_pptx import image_to_pptx
+
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env.local')
 
 OUTPUT_BASE_DIR = Path(__file__).parent / "output"
@@ -120,20 +125,43 @@ def save_svg(svg_content: str, filepath: Path):
         f.write(svg_content)
 
 
-def create_pptx(elements: list, original_image: Image.Image, output_path: Path, output_dir: Path):
+def svg_to_png(svg: str, png_path: Path) -> bool:
+    """テキスト要素のSVGをPNGに変換（フォントは Noto Sans CJK JP に置換）"""
+    import cairosvg
+
+    svg_content = svg.replace('Arial Black', 'Noto Sans CJK JP')
+    svg_content = svg_content.replace('Impact', 'Noto Sans CJK JP')
+    svg_content = svg_content.replace('sans-serif', 'Noto Sans CJK JP')
+    cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), write_to=str(png_path))
+    return True
+
+
+def create_pptx(
+    elements: list,
+    original_image: Image.Image,
+    output_path: Path,
+    output_dir: Path,
+    native_crop: bool = False,
+    source_image: Optional[ImageHandle] = None
+):
     """
     要素リストからPPTXを作成
     - テキスト要素: SVGからPNG変換
-    - 非テキスト要素: 元画像から切り出し
+    - 非テキスト要素: native_crop=True なら元画像を1回だけ埋め込み、PPTXのトリミングで表示
+                      （False なら元画像から切り出したPNGを要素ごとに埋め込む）
 
     Args:
         elements: 要素リスト
         original_image: 元画像（PIL Image）
         output_path: 出力先パス
         output_dir: 出力ディレクトリ
+        native_crop: PPTXのトリミングを使う
+        source_image: 元画像のバイト列（省略時は original_image をPNGにエンコード）
     """
+    if native_crop:
+        return create_pptx_native_crop(elements, original_image, output_path, output_dir, source_image)
+
     from pptx.enum.text import PP_ALIGN
-    import cairosvg
 
     prs = Presentation()
 
@@ -174,10 +202,7 @@ def create_pptx(elements: list, original_image: Image.Image, output_path: Path,
             save_svg(svg, svg_path)
 
             try:
-                svg_content = svg.replace('Arial Black', 'Noto Sans CJK JP')
-                svg_content = svg_content.replace('Impact', 'Noto Sans CJK JP')
-                svg_content = svg_content.replace('sans-serif', 'Noto Sans CJK JP')
-                cairosvg.svg2png(bytestring=svg_content.encode('utf-8'), write_to=str(png_path))
+                svg_to_png(svg, png_path)
             except Exception as e:
                 print(f"    SVG→PNG変換失敗: {elem_id} - {e}")
                 continue
@@ -222,6 +247,66 @@ def create_pptx(elements: list, original_image: Image.Image, output_path: Path,
     print(f"\nPPTX保存: {output_path}")
 
 
+def create_pptx_native_crop(
+    elements: list,
+    original_image: Image.Image,
+    output_path: Path,
+    output_dir: Path,
+    source_image: Optional[ImageHandle] = None
+):
+    """
+    元画像を1つのメディアパートとして埋め込み、非テキスト要素はトリミングで配置する
+    （切り出し・再エンコードをしないため、要素数が増えても処理時間・ファイルサイズはほぼ変わらない）
+    """
+    if source_image is None:
+        buffer = BytesIO()
+        original_image.save(buffer, "PNG")
+        source_image = ImageHandle(buffer.getvalue(), "image/png")
+
+    # 座標変換用スケール
+    img_width, img_height = original_image.size
+    scale_x = SLIDE_WIDTH / img_width
+    scale_y = SLIDE_HEIGHT / img_height
+
+    # 背景を先に、他の要素を後に
+    sorted_elements = sorted(elements, key=lambda e: 0 if e.get("type") == "background" else 1)
+
+    pptx_elements = []
+    for elem in sorted_elements:
+        elem_type = elem.get("type", "")
+        elem_id = elem.get("id", "unknown")
+
+        if elem_type == "text" and elem.get("svg"):
+            # テキスト要素 → SVGからPNG変換（画像として配置）
+            bbox = elem.get("bbox", {})
+            slide_bbox = {
+                "x": int(int(bbox.get("x", 0)) * scale_x),
+                "y": int(int(bbox.get("y", 0)) * scale_y),
+                "width": int(int(bbox.get("width", 100)) * scale_x),
+                "height": int(int(bbox.get("height", 50)) * scale_y)
+            }
+            png_path = output_dir / f"{elem_id}.png"
+            save_svg(elem["svg"], output_dir / f"{elem_id}.svg")
+            try:
+                svg_to_png(elem["svg"], png_path)
+            except Exception as e:
+                print(f"    SVG→PNG変換失敗: {elem_id} - {e}")
+                continue
+            pptx_elements.append({"type": "image", "id": elem_id, "file_path": str(png_path), "bbox": slide_bbox})
+            print(f"    テキスト追加: {elem_id} - {elem.get('content', '')[:20]}")
+
+        else:
+            # 非テキスト要素（SVGのないテキストも）→ 元画像の該当範囲（スライド座標への変換は editable_pptx と共通）
+            crop_type = "image" if elem_type == "text" else elem_type
+            pptx_elements.extend(_to_slide_elements([{**elem, "id": elem_id, "type": crop_type}], source_image, original_image.size))
+            print(f"    要素追加: {elem_id} ({elem_type})")
+
+    result = image_to_pptx(pptx_elements, session_id=output_path.stem, output_dir=output_path.parent)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    print(f"\nPPTX保存: {result['file_path']}（画像パート {result['media']['parts']}個）")
+
+
 def main():
     """メイン処理"""
     # テストID生成
@@ -237,6 +322,7 @@ def main():
     print(f"入力画像: {image_path}")
 
     image = Image.open(image_path)
+    source_image = ImageHandle.from_file(image_path)
     print(f"サイズ: {image.size}\n")
 
     # クライアント初期化
@@ -267,7 +353,7 @@ def main():
     # Step 3: PPTX作成
     print("\n[Step 3] PPTX作成中...")
     pptx_path = output_dir / "result.pptx"
-    create_pptx(elements, image, pptx_path, output_dir)
+    create_pptx(elements, image, pptx_path, output_dir, source_image=source_image)
 
     print("\n=== 完了 ===")
     print(f"出力ディレクトリ: {output_dir}")
@@ -0,0 +1,105 @@
+"""
+テスト: PPTX埋め込み画像の最適化（配置サイズへの縮小・形式の選択・容量予算）
+"""
+
+import os
+import random
+from io import BytesIO
+
+from PIL import Image
+
+from agents.tools.image_handle import ImageHandle
+from agents.tools.image_to_pptx import image_to_pptx
+from agents.tools.media_optimizer import MediaOptimizer
+
+
+def _photo(width: int, height: int, seed: int = 0) -> ImageHandle:
+    """圧縮の効きにくい写真調（ノイズ）の PNG"""
+    rng = random.Random(seed)
+    image = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    buffer = BytesIO()
+    image.save(buffer, "PNG")
+    return ImageHandle(buffer.getvalue(), "image/png")
+
+
+def _flat(width: int, height: int) -> ImageHandle:
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (30, 60, 90)).save(buffer, "PNG")
+    return ImageHandle(buffer.getvalue(), "image/png")
+
+
+def _size(image: ImageHandle):
+    with Image.open(image.stream()) as pil:
+        return pil.size
+
+
+def test_large_png_in_small_bbox_shrinks():
+    image = _photo(1200, 1200)
+    optimizer = MediaOptimizer(target_dpi=150)
+    optimizer.add(image, (200, 200))
+
+    stats = optimizer.run()
+    optimized = optimizer.get(image)
+
+    # 200px × 150/96 = 312.5px、写真調は JPEG
+    assert _size(optimized) == (312, 312)
+    assert optimized.mime_type == "image/jpeg"
+    assert stats["bytes"] == optimized.size < image.size
+    assert stats["saved_bytes"] == image.size - optimized.size
+    assert stats["budget_met"]
+
+
+def test_largest_placement_wins_and_small_images_are_kept():
+    image = _photo(800, 800)
+    flat = _flat(64, 64)
+    optimizer = MediaOptimizer(target_dpi=96)
+    optimizer.add(image, (100, 100))
+    optimizer.add(image, (400, 300))
+    optimizer.add(flat, (640, 640))
+
+    optimizer.run()
+
+    assert _size(optimizer.get(image)) == (400, 400)
+    # 拡大はせず、再エンコードで小さくならない画像は元のまま
+    assert optimizer.get(flat) is flat
+
+
+def test_budget_loop_converges():
+    images = [_photo(600, 600, seed=i) for i in range(3)]
+    unconstrained = MediaOptimizer(target_dpi=96)
+    for image in images:
+        unconstrained.add(image, (600, 600))
+    baseline = unconstrained.run()["bytes"]
+
+    optimizer = MediaOptimizer(target_dpi=96, max_bytes=baseline // 3)
+    for image in images:
+        optimizer.add(image, (600, 600))
+    stats = optimizer.run()
+
+    assert stats["budget_met"]
+    assert stats["bytes"] <= baseline // 3
+    assert sum(optimizer.get(image).size for image in images) == stats["bytes"]
+
+
+def test_unreachable_budget_stops_at_limits():
+    image = _photo(400, 400)
+    optimizer = MediaOptimizer(target_dpi=96, max_bytes=1)
+    optimizer.add(image, (400, 400))
+
+    stats = optimizer.run()
+
+    assert not stats["budget_met"]
+    # 品質・解像度の下限（0.4 倍）で止まる
+    assert _size(optimizer.get(image)) == (160, 160)
+
+
+def test_image_to_pptx_optimize_media_shrinks_deck(tmp_path):
+    image = _photo(1200, 1200)
+    elements = [{"id": "hero", "type": "image", "image": image, "bbox": {"x": 0, "y": 0, "width": 200, "height": 200}}]
+
+    plain = image_to_pptx(elements=elements, session_id="plain", output_dir=tmp_path, optimize_media=False)
+    optimized = image_to_pptx(elements=elements, session_id="optimized", output_dir=tmp_path, optimize_media=True)
+
+    assert plain["success"] and optimized["success"]
+    assert optimized["media"]["bytes"] < plain["media"]["bytes"] == image.size
+    assert os.path.getsize(optimized["file_path"]) < os.path.getsize(plain["file_path"])
@@ -0,0 +1,56 @@
+"""
+テスト: PPTXの画像パートの共有（同じ画像はスライドをまたいでも1つのメディアパートにする）
+"""
+
+import zipfile
+
+import pytest
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from agents.tools.image_handle import ImageHandle
+from agents.tools.image_to_pptx import image_to_pptx
+from tests.fake_genai import make_png
+
+
+def _media_parts(path: str) -> list:
+    with zipfile.ZipFile(path) as package:
+        return [name for name in package.namelist() if name.startswith("ppt/media/")]
+
+
+@pytest.mark.parametrize("optimize_media", [False, True])
+def test_deck_reuses_media_parts(tmp_path, optimize_media):
+    background = ImageHandle(make_png(480, 270, seed=1), "image/png")
+    logo = ImageHandle(make_png(120, 120, seed=2), "image/png")
+    # 内容が同じなら別のオブジェクトでも共有する
+    logo_copy = ImageHandle(bytes(logo.data), "image/png")
+    photo = ImageHandle(make_png(200, 200, seed=3), "image/png")
+
+    def slide(logo_image, extra=None):
+        elements = [
+            {"id": "background", "type": "background", "image": background},
+            {"id": "logo", "type": "image", "image": logo_image, "bbox": {"x": 40, "y": 40, "width": 120, "height": 120}}
+        ]
+        if extra is not None:
+            elements.append({"id": "photo", "type": "image", "image": extra, "bbox": {"x": 600, "y": 300, "width": 200, "height": 200}})
+        return elements
+
+    result = image_to_pptx(
+        elements=[],
+        session_id="deck",
+        output_dir=tmp_path,
+        slides=[slide(logo), slide(logo_copy, photo), slide(logo)],
+        optimize_media=optimize_media
+    )
+
+    assert result["success"], result.get("error")
+    assert len(_media_parts(result["file_path"])) == 3
+    assert (result["media"]["parts"], result["media"]["reused"]) == (3, 4)
+
+    prs = Presentation(result["file_path"])
+    pictures = [
+        [shape for shape in s.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+        for s in prs.slides
+    ]
+    assert [len(p) for p in pictures] == [2, 3, 2]
+    assert len({p[0].image.sha1 for p in pictures}) == 1
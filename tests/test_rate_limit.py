@@ -0,0 +1,132 @@
+"""
+テスト: モデルごとのレート制御（トークンバケットの補充と AIMD による同時実行数の調整）
+"""
+
+import pytest
+
+from agents.tools import rate_limit
+from agents.tools.rate_limit import ModelLimiter
+
+
+class _Clock:
+    """time.monotonic の代わりに使う手動で進める時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def _drain(limiter: ModelLimiter, count: int) -> None:
+    for _ in range(count):
+        assert limiter._try_acquire() == 0.0
+        limiter.release()
+
+
+def test_bucket_starts_full_and_refills(clock):
+    limiter = ModelLimiter(rpm=60, max_concurrency=8)
+    _drain(limiter, 60)
+
+    # 空になったら1トークン分（60 RPM なら1秒）待つ
+    assert limiter._try_acquire() == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert limiter._try_acquire() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert limiter._try_acquire() == 0.0
+    assert limiter.requests == 61
+
+
+def test_refill_is_capped_at_rpm(clock):
+    limiter = ModelLimiter(rpm=30, max_concurrency=8)
+    _drain(limiter, 10)
+
+    clock.now += 3600
+    assert limiter.metrics()["tokens"] == 30
+
+
+def test_unlimited_rpm_never_waits_for_tokens(clock):
+    limiter = ModelLimiter(rpm=0, max_concurrency=4)
+    _drain(limiter, 1000)
+
+    assert limiter.metrics()["tokens"] == 0
+
+
+def test_concurrency_limit_blocks_until_release(clock):
+    limiter = ModelLimiter(rpm=0, max_concurrency=2)
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == rate_limit._POLL_INTERVAL
+
+    limiter.release()
+    assert limiter._try_acquire() == 0.0
+    assert limiter.in_flight == 2
+
+
+def test_throttle_halves_limit_down_to_minimum(clock):
+    limiter = ModelLimiter(rpm=60, max_concurrency=8, min_concurrency=2)
+    limits = []
+    for _ in range(4):
+        limiter.in_flight = 1
+        limiter.release(throttled=True)
+        limits.append(limiter.concurrency_limit)
+
+    assert limits == [4.0, 2.0, 2.0, 2.0]
+    assert limiter.throttled == 4
+    # 429 の直後はバケットも空にする
+    assert limiter._try_acquire() == pytest.approx(1.0)
+
+
+def test_success_restores_limit_additively(clock):
+    limiter = ModelLimiter(rpm=0, max_concurrency=8)
+    limiter.in_flight = 1
+    limiter.release(throttled=True)
+    assert limiter.concurrency_limit == 4.0
+
+    # 上限1回分の成功でおよそ +1
+    for _ in range(4):
+        limiter.in_flight = 1
+        limiter.release()
+    assert 4.9 < limiter.concurrency_limit < 5.0
+
+    for _ in range(100):
+        limiter.in_flight = 1
+        limiter.release()
+    assert limiter.concurrency_limit == 8.0
+
+
+def test_other_errors_keep_limit(clock):
+    limiter = ModelLimiter(rpm=0, max_concurrency=8)
+    limiter.concurrency_limit = 3.0
+    limiter.in_flight = 1
+    limiter.release(success=False)
+
+    assert limiter.concurrency_limit == 3.0
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.parametrize("rpm, expected", [(20, 3.0), (120, 1.0), (0, 1.0)])
+def test_backoff_is_one_token(rpm, expected):
+    assert ModelLimiter(rpm=rpm, max_concurrency=1).backoff() == expected
+
+
+def test_is_rate_limit_error():
+    class _Error(Exception):
+        def __init__(self, code=None, status=None, message=""):
+            super().__init__(message)
+            self.code = code
+            self.status = status
+
+    assert rate_limit.is_rate_limit_error(_Error(code=429))
+    assert rate_limit.is_rate_limit_error(_Error(status="RESOURCE_EXHAUSTED"))
+    assert rate_limit.is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED: quota"))
+    assert not rate_limit.is_rate_limit_error(_Error(code=503, status="UNAVAILABLE"))
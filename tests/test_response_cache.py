@@ -0,0 +1,121 @@
+"""
+テスト: テキストフェーズの応答キャッシュ（フェーズ別TTL・LRU・SQLite永続化）
+"""
+
+import pytest
+
+from agents import response_cache
+from agents.response_cache import DEFAULT_TTL, MISS, PHASE_TTLS, ResponseCache, make_key
+
+
+class _Clock:
+    """time.time() の代わりに進める時計"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(response_cache, "time", clock)
+    return clock
+
+
+def test_make_key_separates_parts():
+    assert make_key("m", "ab", "c") != make_key("m", "a", "bc")
+    assert make_key("m", "prompt", None) != make_key("m", "prompt")
+    assert make_key("m", "prompt", b"img") == make_key("m", "prompt", b"img")
+    assert make_key("m1", "prompt") != make_key("m2", "prompt")
+
+
+def test_phase_ttl_expiry(clock):
+    cache = ResponseCache()
+    cache.set("web_research", "k", {"summary": "検索結果"})
+    cache.set("parse_design", "k", {"elements": []})
+    cache.set("unknown", "k", "x")
+
+    # 同じキーでもフェーズごとに別の値
+    assert cache.get("web_research", "k") == {"summary": "検索結果"}
+    assert cache.get("parse_design", "k") == {"elements": []}
+
+    clock.now += PHASE_TTLS["web_research"] + 1
+    assert cache.get("web_research", "k") is MISS
+    assert cache.get("unknown", "k") is MISS  # DEFAULT_TTL も 1 時間
+    assert cache.get("parse_design", "k") == {"elements": []}
+
+    clock.now += PHASE_TTLS["parse_design"]
+    assert cache.get("parse_design", "k") is MISS
+    assert cache.stats()["entries"] == 0
+    assert DEFAULT_TTL == PHASE_TTLS["web_research"]
+
+
+def test_ttl_override_and_disable(clock):
+    cache = ResponseCache(ttls={"reason": 10, "web_research": 0})
+    cache.set("reason", "k", "分析")
+    cache.set("web_research", "k", "検索結果")
+
+    # TTL 0 のフェーズは保存しない
+    assert cache.get("web_research", "k") is MISS
+    clock.now += 9
+    assert cache.get("reason", "k") == "分析"
+    clock.now += 2
+    assert cache.get("reason", "k") is MISS
+
+
+def test_get_returns_fresh_copy(clock):
+    cache = ResponseCache()
+    cache.set("parse_design", "k", {"elements": [1]})
+
+    cache.get("parse_design", "k")["elements"].append(2)
+
+    assert cache.get("parse_design", "k") == {"elements": [1]}
+
+
+def test_none_is_cacheable(clock):
+    cache = ResponseCache()
+    cache.set("web_research", "k", None)
+
+    assert cache.get("web_research", "k") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.set("reason", "a", "A")
+    cache.set("reason", "b", "B")
+    # a を参照すると b が最も古くなる
+    assert cache.get("reason", "a") == "A"
+    cache.set("reason", "c", "C")
+
+    assert cache.get("reason", "b") is MISS
+    assert cache.get("reason", "a") == "A"
+    assert cache.get("reason", "c") == "C"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 1, 2)
+
+
+def test_sqlite_backend_persists_and_expires(clock, tmp_path):
+    db_path = tmp_path / "cache" / "responses.db"
+    first = ResponseCache(db_path=db_path)
+    first.set("reason", "k", "分析")
+    first.set("web_research", "k", {"summary": "検索結果"})
+
+    # 別プロセス相当: 新しいインスタンスは SQLite から読み、メモリにも載せる
+    second = ResponseCache(max_entries=0, db_path=db_path)
+    assert second.get("reason", "k") == "分析"
+    assert second.get("web_research", "k") == {"summary": "検索結果"}
+
+    clock.now += PHASE_TTLS["web_research"] + 1
+    third = ResponseCache(db_path=db_path)
+    assert third.get("web_research", "k") is MISS
+    assert third.get("reason", "k") == "分析"
+    # 期限切れの行は削除される
+    rows = third._db.execute("SELECT key FROM responses").fetchall()
+    assert rows == [("reason:k",)]
+
+    third.clear()
+    assert ResponseCache(db_path=db_path).get("reason", "k") is MISS
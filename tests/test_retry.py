@@ -0,0 +1,140 @@
+"""
+テスト: 画像生成のリトライ（再試行するエラーの分類と試行回数）
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from google.genai import errors
+
+from agents.tools.retry import (
+    LatencyTracker,
+    RetryPolicy,
+    RetryableError,
+    call_with_retry,
+    is_retryable,
+    notify_request_sent
+)
+
+
+def _api_error(code: int, status: str) -> errors.APIError:
+    cls = errors.ServerError if code >= 500 else errors.ClientError
+    return cls(code, {"error": {"code": code, "status": status, "message": status}})
+
+
+@pytest.mark.parametrize("error", [
+    RetryableError("no image in response"),
+    _api_error(408, "DEADLINE_EXCEEDED"),
+    _api_error(500, "INTERNAL"),
+    _api_error(503, "UNAVAILABLE"),
+    _api_error(504, "DEADLINE_EXCEEDED"),
+    httpx.ConnectError("connection refused"),
+    httpx.ReadTimeout("timed out"),
+    asyncio.TimeoutError(),
+    ConnectionResetError(),
+])
+def test_transient_errors_are_retryable(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    # 429 はレート制御の再キューで扱うため、ここでは再試行しない
+    _api_error(429, "RESOURCE_EXHAUSTED"),
+    _api_error(400, "INVALID_ARGUMENT"),
+    _api_error(403, "PERMISSION_DENIED"),
+    _api_error(404, "NOT_FOUND"),
+    ValueError("bad prompt"),
+    KeyError("image"),
+])
+def test_permanent_errors_are_not_retryable(error):
+    assert not is_retryable(error)
+
+
+def _flaky(failures):
+    """failures の例外を順に送出し、尽きたら "ok" を返すコルーチン関数"""
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "ok"
+
+    return func, calls
+
+
+def _policy(max_attempts: int) -> RetryPolicy:
+    return RetryPolicy(max_attempts=max_attempts, base_delay=0.0, max_delay=0.0, hedge=False)
+
+
+def test_retries_transient_errors_until_success():
+    func, calls = _flaky([_api_error(503, "UNAVAILABLE"), RetryableError("empty")])
+
+    assert asyncio.run(call_with_retry(func, _policy(3))) == "ok"
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_attempts():
+    func, calls = _flaky([_api_error(500, "INTERNAL")] * 5)
+
+    with pytest.raises(errors.ServerError):
+        asyncio.run(call_with_retry(func, _policy(3)))
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("error", [_api_error(400, "INVALID_ARGUMENT"), _api_error(429, "RESOURCE_EXHAUSTED")])
+def test_does_not_retry_permanent_errors(error):
+    func, calls = _flaky([error])
+
+    with pytest.raises(errors.ClientError):
+        asyncio.run(call_with_retry(func, _policy(3)))
+    assert len(calls) == 1
+
+
+def test_backoff_is_capped_full_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (6, 4.0)]:
+        for _ in range(50):
+            assert 0.0 <= policy.backoff(attempt) <= cap
+
+
+def _hedge_policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=1, base_delay=0.0, max_delay=0.0, hedge=True, hedge_min_samples=5)
+
+
+def _fast_tracker() -> LatencyTracker:
+    tracker = LatencyTracker()
+    for _ in range(5):
+        tracker.record(0.01)
+    return tracker
+
+
+def test_hedge_wins_when_primary_is_slow():
+    calls = []
+
+    async def func():
+        name = "primary" if not calls else "hedge"
+        calls.append(name)
+        notify_request_sent()
+        await asyncio.sleep(0.5 if name == "primary" else 0.02)
+        return name
+
+    assert asyncio.run(call_with_retry(func, _hedge_policy(), _fast_tracker())) == "hedge"
+    assert len(calls) == 2
+
+
+def test_hedge_survives_cancelled_primary():
+    calls = []
+
+    async def func():
+        calls.append(len(calls))
+        notify_request_sent()
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            # プライマリだけがキャンセルされた（task.exception() が CancelledError を送出する状態）
+            raise asyncio.CancelledError()
+        await asyncio.sleep(0.1)
+        return "hedge"
+
+    assert asyncio.run(call_with_retry(func, _hedge_policy(), _fast_tracker())) == "hedge"